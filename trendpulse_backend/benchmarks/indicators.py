@@ -0,0 +1,241 @@
+"""
+Offline micro-benchmarks for the indicator kernels, the /indicators request
+pipeline and response encoding, on synthetic OHLCV series.
+
+Run from trendpulse_backend/:
+
+    python -m benchmarks.indicators --output bench.json
+    python -m benchmarks.indicators --baseline bench.json --threshold 0.25
+
+With --baseline, every metric is compared with the saved run and the exit
+status is 1 if any got slower by more than the threshold. Comparisons use
+the fastest batch (min_ms), which is far less sensitive to noise from other
+processes than the median.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from services.bars import Bars
+from services.indicators import (
+    calculate_sma, calculate_ema, calculate_rsi,
+    calculate_bollinger_bands, calculate_macd, calculate_atr,
+)
+from services.indicator_engine import plan_indicators, compute_indicators
+from services.serialization import BarSeries, encode_payload
+
+# Synthetic series: name -> (pandas frequency, bars)
+SERIES = {
+    "1y_daily": ("B", 252),
+    "5y_weekly": ("W-FRI", 5 * 52),
+    "25y_monthly": ("MS", 25 * 12),
+    "intraday_1m": ("min", 20 * 390),
+}
+
+CALCULATIONS = {
+    "sma": calculate_sma,
+    "ema": calculate_ema,
+    "rsi": calculate_rsi,
+    "bb": calculate_bollinger_bands,
+    "macd": calculate_macd,
+    "atr": calculate_atr,
+}
+
+# The standard six-indicator request of the chart page
+STANDARD_INDICATORS = [{"name": name} for name in ("SMA", "EMA", "RSI", "MACD", "BB", "ATR")]
+
+DEFAULT_THRESHOLD = 0.25
+COMPARE_BY = "min_ms"
+MIN_BATCH_SECONDS = 0.02
+REPEAT = 7
+
+
+def synthetic_frame(freq: str, size: int, seed: int = 0) -> pd.DataFrame:
+    """Geometric random walk OHLCV with realistic intrabar ranges."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.005, size)) * close
+    return pd.DataFrame({
+        "Date": pd.date_range("2000-01-03", periods=size, freq=freq),
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, size),
+    })
+
+
+def _summary(samples: list) -> dict:
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 6),
+        "min_ms": round(min(samples) * 1000, 6),
+    }
+
+
+def measure(fn) -> dict:
+    """Per-call time of `fn()`, from REPEAT batches of at least MIN_BATCH_SECONDS each."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - started >= MIN_BATCH_SECONDS:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops)
+    return {**_summary(samples), "loops": loops}
+
+
+async def measure_async(fn) -> dict:
+    """`measure` for a coroutine function, awaited on the running loop."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            await fn()
+        if time.perf_counter() - started >= MIN_BATCH_SECONDS:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for _ in range(loops):
+            await fn()
+        samples.append((time.perf_counter() - started) / loops)
+    return {**_summary(samples), "loops": loops}
+
+
+def bench_kernels(results: dict):
+    plan = plan_indicators(_items(STANDARD_INDICATORS))
+    for series, (freq, size) in SERIES.items():
+        frame = synthetic_frame(freq, size)
+        for name, calculate in CALCULATIONS.items():
+            results[f"calculate_{name}/{series}"] = measure(lambda: calculate(frame))
+
+        bars = Bars.from_frame(frame)
+        results[f"engine_standard/{series}"] = measure(
+            lambda: compute_indicators(plan, bars.close, bars.high, bars.low)
+        )
+
+        columns = compute_indicators(plan, bars.close, bars.high, bars.low)
+        for fmt in ("records", "columnar"):
+            payload = {"symbol": "BENCH", "data": BarSeries(bars, columns)}
+            results[f"encode_{fmt}/{series}"] = measure(lambda: encode_payload(payload, fmt))
+
+
+def bench_pipeline(results: dict):
+    """The full /indicators handler from a warm cache, with a synthetic provider."""
+    # main opens its caches relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="trendpulse-bench-"))
+    import main
+
+    frame = synthetic_frame("B", 25 * 252)
+
+    async def fetch_price_range(symbol, interval, start=None, end=None):
+        return frame if start is None else frame.iloc[0:0]
+
+    main.fetcher.fetch_price_range = fetch_price_range
+
+    from starlette.requests import Request
+
+    # A plain request: no conditional or compression headers
+    http_request = Request({"type": "http", "method": "POST", "path": "/indicators", "headers": []})
+
+    async def run():
+        for fmt in ("records", "columnar"):
+            request = main.IndicatorRequest(symbol="BENCH", indicators=STANDARD_INDICATORS, format=fmt)
+            await main.get_indicators(request, http_request)  # warm the bar cache
+            results[f"pipeline_indicators_{fmt}/1y_daily"] = await measure_async(
+                lambda: main.get_indicators(request, http_request)
+            )
+
+    asyncio.run(run())
+
+
+def _items(indicators: list) -> list:
+    from types import SimpleNamespace
+    return [
+        SimpleNamespace(name=item["name"], length=None, fast=None, slow=None, signal=None)
+        for item in indicators
+    ]
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Print a comparison table; return the names of metrics that regressed."""
+    regressions = []
+    print(f"{'metric':48} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:48} {'-':>11} {result[COMPARE_BY]:>9.4f}ms {'new':>8}")
+            continue
+        change = result[COMPARE_BY] / before[COMPARE_BY] - 1 if before[COMPARE_BY] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:48} {before[COMPARE_BY]:>9.4f}ms {result[COMPARE_BY]:>9.4f}ms {change:>+7.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with a previous results file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before failing (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    bench_kernels(results)
+    bench_pipeline(results)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "threshold": args.threshold,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        for name, result in results.items():
+            print(f"{name:48} {result['median_ms']:>9.4f}ms  (min {result['min_ms']:.4f}ms)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Local stand-in for the Questrade login and API servers, serving the
+deterministic series of the synthetic provider with its latency, jitter
+and error settings (SYNTHETIC_* environment variables).
+
+    uvicorn loadtest.questrade_stub:app --port 9100
+
+Point the Questrade provider at it with QUESTRADE_LOGIN_SERVER=http://127.0.0.1:9100/
+and a QUESTRADE_CONFIG_FILE holding any refresh_token.
+"""
+import zlib
+import secrets
+from collections import Counter
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
+
+from providers import synthetic_api
+from services.bars import Bars, INTRADAY_INTERVALS, resample
+
+# Questrade candle intervals the stub can serve, as bar intervals
+CANDLE_INTERVALS = {
+    "OneMinute": "1m", "FiveMinutes": "5m", "FifteenMinutes": "15m", "OneHour": "1h",
+    "OneDay": "1d", "OneWeek": "1wk", "OneMonth": "1mo",
+}
+TOKEN_EXPIRES_IN = 1800
+
+app = FastAPI()
+calls = Counter()
+_symbols = {}  # {symbolId: symbol}
+
+
+def _symbol_id(symbol: str) -> int:
+    symbol_id = zlib.crc32(symbol.upper().encode()) & 0x7FFFFFFF
+    _symbols[symbol_id] = symbol.upper()
+    return symbol_id
+
+
+def _symbol(symbol_id: int) -> str:
+    if symbol_id not in _symbols:
+        raise HTTPException(status_code=404, detail="Unknown symbolId")
+    return _symbols[symbol_id]
+
+
+async def _upstream(route: str, subject: str):
+    calls[route] += 1
+    try:
+        await synthetic_api._upstream(subject)
+    except ValueError:
+        calls["errors"] += 1
+        raise HTTPException(status_code=503, detail="Synthetic upstream error")
+
+
+@app.get("/oauth2/token")
+async def token(request: Request, refresh_token: str, grant_type: str = "refresh_token"):
+    calls["token"] += 1
+    return {
+        "access_token": secrets.token_urlsafe(16),
+        "refresh_token": secrets.token_urlsafe(16),
+        "api_server": str(request.base_url),
+        "expires_in": TOKEN_EXPIRES_IN,
+        "token_type": "Bearer",
+    }
+
+
+@app.get("/v1/symbols")
+async def symbols(names: str):
+    await _upstream("symbols", names)
+    return {"symbols": [{"symbol": name.upper(), "symbolId": _symbol_id(name)} for name in names.split(",") if name]}
+
+
+@app.get("/v1/symbols/{symbol_id}")
+async def symbol_details(symbol_id: int):
+    symbol = _symbol(symbol_id)
+    await _upstream("details", symbol)
+    fundamentals = synthetic_api.fundamentals(symbol)
+    return {"symbols": [{
+        "symbol": symbol,
+        "symbolId": symbol_id,
+        "description": fundamentals["name"],
+        "industrySector": fundamentals["sector"],
+        "listingExchange": fundamentals["listingExchange"],
+        "securityType": "Stock",
+        "currency": fundamentals["currency"],
+        "dividend": fundamentals["dividend"],
+        "yield": fundamentals["dividendYield"],
+        "pe": fundamentals["peRatio"],
+        "eps": fundamentals["eps"],
+        "marketCap": fundamentals["marketCap"],
+        "outstandingShares": fundamentals["outstandingShares"],
+        "exDate": None,
+        "highPrice52": fundamentals["high52w"],
+        "lowPrice52": fundamentals["low52w"],
+    }]}
+
+
+@app.get("/v1/markets/quotes/{symbol_id}")
+async def quotes(symbol_id: int):
+    symbol = _symbol(symbol_id)
+    await _upstream("quotes", symbol)
+    quote = synthetic_api.quote(symbol)
+    return {"quotes": [{
+        "symbol": symbol,
+        "symbolId": symbol_id,
+        "openPrice": quote["open"],
+        "highPrice": quote["high"],
+        "lowPrice": quote["low"],
+        "lastTradePrice": quote["lastTradePrice"],
+        "volume": quote["volume"],
+    }]}
+
+
+@app.get("/v1/markets/candles/{symbol_id}")
+async def candles(symbol_id: int, startTime: str, endTime: str, interval: str):
+    symbol = _symbol(symbol_id)
+    if interval not in CANDLE_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval: {interval}")
+    await _upstream("candles", symbol)
+
+    start, end = pd.Timestamp(startTime), pd.Timestamp(endTime)
+    if CANDLE_INTERVALS[interval] in INTRADAY_INTERVALS:
+        df = synthetic_api.intraday_history(symbol, CANDLE_INTERVALS[interval], start, end)
+    else:
+        df = synthetic_api.daily_history(symbol, end)
+        df = df[(df["Date"] >= start) & (df["Date"] <= end)]
+    if CANDLE_INTERVALS[interval] in ("1wk", "1mo"):
+        df = resample(Bars.from_frame(df), CANDLE_INTERVALS[interval]).to_frame()
+
+    return {"candles": [
+        {
+            "start": row.Date.isoformat(),
+            "end": row.Date.isoformat(),
+            "open": row.Open,
+            "high": row.High,
+            "low": row.Low,
+            "close": row.Close,
+            "volume": int(row.Volume),
+        }
+        for row in df.itertuples(index=False)
+    ]}
+
+
+@app.get("/stats")
+async def stats():
+    return dict(calls)
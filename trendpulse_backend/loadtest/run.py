@@ -0,0 +1,328 @@
+"""
+Offline load test: start uvicorn with N workers on the synthetic provider
+(or the Questrade provider against the local stand-in, or both behind the
+provider router), replay a mix of
+/{symbol}, /prices and /indicators requests over a Zipfian symbol
+distribution, and report throughput, latency percentiles and cache hit
+ratio. Run from trendpulse_backend/:
+
+    python -m loadtest.run --workers 4 --concurrency 64 --duration 30
+    python -m loadtest.run --provider questrade --latency-ms 80 --output run.json
+    python -m loadtest.run --provider questrade,synthetic --stub-error-rate 0.5
+    python -m loadtest.run --url http://127.0.0.1:8000   # existing server
+
+The server runs in a temporary directory, so it starts with cold caches and
+leaves nothing behind; if it fails to start, the directory is kept for its logs.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Request mix: endpoint -> share of traffic
+DEFAULT_MIX = "details=0.3,prices=0.5,indicators=0.2"
+
+# Chart periods requested by /prices, weighted like the chart page's buttons
+PRICE_PERIODS = {"1mo": 0.15, "3mo": 0.1, "6mo": 0.15, "1y": 0.35, "5y": 0.15, "max": 0.1}
+
+STANDARD_INDICATORS = [{"name": name} for name in ("SMA", "EMA", "RSI", "MACD", "BB", "ATR")]
+
+PERCENTILES = (50, 95, 99)
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def zipf_weights(count: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def parse_mix(mix: str) -> dict:
+    shares = {}
+    for part in mix.split(","):
+        name, _, share = part.partition("=")
+        if name not in ("details", "prices", "indicators"):
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        shares[name] = float(share)
+    total = sum(shares.values())
+    return {name: share / total for name, share in shares.items()}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """
+    uvicorn (and optionally the Questrade stand-in) in a scratch directory,
+    removed by `stop` unless startup failed.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="trendpulse-load-")
+        self.stats_dir = os.path.join(self.workdir, "synthetic_stats")
+        self.metrics_dir = os.path.join(self.workdir, "metrics")
+        os.makedirs(self.metrics_dir)
+        self.port = free_port()
+        self.stub_port = free_port()
+        self.processes = []
+        self.logs = []
+        self.started = False
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _env(self) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+            "TRENDPULSE_PROVIDERS": self.args.provider,
+            "TRENDPULSE_RATE_LIMIT": str(10 ** 9),
+            "SYNTHETIC_LATENCY_MS": str(self.args.latency_ms),
+            "SYNTHETIC_JITTER_MS": str(self.args.jitter_ms),
+            "SYNTHETIC_ERROR_RATE": str(self.args.error_rate),
+            "SYNTHETIC_HISTORY_DAYS": str(self.args.history_days),
+            "SYNTHETIC_STATS_DIR": self.stats_dir,
+            "PROMETHEUS_MULTIPROC_DIR": self.metrics_dir,
+        })
+        if "questrade" in self.providers:
+            config = os.path.join(self.workdir, "questrade_config.json")
+            with open(config, "w") as f:
+                json.dump({"refresh_token": "loadtest"}, f)
+            env["QUESTRADE_CONFIG_FILE"] = config
+            env["QUESTRADE_LOGIN_SERVER"] = f"http://127.0.0.1:{self.stub_port}/"
+        return env
+
+    @property
+    def providers(self) -> list:
+        return self.args.provider.split(",")
+
+    def _spawn(self, app: str, port: int, workers: int, **env):
+        command = [
+            sys.executable, "-m", "uvicorn", app,
+            "--app-dir", BACKEND_DIR,
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+            "--no-access-log",
+        ]
+        # The app logs every request at INFO; keep that off the report
+        log = open(os.path.join(self.workdir, f"{port}.log"), "w")
+        self.logs.append(log)
+        env = {**self._env(), **{key: str(value) for key, value in env.items() if value is not None}}
+        self.processes.append(subprocess.Popen(command, cwd=self.workdir, env=env, stdout=log, stderr=log))
+
+    async def start(self):
+        if "questrade" in self.providers:
+            self._spawn(
+                "loadtest.questrade_stub:app", self.stub_port, 1,
+                SYNTHETIC_LATENCY_MS=self.args.stub_latency_ms, SYNTHETIC_ERROR_RATE=self.args.stub_error_rate,
+            )
+            await self._wait(f"http://127.0.0.1:{self.stub_port}/stats")
+        self._spawn("main:app", self.port, self.args.workers)
+        await self._wait(f"{self.url}/")
+        self.started = True
+
+    async def _wait(self, url: str):
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                try:
+                    if (await client.get(url)).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Server did not start: {url} (logs in {self.workdir})")
+
+    async def upstream_calls(self) -> int:
+        """Calls that reached the (simulated) upstream, including the Questrade stand-in."""
+        import diskcache  # type: ignore
+        with diskcache.Cache(self.stats_dir) as stats:
+            return stats.get("upstream_calls", 0)
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        for log in self.logs:
+            log.close()
+        if self.started:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class LoadGenerator:
+    def __init__(self, url: str, args):
+        self.url = url
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.symbols = [f"SYN{i:04d}" for i in range(args.symbols)]
+        self.symbol_weights = zipf_weights(args.symbols, args.zipf)
+        self.mix = parse_mix(args.mix)
+        self.latencies = defaultdict(list)  # {endpoint: [seconds]}
+        self.statuses = defaultdict(int)    # {status code: count}
+        self.failures = 0
+
+    def next_request(self):
+        endpoint = self.rng.choice(list(self.mix), p=list(self.mix.values()))
+        symbol = self.symbols[self.rng.choice(len(self.symbols), p=self.symbol_weights)]
+        if endpoint == "details":
+            return endpoint, "GET", f"/{symbol}", None
+        if endpoint == "prices":
+            period = self.rng.choice(list(PRICE_PERIODS), p=list(PRICE_PERIODS.values()))
+            return endpoint, "POST", "/prices", {"symbol": symbol, "period": str(period)}
+        return endpoint, "POST", "/indicators", {"symbol": symbol, "indicators": STANDARD_INDICATORS}
+
+    async def _client_loop(self, client: httpx.AsyncClient, deadline: float):
+        while time.monotonic() < deadline:
+            endpoint, method, path, body = self.next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                self.statuses[response.status_code] += 1
+            except httpx.HTTPError:
+                self.failures += 1
+                continue
+            self.latencies[endpoint].append(time.perf_counter() - started)
+
+    async def run(self, seconds: float) -> float:
+        """Drive the server for `seconds`; returns the elapsed time."""
+        self.latencies.clear()
+        self.statuses.clear()
+        self.failures = 0
+        limits = httpx.Limits(max_connections=self.args.concurrency)
+        timeout = httpx.Timeout(self.args.timeout)
+        async with httpx.AsyncClient(base_url=self.url, limits=limits, timeout=timeout) as client:
+            started = time.monotonic()
+            deadline = started + seconds
+            await asyncio.gather(*(self._client_loop(client, deadline) for _ in range(self.args.concurrency)))
+            return time.monotonic() - started
+
+
+def summarize(samples: list) -> dict:
+    if not samples:
+        return {"requests": 0}
+    ms = np.array(samples) * 1000
+    return {
+        "requests": len(samples),
+        **{f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in PERCENTILES},
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def build_report(generator: LoadGenerator, elapsed: float, upstream_calls) -> dict:
+    every = [latency for samples in generator.latencies.values() for latency in samples]
+    report = {
+        "config": {key: value for key, value in vars(generator.args).items() if key != "output"},
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(every) / elapsed, 1) if elapsed else 0.0,
+        "overall": summarize(every),
+        "endpoints": {endpoint: summarize(samples) for endpoint, samples in generator.latencies.items()},
+        "statuses": {str(code): count for code, count in sorted(generator.statuses.items())},
+        "transport_failures": generator.failures,
+    }
+    if upstream_calls is not None and every:
+        # A miss can cost several upstream calls (details = fundamentals +
+        # quote, Questrade adds symbol lookups), so the ratio is a lower bound
+        per_request = upstream_calls / len(every)
+        report["upstream_calls"] = upstream_calls
+        report["upstream_calls_per_request"] = round(per_request, 4)
+        report["cache_hit_ratio"] = round(max(0.0, 1 - per_request), 4)
+    return report
+
+
+def print_report(report: dict):
+    print(f"throughput: {report['throughput_rps']} req/s over {report['elapsed_s']}s")
+    print(f"{'endpoint':12} {'requests':>9} " + " ".join(f"{f'p{p}':>9}" for p in PERCENTILES) + f" {'max':>9}")
+    rows = {"overall": report["overall"], **report["endpoints"]}
+    for name, row in rows.items():
+        if not row["requests"]:
+            continue
+        print(f"{name:12} {row['requests']:>9} " + " ".join(f"{row[f'p{p}_ms']:>7.1f}ms" for p in PERCENTILES)
+              + f" {row['max_ms']:>7.1f}ms")
+    print(f"statuses: {report['statuses']}  transport failures: {report['transport_failures']}")
+    if "cache_hit_ratio" in report:
+        print(f"upstream calls: {report['upstream_calls']} ({report['upstream_calls_per_request']} per request)"
+              f"  cache hit ratio: >= {report['cache_hit_ratio']:.1%}")
+
+
+async def run(args) -> dict:
+    server = None if args.url else Server(args)
+    try:
+        if server:
+            await server.start()
+        generator = LoadGenerator(args.url or server.url, args)
+        if args.warmup:
+            await generator.run(args.warmup)
+
+        # Upstream calls are only observable on a server we started
+        before = await server.upstream_calls() if server else None
+        elapsed = await generator.run(args.duration)
+        upstream_calls = await server.upstream_calls() - before if server else None
+        if args.metrics:
+            async with httpx.AsyncClient(base_url=generator.url) as client:
+                with open(args.metrics, "w") as f:
+                    f.write((await client.get("/metrics")).text)
+        return build_report(generator, elapsed, upstream_calls)
+    finally:
+        if server:
+            server.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--provider", default="synthetic",
+                        help="provider or comma-separated failover order of synthetic and questrade")
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn workers")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=0, help="unmeasured seconds before the run")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--symbols", type=int, default=500, help="size of the symbol universe")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of symbol popularity")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint shares (default {DEFAULT_MIX})")
+    parser.add_argument("--latency-ms", type=float, default=50, help="simulated upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="simulated upstream jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="simulated upstream error rate")
+    parser.add_argument("--stub-latency-ms", type=float, help="Questrade stand-in latency (default --latency-ms)")
+    parser.add_argument("--stub-error-rate", type=float, help="Questrade stand-in error rate (default --error-rate)")
+    parser.add_argument("--history-days", type=int, default=25 * 252, help="synthetic daily bars per symbol")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--metrics", help="save the server's /metrics after the run to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.provider.split(",")) - {"synthetic", "questrade"}
+    if unknown:
+        parser.error(f"unknown providers: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,41 @@
-from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi import FastAPI, HTTPException, Body, Request, Query
 from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
-import pandas as pd
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+import os
 import re
+import numpy as np
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import diskcache # type: ignore
-import time
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from services.fetch_data import fetcher
-from services.indicators import (
-    calculate_rsi, calculate_sma, calculate_ema,
-    calculate_bollinger_bands, calculate_macd, calculate_atr
+from services.indicator_engine import SUPPORTED_INDICATORS, plan_indicators, compute_indicators, compute_indicators_many
+from services.bars import Bars, PERIOD_INTERVALS
+from services.bar_store import BarStore
+from services.intraday_store import IntradayStore
+from services.serialization import RESPONSE_FORMATS, BarSeries, dumps, format_times, column_to_list
+from services.compute_pool import ComputePool, PoolSaturated
+from services.http_cache import (
+    bars_digest, make_etag, coded_etag, etag_matches, choose_encoding, cache_control, encode_compressed,
 )
+from services.downsample import DOWNSAMPLE_METHODS, select_points, apply_selection
+from services.screener import latest_values, screen
+from services.ratings import latest_snapshot, generate_recommendations, rating_score, final_rating
+from services.memory_cache import MemoryCache
+from services.bar_file import BarFileStore
+from services.minute_file import MinuteFileStore
+from services.single_flight import SingleFlight
+from services.refresh_scheduler import RefreshScheduler
+from services.stock_details import StockDetailsCache
+from services.rate_limit import RateLimitMiddleware, MemoryBucketStore, DiskBucketStore
+from services import metrics
+from utils.market_utils import get_cache_expiry
 
 # Load environment variables
 load_dotenv()
@@ -26,46 +44,128 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Caching
+# Caching: TTL while the symbol's market is open; closed-session data stays
+# valid until the next open
 CACHE_TTL_MINUTES = 10
+CACHE_MAX_STALE_HOURS = 24  # serve expired bars this long while revalidating in the background
+CACHE_FULL_RELOAD_DAYS = 7  # reload whole histories this often, as a backstop to re-adjustment checks
+MEMORY_CACHE_MAX_BYTES = 256 * 1024 * 1024
 cache = diskcache.Cache("./trendpulse_cache")
 
-# Rate limiting config
-RATE_LIMIT = 30  # max requests
-RATE_LIMIT_WINDOW = 60  # seconds
+# Intraday: minute bars per symbol and session, refreshed every minute while
+# the session is open and kept for the last few sessions (~8.6 KB each)
+INTRADAY_TTL_SECONDS = 60
+INTRADAY_RETENTION_SESSIONS = 10
+INTRADAY_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+intraday_store = IntradayStore(
+    MinuteFileStore("./trendpulse_cache/minutes"),
+    fetcher,
+    timedelta(seconds=INTRADAY_TTL_SECONDS),
+    MemoryCache(INTRADAY_MEMORY_MAX_BYTES),
+    SingleFlight("./trendpulse_cache/locks"),
+    retention=INTRADAY_RETENTION_SESSIONS,
+)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        self.clients = {}  # {ip: [timestamp1, timestamp2, ...]}
+bar_store = BarStore(
+    BarFileStore("./trendpulse_cache/bars"),
+    fetcher,
+    timedelta(minutes=CACHE_TTL_MINUTES),
+    MemoryCache(MEMORY_CACHE_MAX_BYTES),
+    SingleFlight("./trendpulse_cache/locks"),
+    expiry=get_cache_expiry,
+    max_stale=timedelta(hours=CACHE_MAX_STALE_HOURS),
+    intraday=intraday_store,
+    full_reload=timedelta(days=CACHE_FULL_RELOAD_DAYS),
+)
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
+# Stock details: fundamentals change at most daily, quotes only while the market is open
+DETAILS_FUNDAMENTALS_TTL_HOURS = 24
+DETAILS_QUOTE_TTL_SECONDS = 60
+DETAILS_MISS_TTL_SECONDS = 300
+details_cache = StockDetailsCache(
+    cache,
+    fetcher,
+    timedelta(hours=DETAILS_FUNDAMENTALS_TTL_HOURS),
+    timedelta(seconds=DETAILS_QUOTE_TTL_SECONDS),
+    SingleFlight("./trendpulse_cache/locks"),
+    expiry=get_cache_expiry,
+    miss_ttl=timedelta(seconds=DETAILS_MISS_TTL_SECONDS),
+)
 
-        now = time.time()
-        request_times = self.clients.get(client_ip, [])
+# Background refresh of the most requested symbols
+REFRESH_TOP_N = 50
+REFRESH_INTERVAL_SECONDS = 30
+REFRESH_LEAD_SECONDS = 60
+REFRESH_CONCURRENCY = 4
+scheduler = RefreshScheduler(
+    bar_store,
+    top_n=REFRESH_TOP_N,
+    interval=REFRESH_INTERVAL_SECONDS,
+    lead=timedelta(seconds=REFRESH_LEAD_SECONDS),
+    concurrency=REFRESH_CONCURRENCY,
+)
 
-        # Remove timestamps older than RATE_LIMIT_WINDOW
-        request_times = [t for t in request_times if now - t < RATE_LIMIT_WINDOW]
+# CPU-bound compute/encode stages: small jobs run inline, large ones in the pool
+COMPUTE_POOL_KIND = "thread"  # "process" also keeps JSON encoding off this worker's GIL
+COMPUTE_WORKERS = 4
+COMPUTE_MAX_PENDING = 64  # beyond this, requests get 503 instead of queueing
+COMPUTE_INLINE_MAX_CELLS = 20_000  # ~ bars x columns
+compute_pool = ComputePool(COMPUTE_POOL_KIND, COMPUTE_WORKERS, COMPUTE_MAX_PENDING, COMPUTE_INLINE_MAX_CELLS)
 
-        if len(request_times) >= RATE_LIMIT:
-            return JSONResponse(
-                status_code=429,
-                content={"detail": "Rate limit exceeded. Try again later."},
-            )
+# Latest-value snapshots and ratings, per symbol and indicator set
+RATINGS_CACHE_MAX_BYTES = 4 * 1024 * 1024
+RATING_ENTRY_BYTES = 2048  # rough size of one cached rating
+ratings_cache = MemoryCache(RATINGS_CACHE_MAX_BYTES)
 
-        request_times.append(now)
-        self.clients[client_ip] = request_times
+# Downsampling selections, per series content, method and max_points
+DOWNSAMPLE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+downsample_cache = MemoryCache(DOWNSAMPLE_CACHE_MAX_BYTES)
 
-        response = await call_next(request)
-        return response
+# Largest watchlist accepted by the batch endpoints
+BATCH_MAX_SYMBOLS = 100
+SCREENER_MAX_SYMBOLS = 500
 
+# Rate limiting config
+RATE_LIMIT = int(os.getenv("TRENDPULSE_RATE_LIMIT", "30"))  # max requests
+RATE_LIMIT_WINDOW = 60  # seconds
+# With several workers, per-worker buckets would let each client through
+# N times over, so buckets are shared through diskcache when uvicorn runs
+# more than one worker (WEB_CONCURRENCY, or PROMETHEUS_MULTIPROC_DIR set
+# for them); TRENDPULSE_RATE_LIMIT_SHARED=1/0 overrides that. Shared buckets
+# cost a SQLite transaction per request, and past RATE_LIMIT_DISK_TIMEOUT of
+# lock contention the limiter lets the request through
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+RATE_LIMIT_SHARED = os.getenv(
+    "TRENDPULSE_RATE_LIMIT_SHARED", "1" if WORKERS > 1 or metrics.MULTIPROCESS else "0",
+).lower() in ("1", "true", "yes")
+RATE_LIMIT_DISK_TIMEOUT = 0.05  # seconds
+rate_limit_store = (
+    DiskBucketStore(diskcache.Cache("./trendpulse_cache/ratelimit", timeout=RATE_LIMIT_DISK_TIMEOUT))
+    if RATE_LIMIT_SHARED else MemoryBucketStore()
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    refresher = asyncio.create_task(scheduler.run())
+    yield
+    refresher.cancel()
+    compute_pool.shutdown()
+    # Close pooled provider connections on shutdown
+    await fetcher.aclose()
+    if RATE_LIMIT_SHARED:
+        rate_limit_store.close()
+    metrics.mark_process_dead()
 
 # FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add rate limiting middleware before other middleware
-app.add_middleware(RateLimitMiddleware)
+app.add_middleware(
+    RateLimitMiddleware,
+    limit=RATE_LIMIT,
+    window=RATE_LIMIT_WINDOW,
+    store=rate_limit_store,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -75,20 +175,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Default indicator lengths
-default_lengths = {
-    "SMA": 20,
-    "EMA": 20,
-    "RSI": 14,
-    "MACD": {"fast": 12, "slow": 26, "signal": 9},
-    "BB": 20,
-    "ATR": 14,
-}
+# Outermost, so latency includes the middleware above and rate-limited requests
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Models
 class PriceRequest(BaseModel):
     symbol: str
     period: str = "1y"
+    interval: Optional[str] = None    # defaults to the period's interval; 1m/5m/15m/1h for 1d and 5d
+    format: str = "records"
+    max_points: Optional[int] = None  # downsample to at most this many bars
+    downsample: str = "lttb"          # "lttb" keeps shape-defining bars, "ohlc" merges buckets
 
 class IndicatorItem(BaseModel):
     name: str
@@ -100,6 +197,38 @@ class IndicatorItem(BaseModel):
 class IndicatorRequest(BaseModel):
     symbol: str
     indicators: List[IndicatorItem]
+    format: str = "records"
+    max_points: Optional[int] = None
+    downsample: str = "lttb"
+
+class RatingRequest(BaseModel):
+    symbol: str
+    indicators: List[IndicatorItem] = [IndicatorItem(name=name) for name in SUPPORTED_INDICATORS]
+
+class BatchPriceRequest(BaseModel):
+    symbols: List[str]
+    period: str = "1y"
+    interval: Optional[str] = None
+    format: str = "records"
+
+class BatchIndicatorRequest(BaseModel):
+    symbols: List[str]
+    indicators: List[IndicatorItem]
+    format: str = "records"
+
+class ScreenerCondition(BaseModel):
+    left: str                 # column, e.g. "Close" or "RSI_14"
+    op: str                   # <, <=, >, >=, ==, !=
+    right: Union[float, str]  # number or column, e.g. 30 or "SMA_50"
+
+class ScreenerRequest(BaseModel):
+    symbols: List[str]
+    indicators: List[IndicatorItem] = []
+    conditions: List[ScreenerCondition] = []
+    period: str = "1y"
+    sort_by: Optional[str] = None
+    descending: bool = True
+    limit: int = Field(50, ge=1, le=SCREENER_MAX_SYMBOLS)
 
 # Helper functions
 def validate_symbol(symbol: str) -> str:
@@ -108,34 +237,146 @@ def validate_symbol(symbol: str) -> str:
         raise HTTPException(status_code=400, detail="Invalid stock symbol")
     return symbol
 
-def format_dates_for_json(df: pd.DataFrame) -> pd.Series:
-    if df.empty or "Date" not in df.columns:
-        return df["Date"] if "Date" in df.columns else pd.Series(dtype=str)
-
-    df["Date"] = pd.to_datetime(df["Date"], utc=True, errors='coerce')
-    if not pd.api.types.is_datetime64_any_dtype(df["Date"]) or df["Date"].isna().all():
-        return df["Date"].astype(str)
-
-    has_time = (df["Date"].dt.hour != 0) | (df["Date"].dt.minute != 0) | (df["Date"].dt.second != 0)
-    if has_time.any():
-        return df["Date"].dt.strftime('%Y-%m-%dT%H:%M:%S')
-    else:
-        return df["Date"].dt.strftime('%Y-%m-%d')
-
-def make_cache_key(symbol: str, period: str, interval: str, data_type: str) -> str:
-    return f"{symbol}-{period}-{interval}-{data_type}"
-
-def get_from_cache(key: str):
-    entry = cache.get(key)
-    if entry:
-        timestamp, df = entry
-        if datetime.now(timezone.utc) - timestamp < timedelta(minutes=CACHE_TTL_MINUTES):
-            logger.info(f"Using cached data for {key}")
-            return df.copy()
-    return None
+def validate_format(fmt: str) -> str:
+    if fmt not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    return fmt
+
+# Indicator parameters in GET query strings, in NAME:param:... order
+INDICATOR_QUERY_PARAMS = {"MACD": ("fast", "slow", "signal")}
+DEFAULT_INDICATOR_QUERY = ",".join(SUPPORTED_INDICATORS)
+
+def parse_indicator_query(query: str) -> List[IndicatorItem]:
+    """Parse e.g. 'SMA:50,RSI,MACD:12:26:9' into IndicatorItems."""
+    items = []
+    for part in query.split(","):
+        name, *values = part.strip().split(":")
+        fields = INDICATOR_QUERY_PARAMS.get(name.upper(), ("length",))
+        if not name or len(values) > len(fields):
+            raise HTTPException(status_code=400, detail=f"Invalid indicator: {part}")
+        try:
+            params = {field: int(value) for field, value in zip(fields, values)}
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid indicator: {part}")
+        items.append(IndicatorItem(name=name, **params))
+    return items
+
+def render(payload: dict) -> Response:
+    """Encode a payload of plain lists and dicts directly, skipping jsonable_encoder."""
+    return Response(content=dumps(payload), media_type="application/json")
+
+def refresh_time(symbols: List[str], interval: str = "1d") -> Optional[datetime]:
+    """When the earliest of these symbols' cached bars will be refreshed."""
+    times = [t for t in (bar_store.next_refresh(symbol, interval) for symbol in symbols) if t is not None]
+    return min(times) if times else None
+
+def next_refresh(symbols: List[str], interval: str = "1d") -> Optional[str]:
+    """ISO time at which the earliest of these symbols' cached bars will be refreshed."""
+    time = refresh_time(symbols, interval)
+    return time.isoformat() if time else None
+
+async def offload(stage: str, fn, *args, cost: int = None):
+    """Run a CPU-bound stage through the compute pool; 503 when it is saturated."""
+    try:
+        return await compute_pool.run(stage, fn, *args, cost=cost)
+    except PoolSaturated as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail="Server busy. Try again later.", headers={"Retry-After": "1"})
+
+async def render_series(payload: dict, fmt: str, cells: int, request: Request = None, etag: str = None,
+                        expires: datetime = None) -> Response:
+    """
+    Render a payload containing BarSeries, off the event loop when it is
+    large, and compressed when the client accepts it. For GET requests, an
+    `etag` identifying the payload adds ETag and Cache-Control (fresh until
+    `expires`), and a matching If-None-Match gets a 304 without encoding.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if request is not None else None
+    headers = {"Vary": "Accept-Encoding"}
+    if etag is not None and request.method == "GET":
+        headers["ETag"] = coded_etag(etag, encoding)
+        headers["Cache-Control"] = cache_control(expires)
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    body, applied = await offload("encode", encode_compressed, payload, fmt, encoding, cost=cells)
+    if applied:
+        headers["Content-Encoding"] = applied
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether a GET's If-None-Match already holds this payload, so work can stop before computing it."""
+    if request.method != "GET":
+        return False
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    return etag_matches(request.headers.get("if-none-match"), coded_etag(etag, encoding))
+
+def validate_downsample(max_points: Optional[int], method: str):
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported downsampling method: {method}")
+    if max_points is not None and max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be at least 3")
+
+async def downsample_series(bars: Bars, columns: dict, max_points: Optional[int], method: str, digest: bytes):
+    """Bars and aligned columns reduced to `max_points` rows, reusing the selection for identical series."""
+    if max_points is None or len(bars) <= max_points:
+        return bars, columns
+    key = (digest, method, max_points)
+    selection = downsample_cache.get(key)
+    if selection is None:
+        selection = await offload("downsample", select_points, bars, max_points, method, cost=len(bars) * 6)
+        downsample_cache.set(key, selection, selection.nbytes)
+    return apply_selection(bars, columns, selection, method)
+
+def resolve_interval(period: str, interval: Optional[str] = None) -> str:
+    try:
+        return bar_store.resolve_interval(period, interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-def set_to_cache(key: str, df: pd.DataFrame):
-    cache.set(key, (datetime.now(timezone.utc), df.copy()))
+async def load_bars(symbol: str, period: str, interval: Optional[str] = None) -> Bars:
+    scheduler.record(symbol)
+    try:
+        bars = await bar_store.get_bars(symbol, period, interval)
+    except Exception as e:
+        logger.error(f"Error fetching prices for {symbol}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch prices")
+    if bars.is_empty:
+        raise HTTPException(status_code=404, detail="No data found for the given symbol")
+    return bars
+
+def validate_batch_symbols(symbols: List[str], max_symbols: int = BATCH_MAX_SYMBOLS):
+    """Split a batch into unique valid symbols and per-symbol errors for invalid ones."""
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(symbols) > max_symbols:
+        raise HTTPException(status_code=400, detail=f"At most {max_symbols} symbols per batch")
+
+    valid, errors = [], {}
+    for raw in symbols:
+        try:
+            symbol = validate_symbol(raw)
+        except HTTPException as e:
+            errors[raw] = e.detail
+            continue
+        if symbol not in valid:
+            valid.append(symbol)
+    return valid, errors
+
+async def load_bars_many(symbols: List[str], period: str, errors: dict, interval: Optional[str] = None) -> dict:
+    """Bars for each symbol that loaded; failures are recorded in `errors`."""
+    loaded = {}
+    for symbol in symbols:
+        scheduler.record(symbol)
+    for symbol, bars in (await bar_store.get_bars_many(symbols, period, interval)).items():
+        if isinstance(bars, Exception):
+            logger.error(f"Error fetching prices for {symbol}: {str(bars)}")
+            errors[symbol] = "Failed to fetch prices"
+        elif bars.is_empty:
+            errors[symbol] = "No data found for the given symbol"
+        else:
+            loaded[symbol] = bars
+    return loaded
 
 # Routes
 @app.get("/favicon.ico")
@@ -146,126 +387,269 @@ async def favicon():
 def read_root():
     return {"message": "Welcome to TrendPulse API"}
 
+@app.get("/metrics")
+def get_metrics():
+    body, content_type = metrics.latest()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/cache_stats")
+def cache_stats():
+    return {
+        "memory": bar_store.memory.stats(),
+        "scheduler": scheduler.stats(),
+        "compute": compute_pool.stats(),
+        "providers": fetcher.stats(),
+    }
+
 @app.get("/{symbol}")
 async def get_stock_details(symbol: str):
     symbol = validate_symbol(symbol)
     try:
-        stock_data = await fetcher.fetch_stock_details(symbol)
-        if not stock_data:
-            raise HTTPException(status_code=404, detail=f"No data found for symbol: {symbol}")
-        return jsonable_encoder(stock_data)
+        stock_data = await details_cache.get(symbol)
     except Exception as e:
         logger.error(f"Error fetching details for {symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch stock details")
+    if not stock_data.get("symbol"):
+        raise HTTPException(status_code=404, detail=f"No data found for symbol: {symbol}")
+    return jsonable_encoder(stock_data)
+
+@app.get("/{symbol}/quote")
+async def get_stock_quote(symbol: str):
+    symbol = validate_symbol(symbol)
+    try:
+        quote = await details_cache.get_quote(symbol)
+    except Exception as e:
+        logger.error(f"Error fetching quote for {symbol}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch quote")
+    if not quote:
+        raise HTTPException(status_code=404, detail=f"No data found for symbol: {symbol}")
+    return jsonable_encoder({"symbol": symbol, **quote})
+
+async def prices_response(symbol: str, period: str, interval: Optional[str], fmt: str, request: Request,
+                          max_points: Optional[int] = None, method: str = "lttb") -> Response:
+    interval = resolve_interval(period, interval)
+    validate_downsample(max_points, method)
+
+    bars = await load_bars(symbol, period, interval)
+    expires = refresh_time([symbol], interval)
+    refresh = expires.isoformat() if expires else None
+
+    digest = bars_digest(bars)
+    etag = make_etag("prices", symbol, period, interval, fmt, max_points, method, digest, refresh)
+    if not not_modified(request, etag):
+        bars, _ = await downsample_series(bars, {}, max_points, method, digest)
+
+    return await render_series({
+        "symbol": symbol,
+        "interval": interval,
+        "data": BarSeries(bars),
+        "next_refresh": refresh,
+    }, fmt, cells=len(bars) * 6, request=request, etag=etag, expires=expires)
 
 @app.post("/prices")
-async def get_prices(request: PriceRequest):
-    symbol = validate_symbol(request.symbol)
+async def get_prices(request: PriceRequest, http_request: Request):
+    return await prices_response(validate_symbol(request.symbol), request.period, request.interval,
+                                 validate_format(request.format), http_request, request.max_points, request.downsample)
+
+@app.get("/prices/{symbol}")
+async def get_prices_conditional(symbol: str, http_request: Request, period: str = "1y",
+                                 interval: Optional[str] = None, fmt: str = Query("records", alias="format"),
+                                 max_points: Optional[int] = None, downsample: str = "lttb"):
+    """GET variant of /prices: cacheable, with ETag and If-None-Match support."""
+    return await prices_response(validate_symbol(symbol), period, interval, validate_format(fmt), http_request,
+                                 max_points, downsample)
+
+@app.post("/prices/batch")
+async def get_prices_batch(request: BatchPriceRequest, http_request: Request):
     period = request.period
+    fmt = validate_format(request.format)
+    interval = resolve_interval(period, request.interval)
+
+    symbols, errors = validate_batch_symbols(request.symbols)
+    loaded = await load_bars_many(symbols, period, errors, interval)
+
+    return await render_series({
+        "period": period,
+        "interval": interval,
+        "results": {symbol: BarSeries(bars) for symbol, bars in loaded.items()},
+        "errors": errors,
+        "next_refresh": next_refresh(list(loaded), interval),
+    }, fmt, cells=sum(len(bars) for bars in loaded.values()) * 6, request=http_request)
+
+async def indicators_response(symbol: str, indicators: List[IndicatorItem], fmt: str, request: Request,
+                              max_points: Optional[int] = None, method: str = "lttb") -> Response:
+    try:
+        plan = plan_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    validate_downsample(max_points, method)
 
-    if period == "1d":
-        interval = "1d"
-    elif period == "5d":
-        interval = "1d"
-    elif period in ["1mo", "3mo", "6mo", "1y", "ytd"]:
-        interval = "1d"
-    elif period == "5y":
-        interval = "1wk"
-    elif period == "max":
-        interval = "1mo"
-    else:
-        raise HTTPException(status_code=400, detail=f"Unsupported period: {period}")
-
-    cache_key = make_cache_key(symbol, period, interval, "price")
-    stock_data = get_from_cache(cache_key)
-
-    if stock_data is None:
-        try:
-            logger.info(f"Fetching fresh price data for {cache_key}")
-            stock_data = await fetcher.fetch_stock_prices(symbol, period)
-            if stock_data.empty:
-                raise HTTPException(status_code=404, detail="No data found for the given symbol")
-            stock_data = stock_data.sort_values("Date")
-            set_to_cache(cache_key, stock_data)
-        except Exception as e:
-            logger.error(f"Error fetching prices for {symbol}: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to fetch prices")
+    # Fixed to 1y and 1d interval for indicators
+    bars = await load_bars(symbol, "1y")
+    cells = len(bars) * (6 + len(plan.columns))
+    expires = refresh_time([symbol])
+    refresh = expires.isoformat() if expires else None
+
+    # Indicators are a pure function of the bars, so the ETag is known before computing them
+    digest = bars_digest(bars)
+    etag = make_etag("indicators", symbol, plan.specs, fmt, max_points, method, digest, refresh)
+    if not_modified(request, etag):
+        return await render_series({}, fmt, cells=0, request=request, etag=etag, expires=expires)
+
+    logger.info(f"Calculating {plan.specs} for {symbol}")
+    try:
+        columns = await offload("compute", compute_indicators, plan, bars.close, bars.high, bars.low, cost=cells)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error calculating indicators {plan.columns} for {symbol}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to calculate indicators")
 
-    stock_data["Date"] = format_dates_for_json(stock_data)
+    # Indicators always see the full series; only the output is thinned
+    bars, columns = await downsample_series(bars, columns, max_points, method, digest)
 
-    return {
+    return await render_series({
         "symbol": symbol,
-        "data": jsonable_encoder(stock_data.to_dict(orient="records"))
-    }
+        "data": BarSeries(bars, columns),
+        "next_refresh": refresh,
+    }, fmt, cells=len(bars) * (6 + len(plan.columns)), request=request, etag=etag, expires=expires)
 
 @app.post("/indicators")
-async def get_indicators(request: IndicatorRequest):
+async def get_indicators(request: IndicatorRequest, http_request: Request):
+    return await indicators_response(validate_symbol(request.symbol), request.indicators,
+                                     validate_format(request.format), http_request,
+                                     request.max_points, request.downsample)
+
+@app.get("/indicators/{symbol}")
+async def get_indicators_conditional(symbol: str, http_request: Request, indicators: str = DEFAULT_INDICATOR_QUERY,
+                                     fmt: str = Query("records", alias="format"), max_points: Optional[int] = None,
+                                     downsample: str = "lttb"):
+    """
+    GET variant of /indicators: cacheable, with ETag and If-None-Match
+    support. Indicators are comma-separated NAME[:param...], e.g.
+    `SMA:50,RSI,MACD:12:26:9`.
+    """
+    return await indicators_response(validate_symbol(symbol), parse_indicator_query(indicators),
+                                     validate_format(fmt), http_request, max_points, downsample)
+
+@app.post("/rating")
+async def get_rating(request: RatingRequest):
+    """Latest indicator values, per-indicator signals and the final rating shown on the analysis page."""
     symbol = validate_symbol(request.symbol)
-    indicators = request.indicators
+    try:
+        plan = plan_indicators(request.indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Fixed to 1y and 1d interval for indicators
-    period = "1y"
-    interval = "1d"
-    cache_key = make_cache_key(symbol, period, interval, "price")
+    # Same 1y daily series as /indicators, so the values match its last row
+    bars = await load_bars(symbol, "1y")
 
-    stock_data = get_from_cache(cache_key)
+    key = (symbol, tuple((name, tuple(params.items())) for name, params in plan.specs))
+    version = (int(bars.time[-1]), float(bars.close[-1]), len(bars))
+    cached = ratings_cache.get(key)
+    if cached is not None and cached["version"] == version:
+        return render(cached["rating"])
 
-    if stock_data is None:
-        try:
-            logger.info(f"Fetching base data for indicators: {cache_key}")
-            stock_data = await fetcher.fetch_stock_prices(symbol, period)
-            if stock_data.empty:
-                raise HTTPException(status_code=404, detail="No data found for indicators")
-            stock_data = stock_data.sort_values("Date")
-            set_to_cache(cache_key, stock_data)
-        except Exception as e:
-            logger.error(f"Error fetching prices for indicators {symbol}: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to fetch indicator data")
+    try:
+        latest = latest_snapshot(plan, bars)
+    except Exception as e:
+        logger.error(f"Error calculating indicators {plan.columns} for {symbol}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to calculate indicators")
 
-    stock_data["Date"] = pd.to_datetime(stock_data["Date"], utc=True)
-    results = stock_data.copy()
+    recommendations = generate_recommendations(latest, plan)
+    score = rating_score(recommendations)
+    rating = {
+        "symbol": symbol,
+        "Date": format_times(bars.time[-1:])[0],
+        "latest": {name: None if np.isnan(value) else value for name, value in latest.items()},
+        "recommendations": recommendations,
+        "score": score,
+        "rating": final_rating(score),
+        "next_refresh": next_refresh([symbol]),
+    }
+    ratings_cache.set(key, {"version": version, "rating": rating}, RATING_ENTRY_BYTES)
+    return render(rating)
 
-    for indicator in indicators:
-        name = indicator.name.upper()
+@app.post("/indicators/batch")
+async def get_indicators_batch(request: BatchIndicatorRequest, http_request: Request):
+    fmt = validate_format(request.format)
+    try:
+        plan = plan_indicators(request.indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    symbols, errors = validate_batch_symbols(request.symbols)
+    loaded = await load_bars_many(symbols, "1y", errors)
+    logger.info(f"Calculating {plan.specs} for {len(loaded)} symbols")
+
+    results = {}
+    cells = sum(len(bars) for bars in loaded.values()) * (6 + len(plan.columns))
+    if loaded:
+        # One pass over a (symbols x bars) matrix instead of one pipeline per symbol
         try:
-            if name == "MACD":
-                fast = indicator.fast or 12
-                slow = indicator.slow or 26
-                signal = indicator.signal or 9
-                logger.info(f"Calculating MACD for {symbol} with fast={fast}, slow={slow}, signal={signal}")
-                df_ind = calculate_macd(stock_data, fast, slow, signal)
-            else:
-                length_val = indicator.length or default_lengths.get(name, 14)
-                logger.info(f"Calculating {name} for {symbol} with length={length_val}")
-                if name == "RSI":
-                    df_ind = calculate_rsi(stock_data, length_val)
-                elif name == "SMA":
-                    df_ind = calculate_sma(stock_data, length_val)
-                elif name == "EMA":
-                    df_ind = calculate_ema(stock_data, length_val)
-                elif name == "BB":
-                    df_ind = calculate_bollinger_bands(stock_data, length_val)
-                elif name == "ATR":
-                    df_ind = calculate_atr(stock_data, length_val)
-                else:
-                    raise HTTPException(status_code=400, detail=f"Unsupported indicator: {name}")
-
-            results = results.merge(df_ind, on="Date", how="left")
+            own = await offload("compute", compute_indicators_many, plan, list(loaded.values()), cost=cells)
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Error calculating indicator {name}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to calculate indicator: {name}")
+            logger.error(f"Error calculating indicators {plan.columns} for batch: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to calculate indicators")
+
+        for (symbol, bars), columns in zip(loaded.items(), own):
+            results[symbol] = BarSeries(bars, columns)
 
-    results["Date"] = format_dates_for_json(results)
-    json_data = results.to_dict(orient="records")
-    for record in json_data:
-        for key, value in record.items():
-            if pd.isna(value):
-                record[key] = None
+    return await render_series(
+        {"results": results, "errors": errors, "next_refresh": next_refresh(list(loaded))},
+        fmt,
+        cells=cells,
+        request=http_request,
+    )
 
-    return {"symbol": symbol, "data": json_data}
+@app.post("/screener")
+async def run_screener(request: ScreenerRequest):
+    period = request.period
+    if period not in PERIOD_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported period: {period}")
+    try:
+        plan = plan_indicators(request.indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    symbols, errors = validate_batch_symbols(request.symbols, SCREENER_MAX_SYMBOLS)
+    loaded = await load_bars_many(symbols, period, errors)
+    if not loaded:
+        return render({"scanned": 0, "matches": [], "errors": errors})
+
+    names = list(loaded)
+    bars_list = list(loaded.values())
+    cells = sum(len(bars) for bars in bars_list) * (3 + len(plan.columns))
+    try:
+        # Every symbol's indicators in one pass over a (symbols x bars) matrix
+        latest = await offload("compute", latest_values, plan, bars_list, cost=cells)
+        matches = screen(
+            latest,
+            [(c.left, c.op, c.right) for c in request.conditions],
+            request.sort_by,
+            request.descending,
+            request.limit,
+        ).tolist()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    dates = format_times(np.array([bars_list[i].time[-1] for i in matches], dtype=np.int64))
+    # Volume is screened as a float like the other columns, but sent as an integer like /prices
+    values = {name: column_to_list(column[matches], integer=name == "Volume") for name, column in latest.items()}
+    return render({
+        "scanned": len(names),
+        "matches": [
+            {"symbol": names[i], "Date": dates[row], **{name: column[row] for name, column in values.items()}}
+            for row, i in enumerate(matches)
+        ],
+        "errors": errors,
+    })
 
 @app.post("/clear_cache")
 def clear_cache():
     cache.clear()
-    logger.info("Disk cache cleared")
+    bar_store.clear()
+    logger.info("Disk and memory caches cleared")
     return {"message": "Cache cleared"}
@@ -1,45 +1,124 @@
-import httpx
+import asyncio
 import pandas as pd
 from utils.market_utils import (
-    get_market_from_symbol,
     get_daily_range_for_period,
     get_hourly_range_for_last_open_day,
 )
-from providers.questrade_auth import get_access_token, get_symbol_id
-
+from providers.questrade_auth import get_access_token, get_symbol_id, get_symbol_ids
+from providers.questrade_client import get_client, aclose  # aclose is called by FetchData on shutdown
+
+# Maps our bar intervals to Questrade candle intervals
+INTERVAL_MAP = {
+    "1m": "OneMinute",
+    "5m": "FiveMinutes",
+    "15m": "FifteenMinutes",
+    "1h": "OneHour",
+    "1d": "OneDay",
+    "1wk": "OneWeek",
+    "1mo": "OneMonth",
+}
+
+# Calendar span that stays under the 2000-candle limit for each interval
+CANDLE_WINDOWS = {
+    "1m": pd.Timedelta(days=4),
+    "5m": pd.Timedelta(days=20),
+    "15m": pd.Timedelta(days=60),
+    "1h": pd.Timedelta(days=365),
+    "1d": pd.Timedelta(days=5 * 365),
+    "1wk": pd.Timedelta(days=30 * 365),
+    "1mo": pd.Timedelta(days=100 * 365),
+}
+
+HISTORY_START = "2000-01-01"
 
 async def fetch_stock_prices(symbol: str, period: str):
     access_token, api_server = await get_access_token()
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    market = get_market_from_symbol(symbol)
 
     # Determine interval and time range
     if period == "1d":
-        start_time, end_time = get_hourly_range_for_last_open_day(market)
+        start_time, end_time = get_hourly_range_for_last_open_day(symbol)
         interval = "OneMinute"
 
     elif period == "5d":
-        start_time, end_time = get_daily_range_for_period(market, "5d")
+        start_time, end_time = get_daily_range_for_period(symbol, "5d")
         interval = "OneHour"
 
     elif period in ["1mo", "3mo", "6mo", "1y", "ytd"]:
-        start_time, end_time = get_daily_range_for_period(market, period)
+        start_time, end_time = get_daily_range_for_period(symbol, period)
         interval = "OneDay"
 
     elif period == "5y":
-        start_time, end_time = get_daily_range_for_period(market, "5y")
+        start_time, end_time = get_daily_range_for_period(symbol, "5y")
         interval = "OneWeek"
 
     elif period == "max":
-        start_time, end_time = get_daily_range_for_period(market, "max")
+        start_time, end_time = get_daily_range_for_period(symbol, "max")
         interval = "OneMonth"
 
     else:
         raise ValueError(f"Unsupported period: {period}")
 
+    headers = {"Authorization": f"Bearer {access_token}"}
     symbol_id = await get_symbol_id(symbol, api_server, headers)
+    candles = await _fetch_candles(symbol_id, start_time, end_time, interval, headers, api_server)
+    if not candles:
+        raise ValueError(f"No data found for {symbol} between {start_time} and {end_time}")
 
+    return _candles_to_frame(candles)
+
+async def fetch_price_range(symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
+    """
+    Fetch candles between start and end (now if omitted), or the full history
+    since 2000 when start is omitted; empty DataFrame if there are none.
+    """
+    result = (await fetch_price_ranges([symbol], interval, start, end))[symbol]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+async def fetch_price_ranges(symbols: list, interval: str, start=None, end=None) -> dict:
+    """
+    Fetch candles for several symbols; returns {symbol: DataFrame or exception}.
+    Symbol IDs are resolved in bulk and every candle request runs concurrently
+    over the shared connection pool.
+    """
+    if interval not in INTERVAL_MAP:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+    access_token, api_server = await get_access_token()
+    headers = {"Authorization": f"Bearer {access_token}"}
+    symbol_ids = await get_symbol_ids(symbols, api_server, headers)
+
+    start_time = _to_utc(start) if start is not None else pd.Timestamp(HISTORY_START, tz="UTC")
+    end_time = _to_utc(end) if end is not None else pd.Timestamp.now(tz="UTC")
+
+    # Questrade returns at most 2000 candles per call, so long ranges are
+    # requested as consecutive windows and stitched back together
+    window = CANDLE_WINDOWS[interval]
+    ranges = []
+    while start_time < end_time:
+        ranges.append((start_time, min(start_time + window, end_time)))
+        start_time += window
+
+    async def _fetch_symbol(symbol_id):
+        chunks = await asyncio.gather(*(
+            _fetch_candles(symbol_id, s, e, INTERVAL_MAP[interval], headers, api_server)
+            for s, e in ranges
+        ))
+        return _candles_to_frame([candle for chunk in chunks for candle in chunk])
+
+    known = [symbol for symbol in symbols if symbol_ids[symbol] is not None]
+    frames = await asyncio.gather(*(_fetch_symbol(symbol_ids[symbol]) for symbol in known), return_exceptions=True)
+
+    results = {symbol: ValueError(f"Symbol not found: {symbol}") for symbol in symbols}
+    results.update(zip(known, frames))
+    return results
+
+def _to_utc(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+async def _fetch_candles(symbol_id, start_time, end_time, interval, headers, api_server) -> list:
     url = f"{api_server}v1/markets/candles/{symbol_id}"
     params = {
         "startTime": start_time.isoformat(),
@@ -47,16 +126,13 @@ async def fetch_stock_prices(symbol: str, period: str):
         "interval": interval,
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers, params=params)
+    response = await get_client().get(url, headers=headers, params=params)
     response.raise_for_status()
-    candle_data = response.json()
-
-    if "candles" not in candle_data or not candle_data["candles"]:
-        raise ValueError(f"No data found for {symbol} between {start_time} and {end_time}")
+    return response.json().get("candles") or []
 
+def _candles_to_frame(candles: list) -> pd.DataFrame:
     results = []
-    for candle in candle_data["candles"]:
+    for candle in candles:
         results.append({
             "Date": candle["start"],
             "Open": candle["open"],
@@ -66,34 +142,43 @@ async def fetch_stock_prices(symbol: str, period: str):
             "Volume": candle["volume"],
         })
 
-    df = pd.DataFrame(results)
-    return df
+    return pd.DataFrame(results, columns=["Date", "Open", "High", "Low", "Close", "Volume"])
 
 async def fetch_stock_details(symbol: str) -> dict:
+    symbol_id, api_server, headers = await _resolve(symbol)
+    # Details and quote are independent, so issue them together
+    fundamentals, quote = await asyncio.gather(
+        _fetch_fundamentals(symbol, symbol_id, api_server, headers),
+        _fetch_quote(symbol, symbol_id, api_server, headers),
+    )
+    return {**fundamentals, **quote}
+
+async def fetch_stock_fundamentals(symbol: str) -> dict:
+    symbol_id, api_server, headers = await _resolve(symbol)
+    return await _fetch_fundamentals(symbol, symbol_id, api_server, headers)
+
+async def fetch_stock_quote(symbol: str) -> dict:
+    symbol_id, api_server, headers = await _resolve(symbol)
+    return await _fetch_quote(symbol, symbol_id, api_server, headers)
+
+async def _resolve(symbol: str):
     access_token, api_server = await get_access_token()
     headers = {'Authorization': f'Bearer {access_token}'}
-    
+
     try:
         symbol_id = await get_symbol_id(symbol, api_server, headers)
-    except Exception as e:
+    except ValueError as e:
+        # Transport and HTTP errors propagate as they are, so they count against the provider's health
         raise ValueError(f"Failed to fetch symbol ID for {symbol}: {e}")
+    return symbol_id, api_server, headers
 
-    async with httpx.AsyncClient() as client:
-        # Fetch details
-        details_resp = await client.get(f"{api_server}v1/symbols/{symbol_id}", headers=headers)
-        details_resp.raise_for_status()
-        symbols_data = details_resp.json().get("symbols", [])
-        if not symbols_data:
-            raise ValueError(f"No symbol details returned for {symbol}")
-        details = symbols_data[0]
-
-        # Fetch quote
-        quotes_resp = await client.get(f"{api_server}v1/markets/quotes/{symbol_id}", headers=headers)
-        quotes_resp.raise_for_status()
-        quotes_data = quotes_resp.json().get("quotes", [])
-        if not quotes_data:
-            raise ValueError(f"No quote data returned for {symbol}")
-        quotes = quotes_data[0]
+async def _fetch_fundamentals(symbol, symbol_id, api_server, headers) -> dict:
+    details_resp = await get_client().get(f"{api_server}v1/symbols/{symbol_id}", headers=headers)
+    details_resp.raise_for_status()
+    symbols_data = details_resp.json().get("symbols", [])
+    if not symbols_data:
+        raise ValueError(f"No symbol details returned for {symbol}")
+    details = symbols_data[0]
 
     return {
         "symbol": details.get("symbol"),
@@ -109,12 +194,22 @@ async def fetch_stock_details(symbol: str) -> dict:
         "marketCap": details.get("marketCap"),
         "outstandingShares": details.get("outstandingShares"),
         "exDividendDate": details.get("exDate"),
+        "high52w": details.get("highPrice52"),
+        "low52w": details.get("lowPrice52"),
+    }
+
+async def _fetch_quote(symbol, symbol_id, api_server, headers) -> dict:
+    quotes_resp = await get_client().get(f"{api_server}v1/markets/quotes/{symbol_id}", headers=headers)
+    quotes_resp.raise_for_status()
+    quotes_data = quotes_resp.json().get("quotes", [])
+    if not quotes_data:
+        raise ValueError(f"No quote data returned for {symbol}")
+    quotes = quotes_data[0]
+
+    return {
         "open": quotes.get("openPrice"),
         "high": quotes.get("highPrice"),
         "low": quotes.get("lowPrice"),
         "lastTradePrice": quotes.get("lastTradePrice"),
         "volume": quotes.get("volume"),
-        "high52w": details.get("highPrice52"),
-        "low52w": details.get("lowPrice52"),
     }
-
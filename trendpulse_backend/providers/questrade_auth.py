@@ -1,9 +1,13 @@
 import os
 import json
 import time
-import httpx
+import asyncio
+import diskcache # type: ignore
 
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), "questrade_config.json")
+from providers.questrade_client import get_client
+
+CONFIG_FILE = os.getenv("QUESTRADE_CONFIG_FILE", os.path.join(os.path.dirname(__file__), "questrade_config.json"))
+LOGIN_SERVER = os.getenv("QUESTRADE_LOGIN_SERVER", "https://login.questrade.com/")
 
 # Internal singleton-style cache
 _auth_cache = {
@@ -14,6 +18,17 @@ _auth_cache = {
     "refresh_token": None,
 }
 
+# Persistent symbol -> symbolId map shared by every worker
+SYMBOL_CACHE_DIR = "./trendpulse_cache/questrade_symbols"
+SYMBOL_ID_TTL_SECONDS = 30 * 24 * 3600
+SYMBOL_ID_NEGATIVE_TTL_SECONDS = 24 * 3600
+SYMBOL_LOOKUP_CHUNK = 100  # names per v1/symbols call
+_symbol_cache = None
+_MISSING = object()
+
+# Refresh tokens are single-use, so concurrent requests must not refresh in parallel
+_refresh_lock = asyncio.Lock()
+
 
 def _load_config():
     if not os.path.exists(CONFIG_FILE):
@@ -45,41 +60,90 @@ async def get_access_token():
     if _auth_cache["refresh_token"] is None:
         _load_config()
 
-    now = time.time()
-    expires_at = _auth_cache["token_timestamp"] + _auth_cache["expires_in"] - 60  # 60s early
-    if _auth_cache["access_token"] and now < expires_at:
+    if _token_valid():
         return _auth_cache["access_token"], _auth_cache["api_server"]
 
-    # Refresh token
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://login.questrade.com/oauth2/token",
+    async with _refresh_lock:
+        # Another request may have refreshed the token while we waited
+        if _token_valid():
+            return _auth_cache["access_token"], _auth_cache["api_server"]
+
+        response = await get_client().get(
+            f"{LOGIN_SERVER}oauth2/token",
             params={
                 "grant_type": "refresh_token",
                 "refresh_token": _auth_cache["refresh_token"]
             }
         )
-    response.raise_for_status()
-    data = response.json()
-
-    _auth_cache.update({
-        "access_token": data["access_token"],
-        "refresh_token": data["refresh_token"],
-        "api_server": data["api_server"],
-        "expires_in": data["expires_in"],
-        "token_timestamp": time.time(),
-    })
-    _save_config()
+        response.raise_for_status()
+        data = response.json()
+
+        _auth_cache.update({
+            "access_token": data["access_token"],
+            "refresh_token": data["refresh_token"],
+            "api_server": data["api_server"],
+            "expires_in": data["expires_in"],
+            "token_timestamp": time.time(),
+        })
+        _save_config()
     return _auth_cache["access_token"], _auth_cache["api_server"]
 
 
+def _token_valid() -> bool:
+    expires_at = _auth_cache["token_timestamp"] + _auth_cache["expires_in"] - 60  # 60s early
+    return bool(_auth_cache["access_token"]) and time.time() < expires_at
+
+
 async def get_symbol_id(symbol: str, api_server: str, headers: dict) -> int:
-    url = f"{api_server}v1/symbols?names={symbol}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-    response.raise_for_status()
-    data = response.json()
-    for sym in data.get("symbols", []):
-        if sym["symbol"].upper() == symbol.upper():
-            return sym["symbolId"]
-    raise ValueError(f"Symbol not found: {symbol}")
+    ids = await get_symbol_ids([symbol], api_server, headers)
+    if ids[symbol] is None:
+        raise ValueError(f"Symbol not found: {symbol}")
+    return ids[symbol]
+
+
+async def get_symbol_ids(symbols: list, api_server: str, headers: dict) -> dict:
+    """
+    Resolve many tickers to Questrade symbol IDs, returning {symbol: id or None}.
+
+    IDs practically never change, so they are kept in a persistent cache with
+    a long TTL; unknown tickers are cached as None for a shorter time. Only
+    the names missing from the cache are looked up, in as few
+    `v1/symbols?names=` calls as possible.
+    """
+    cache = _get_symbol_cache()
+    results = {}
+    missing = []
+    for symbol in symbols:
+        cached = cache.get(symbol.upper(), default=_MISSING)
+        if cached is _MISSING:
+            missing.append(symbol)
+        else:
+            results[symbol] = cached
+
+    if missing:
+        chunks = [missing[i:i + SYMBOL_LOOKUP_CHUNK] for i in range(0, len(missing), SYMBOL_LOOKUP_CHUNK)]
+        responses = await asyncio.gather(*(
+            get_client().get(f"{api_server}v1/symbols", params={"names": ",".join(chunk)}, headers=headers)
+            for chunk in chunks
+        ))
+
+        found = {}
+        for response in responses:
+            response.raise_for_status()
+            for sym in response.json().get("symbols", []):
+                found.setdefault(sym["symbol"].upper(), sym["symbolId"])
+
+        for symbol in missing:
+            symbol_id = found.get(symbol.upper())
+            ttl = SYMBOL_ID_TTL_SECONDS if symbol_id is not None else SYMBOL_ID_NEGATIVE_TTL_SECONDS
+            cache.set(symbol.upper(), symbol_id, expire=ttl)
+            results[symbol] = symbol_id
+
+    return results
+
+
+def _get_symbol_cache():
+    global _symbol_cache
+    if _symbol_cache is None:
+        _symbol_cache = diskcache.Cache(SYMBOL_CACHE_DIR)
+    return _symbol_cache
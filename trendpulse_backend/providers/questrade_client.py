@@ -0,0 +1,43 @@
+import os
+import importlib.util
+import httpx
+
+# Connection pool settings, overridable from the environment (.env)
+MAX_CONNECTIONS = int(os.getenv("QUESTRADE_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("QUESTRADE_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("QUESTRADE_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("QUESTRADE_CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("QUESTRADE_TIMEOUT", "15"))
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Shared keep-alive client for the Questrade login and API servers, so
+    token refreshes, symbol lookups and candle calls reuse pooled TCP/TLS
+    connections instead of handshaking on every call.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+        )
+    return _client
+
+
+async def aclose():
+    """Close the shared client; called from the FastAPI lifespan on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,7 +1,6 @@
 import os
 import json
 import time
-import httpx
 from threading import Lock
 
 # Automatically points to providers/questrade_config.json
@@ -35,15 +34,15 @@ class QuestradeAuth:
         if time.time() < token_expiry and self.config.get("access_token"):
             return self.config["access_token"], self.config["api_server"]
 
-        # Refresh required
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://login.questrade.com/oauth2/token",
-                params={
-                    "grant_type": "refresh_token",
-                    "refresh_token": self.config["refresh_token"]
-                }
-            )
+        # Refresh required; imported here so the CLI below runs without the package
+        from providers.questrade_client import get_client
+        response = await get_client().get(
+            "https://login.questrade.com/oauth2/token",
+            params={
+                "grant_type": "refresh_token",
+                "refresh_token": self.config["refresh_token"]
+            }
+        )
         response.raise_for_status()
         data = response.json()
 
@@ -0,0 +1,237 @@
+import os
+import zlib
+import random
+import asyncio
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+from services.bars import Bars, INTRADAY_INTERVALS, NS_PER_DAY, NS_PER_MINUTE, slice_period, resample, resample_intraday
+from utils.market_utils import get_market_calendar, get_market_from_symbol
+
+# Deterministic offline market data for load tests and benchmarks.
+# Select it with TRENDPULSE_PROVIDER=synthetic; tune it from the environment.
+LATENCY_MS = float(os.getenv("SYNTHETIC_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("SYNTHETIC_JITTER_MS", "20"))
+ERROR_RATE = float(os.getenv("SYNTHETIC_ERROR_RATE", "0"))
+HISTORY_DAYS = int(os.getenv("SYNTHETIC_HISTORY_DAYS", str(25 * 252)))
+SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+WALK_START = "1990-01-01"
+
+# Optional diskcache directory where upstream calls are counted across workers
+STATS_DIR = os.getenv("SYNTHETIC_STATS_DIR")
+
+PERIOD_INTERVALS = {
+    "1d": "1m", "5d": "1h", "1mo": "1d", "3mo": "1d", "6mo": "1d",
+    "1y": "1d", "ytd": "1d", "5y": "1wk", "max": "1mo",
+}
+PERIOD_SESSIONS = {"1d": 1, "5d": 5}
+
+_rng = random.Random(SEED)
+_stats = None
+
+
+def symbol_seed(symbol: str) -> int:
+    return zlib.crc32(symbol.upper().encode()) ^ SEED
+
+
+def daily_history(symbol: str, end=None) -> pd.DataFrame:
+    """
+    HISTORY_DAYS business-day bars for `symbol` ending on the last business
+    day up to `end` (default today, UTC). The same symbol always yields the
+    same prices for the same dates. Treat the result as read-only.
+    """
+    end = pd.Timestamp(end if end is not None else pd.Timestamp.now(tz="UTC"))
+    end = (end.tz_convert("UTC").tz_localize(None) if end.tzinfo else end).normalize()
+    return _history(symbol.upper(), end).tail(HISTORY_DAYS).reset_index(drop=True)
+
+
+@lru_cache(maxsize=1024)
+def _history(symbol: str, end: pd.Timestamp) -> pd.DataFrame:
+    # The walk always starts at WALK_START and one row-major draw keeps every
+    # column's prefix identical for any length, so published bars never
+    # change as `end` moves forward
+    dates = pd.bdate_range(WALK_START, end)
+    z = np.random.default_rng(symbol_seed(symbol)).standard_normal((len(dates), 4))
+    start_price = 20 + symbol_seed(symbol) % 480
+
+    close = start_price * np.exp(np.cumsum(0.0002 + 0.015 * z[:, 0]))
+    open_ = np.concatenate([[start_price], close[:-1]]) * np.exp(0.003 * z[:, 1])
+    spread = np.abs(0.008 * z[:, 2]) * close
+    return pd.DataFrame({
+        "Date": dates.tz_localize("UTC"),
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": (2_000_000 * np.exp(0.8 * z[:, 3])).astype(np.int64),
+    })
+
+
+@lru_cache(maxsize=4096)
+def _session_minutes(symbol: str, session_open: int, session_close: int) -> Bars:
+    # Bridges the day's daily Open to its Close, so intraday and daily charts agree
+    day = pd.Timestamp(session_open, tz="UTC").tz_localize(None).normalize()
+    bar = daily_history(symbol, day).iloc[-1]
+    size = int((session_close - session_open) // NS_PER_MINUTE)
+    z = np.random.default_rng([symbol_seed(symbol), int(day.value // NS_PER_MINUTE)]).standard_normal((size, 4))
+
+    steps = np.arange(1, size + 1) / size
+    walk = np.cumsum(0.0008 * z[:, 0])
+    start, end = np.log(bar["Open"]), np.log(bar["Close"])
+    close = np.exp(start + (end - start) * steps + walk - steps * walk[-1])
+    open_ = np.concatenate([[bar["Open"]], close[:-1]])
+    spread = np.abs(0.0004 * z[:, 1:3]) * close[:, None]
+    return Bars(
+        session_open + np.arange(size, dtype=np.int64) * NS_PER_MINUTE,
+        open_,
+        np.maximum(open_, close) + spread[:, 0],
+        np.minimum(open_, close) - spread[:, 1],
+        close,
+        (bar["Volume"] / size * np.exp(0.5 * z[:, 3])).astype(np.int64),
+    ).freeze()
+
+
+def intraday_history(symbol: str, interval: str, start, end=None) -> pd.DataFrame:
+    """
+    Intraday bars for every session of the symbol's market between `start`
+    and `end` (default now), up to the current minute. Minute bars are a
+    deterministic walk per symbol and session; coarser intervals are
+    aggregated from them.
+    """
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    now = pd.Timestamp.now(tz="UTC").value
+    start = _timestamp(start).value
+    end = min(_timestamp(end).value, now) if end is not None else now
+    calendar = get_market_calendar(get_market_from_symbol(symbol))
+
+    parts = []
+    i = calendar.first_session_from(start // NS_PER_DAY)
+    while True:
+        session_open, session_close = (t.value for t in calendar.session_hours(i))
+        if session_open > end:
+            break
+        minutes = _session_minutes(symbol.upper(), session_open, session_close)
+        lo, hi = np.searchsorted(minutes.time, [start, end])
+        bars = resample_intraday(minutes.take(int(lo), int(hi)), interval, session_open)
+        if not bars.is_empty:
+            parts.append(bars.to_frame())
+        i += 1
+    if not parts:
+        return pd.DataFrame(columns=["Date", "Open", "High", "Low", "Close", "Volume"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def _timestamp(value) -> pd.Timestamp:
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+
+async def _upstream(symbol: str):
+    """Simulate one upstream call: latency with jitter, random failures, counting."""
+    delay = max(0.0, LATENCY_MS + _rng.uniform(-JITTER_MS, JITTER_MS)) / 1000
+    await asyncio.sleep(delay)
+    _count("upstream_calls")
+    if ERROR_RATE and _rng.random() < ERROR_RATE:
+        _count("upstream_errors")
+        raise ConnectionError(f"Synthetic upstream error for {symbol}")
+
+
+def _count(key: str):
+    global _stats
+    if not STATS_DIR:
+        return
+    if _stats is None:
+        import diskcache  # type: ignore
+        _stats = diskcache.Cache(STATS_DIR)
+    _stats.incr(key, default=0)
+
+
+def _frame_range(symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
+    if interval in INTRADAY_INTERVALS:
+        if start is None:
+            raise ValueError("Intraday bars need a start time")
+        return intraday_history(symbol, interval, start, end)
+    df = daily_history(symbol, end)
+    if start is not None:
+        df = df[df["Date"] >= _timestamp(start).normalize()]
+    if interval == "1d":
+        return df.reset_index(drop=True)
+    if interval in ("1wk", "1mo"):
+        return resample(Bars.from_frame(df), interval).to_frame()
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+async def fetch_stock_prices(symbol: str, period: str) -> pd.DataFrame:
+    if period not in PERIOD_INTERVALS:
+        raise ValueError(f"Unsupported period: {period}")
+    await _upstream(symbol)
+    if period in PERIOD_SESSIONS:
+        calendar = get_market_calendar(get_market_from_symbol(symbol))
+        first, _ = calendar.session_hours(max(calendar.last_open() - PERIOD_SESSIONS[period] + 1, 0))
+        return intraday_history(symbol, PERIOD_INTERVALS[period], first)
+    bars = slice_period(Bars.from_frame(daily_history(symbol)), period)
+    return resample(bars, PERIOD_INTERVALS[period]).to_frame()
+
+
+async def fetch_price_range(symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
+    await _upstream(symbol)
+    return _frame_range(symbol, interval, start, end)
+
+
+async def fetch_price_ranges(symbols: list, interval: str, start=None, end=None) -> dict:
+    """One simulated call for the whole batch, like yfinance's download."""
+    await _upstream(",".join(symbols))
+    return {symbol: _frame_range(symbol, interval, start, end) for symbol in symbols}
+
+
+async def fetch_stock_fundamentals(symbol: str) -> dict:
+    await _upstream(symbol)
+    return fundamentals(symbol)
+
+
+async def fetch_stock_quote(symbol: str) -> dict:
+    await _upstream(symbol)
+    return quote(symbol)
+
+
+async def fetch_stock_details(symbol: str) -> dict:
+    details, latest = await asyncio.gather(fetch_stock_fundamentals(symbol), fetch_stock_quote(symbol))
+    return {**details, **latest}
+
+
+def fundamentals(symbol: str) -> dict:
+    df = daily_history(symbol).tail(252)
+    seed = symbol_seed(symbol)
+    shares = 50_000_000 + seed % 5_000_000_000
+    close = float(df["Close"].iloc[-1])
+    return {
+        "symbol": symbol.upper(),
+        "name": f"Synthetic {symbol.upper()} Inc.",
+        "sector": ("Technology", "Financials", "Energy", "Health Care", "Industrials")[seed % 5],
+        "listingExchange": "SYNTH",
+        "securityType": "EQUITY",
+        "currency": "USD",
+        "dividend": round((seed % 300) / 100, 2),
+        "dividendYield": round((seed % 300) / 100 / close, 4),
+        "peRatio": round(5 + seed % 40 + (seed % 100) / 100, 2),
+        "eps": round(close / (5 + seed % 40), 2),
+        "marketCap": int(shares * close),
+        "outstandingShares": shares,
+        "exDividendDate": None,
+        "high52w": float(df["High"].max()),
+        "low52w": float(df["Low"].min()),
+    }
+
+
+def quote(symbol: str) -> dict:
+    last = daily_history(symbol).iloc[-1]
+    return {
+        "open": float(last["Open"]),
+        "high": float(last["High"]),
+        "low": float(last["Low"]),
+        "lastTradePrice": float(last["Close"]),
+        "volume": int(last["Volume"]),
+    }
+
@@ -1,6 +1,10 @@
 import yfinance as yf
 import pandas as pd
 import asyncio
+from yfinance.exceptions import YFRateLimitError
+
+# Errors the provider router counts against yfinance's health besides transport errors
+UPSTREAM_ERRORS = (YFRateLimitError,)
 
 
 async def fetch_stock_prices(symbol: str, period: str) -> pd.DataFrame:
@@ -9,8 +13,8 @@ async def fetch_stock_prices(symbol: str, period: str) -> pd.DataFrame:
     """
 
     interval_map = {
-        "1d": "1d",
-        "5d": "1d",
+        "1d": "1m",
+        "5d": "1h",
         "1mo": "1d",
         "3mo": "1d",
         "6mo": "1d",
@@ -31,15 +35,75 @@ async def fetch_stock_prices(symbol: str, period: str) -> pd.DataFrame:
         if df.empty:
             raise ValueError(f"No price data found for {symbol} with period {period}")
         df.reset_index(inplace=True)
+        # Intraday intervals index bars by "Datetime"
+        df = df.rename(columns={"Datetime": "Date"})
         df = df[["Date", "Open", "High", "Low", "Close", "Volume"]]
         return df
 
     return await asyncio.to_thread(_get_history)
 
 
-async def fetch_stock_details(symbol: str) -> dict:
+async def fetch_price_range(symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
     """
-    Asynchronously fetch stock details using yfinance.
+    Asynchronously fetch bars between start and end (now if omitted), or the
+    full available history when start is omitted.
+    Returns an empty DataFrame when no bars fall in the range.
+    """
+
+    def _get_range():
+        ticker = yf.Ticker(symbol)
+        if start is None:
+            df = ticker.history(period="max", interval=interval)
+        else:
+            df = ticker.history(start=start, end=end, interval=interval)
+        if df.empty:
+            return pd.DataFrame(columns=["Date", "Open", "High", "Low", "Close", "Volume"])
+        df.reset_index(inplace=True)
+        df = df.rename(columns={"Datetime": "Date"})
+        df = df[["Date", "Open", "High", "Low", "Close", "Volume"]]
+        return df
+
+    return await asyncio.to_thread(_get_range)
+
+
+async def fetch_price_ranges(symbols: list, interval: str, start=None, end=None) -> dict:
+    """
+    Download several tickers in one yfinance call. Returns {symbol: DataFrame},
+    with an empty DataFrame for tickers that returned no bars.
+    """
+
+    def _download():
+        kwargs = {"period": "max"} if start is None else {"start": start, "end": end}
+        # ignore_tz=False keeps exchange-local timestamps like Ticker.history,
+        # so bars from either path land on the same keys when merged
+        data = yf.download(
+            symbols,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=True,
+            progress=False,
+            **kwargs,
+        )
+
+        results = {}
+        for symbol in symbols:
+            if data.empty or symbol not in data.columns.get_level_values(0):
+                results[symbol] = pd.DataFrame(columns=["Date", "Open", "High", "Low", "Close", "Volume"])
+                continue
+            # Tickers are aligned on a shared index, so drop the rows this one has no bar for
+            df = data[symbol].dropna(how="all").reset_index()
+            df = df.rename(columns={"Datetime": "Date"})
+            results[symbol] = df[["Date", "Open", "High", "Low", "Close", "Volume"]]
+        return results
+
+    return await asyncio.to_thread(_download)
+
+
+async def fetch_stock_fundamentals(symbol: str) -> dict:
+    """
+    Asynchronously fetch slow-changing stock details using yfinance.
     """
 
     def _get_info():
@@ -62,13 +126,40 @@ async def fetch_stock_details(symbol: str) -> dict:
             "marketCap": info.get("marketCap"),
             "outstandingShares": info.get("sharesOutstanding"),
             "exDividendDate": pd.to_datetime(info.get("exDividendDate"), unit='s') if info.get("exDividendDate") else None,
-            "open": info.get("open"),
-            "high": info.get("dayHigh"),
-            "low": info.get("dayLow"),
-            "lastTradePrice": info.get("regularMarketPrice"),
-            "volume": info.get("volume"),
             "high52w": info.get("fiftyTwoWeekHigh"),
             "low52w": info.get("fiftyTwoWeekLow"),
         }
 
     return await asyncio.to_thread(_get_info)
+
+async def fetch_stock_quote(symbol: str) -> dict:
+    """
+    Asynchronously fetch the current session's quote using yfinance's
+    fast_info, which avoids the slow `info` scrape.
+    """
+
+    def _number(value, cast=float):
+        return cast(value) if value is not None and pd.notna(value) else None
+
+    def _get_quote():
+        fast = yf.Ticker(symbol).fast_info
+        last_price = fast.last_price
+        if last_price is None:
+            raise ValueError(f"No quote found for symbol {symbol}")
+
+        return {
+            "open": _number(fast.open),
+            "high": _number(fast.day_high),
+            "low": _number(fast.day_low),
+            "lastTradePrice": _number(last_price),
+            "volume": _number(fast.last_volume, int),
+        }
+
+    return await asyncio.to_thread(_get_quote)
+
+async def fetch_stock_details(symbol: str) -> dict:
+    """
+    Asynchronously fetch stock details and quote using yfinance.
+    """
+    fundamentals, quote = await asyncio.gather(fetch_stock_fundamentals(symbol), fetch_stock_quote(symbol))
+    return {**fundamentals, **quote}
@@ -0,0 +1,145 @@
+import os
+import mmap
+import glob
+import time
+import uuid
+import struct
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+from services.bars import Bars
+
+logger = logging.getLogger(__name__)
+
+# File layout (little endian):
+#   64-byte header: magic, format version, price item size, row count, last update (epoch ns),
+#                   last full history load (epoch ns; zero padding in older files)
+#   time    int64[rows]   bar start, epoch ns UTC
+#   volume  int64[rows]
+#   open, high, low, close  float64 or float32 [rows]
+# The int64 columns come first so every column stays naturally aligned.
+MAGIC = b"TPBARS\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIqqq")
+HEADER_SIZE = 64
+FILE_SUFFIX = ".bars"
+
+# Windows cannot replace a file while it is mapped, so there bar files are
+# read into memory instead, and a replace that races a reader is retried
+MMAP_READS = os.name != "nt"
+REPLACE_ATTEMPTS = 5
+REPLACE_RETRY_SECONDS = 0.01
+
+
+def write_bars(path: str, bars: Bars, updated: datetime, price_dtype=np.float64, loaded: datetime = None):
+    """
+    Write bars to `path` atomically; `loaded` (default `updated`) is when
+    the full history was last fetched. Readers that already mapped the previous
+    file keep a consistent view of it until they drop their arrays. Raises
+    PermissionError if the file stays locked (Windows only).
+    """
+    price_dtype = np.dtype(price_dtype)
+    header = HEADER.pack(MAGIC, VERSION, price_dtype.itemsize, 0, len(bars), _to_ns(updated),
+                         _to_ns(loaded or updated))
+
+    # Unique per writer, so threads of one process never share a temporary file
+    tmp_path = f"{path}.{os.getpid()}-{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(np.ascontiguousarray(bars.time, dtype="<i8").tobytes())
+        f.write(np.ascontiguousarray(bars.volume, dtype="<i8").tobytes())
+        for name in ("open", "high", "low", "close"):
+            f.write(np.ascontiguousarray(getattr(bars, name), dtype=price_dtype.newbyteorder("<")).tobytes())
+    replace_file(tmp_path, path)
+
+
+def replace_file(tmp_path: str, path: str):
+    """`os.replace`, retried briefly while another process has `path` open (Windows)."""
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                os.remove(tmp_path)
+                raise
+            time.sleep(REPLACE_RETRY_SECONDS * (attempt + 1))
+
+
+def read_bars(path: str):
+    """
+    Memory-map a bar file and return (bars, updated, loaded), or None if the file is
+    missing or was written by another format version. The returned columns
+    are read-only views on the mapping; nothing is copied or parsed. Without
+    MMAP_READS the file is read into memory instead.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            return None
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if MMAP_READS else f.read()
+
+    magic, version, price_size, _, rows, updated_ns, loaded_ns = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION or price_size not in (4, 8):
+        logger.warning(f"Ignoring bar file {path} with unknown format")
+        return None
+
+    price_dtype = np.dtype(f"<f{price_size}")
+    expected = HEADER_SIZE + rows * (16 + 4 * price_dtype.itemsize)
+    if len(buffer) < expected:
+        logger.warning(f"Ignoring truncated bar file {path}")
+        return None
+
+    offset = HEADER_SIZE
+    columns = []
+    for dtype in (np.dtype("<i8"), np.dtype("<i8"), price_dtype, price_dtype, price_dtype, price_dtype):
+        columns.append(np.frombuffer(buffer, dtype=dtype, count=rows, offset=offset))
+        offset += rows * dtype.itemsize
+
+    time, volume, open_, high, low, close = columns
+    updated = datetime.fromtimestamp(updated_ns / 1e9, tz=timezone.utc)
+    loaded = datetime.fromtimestamp(loaded_ns / 1e9, tz=timezone.utc)
+    return Bars(time, open_, high, low, close, volume), updated, loaded
+
+
+def _to_ns(value: datetime) -> int:
+    return int(value.timestamp() * 1_000_000) * 1000
+
+
+class BarFileStore:
+    """
+    Directory of memory-mapped bar files, one per cache key. Exposes the same
+    get/set/clear shape as the disk cache entries used by `BarStore`, so the
+    OS page cache is shared by every worker reading the same symbol.
+    """
+
+    def __init__(self, directory: str, price_dtype=np.float64):
+        self.directory = directory
+        self.price_dtype = price_dtype
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{FILE_SUFFIX}")
+
+    def get(self, key: str):
+        result = read_bars(self.path(key))
+        if result is None:
+            return None
+        bars, updated, loaded = result
+        return {"bars": bars, "updated": updated, "loaded": loaded}
+
+    def set(self, key: str, entry: dict):
+        """Write an entry; blocking, so async callers run it in a thread."""
+        write_bars(self.path(key), entry["bars"], entry["updated"], self.price_dtype, entry.get("loaded"))
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, f"*{FILE_SUFFIX}")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,362 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from services.bars import (
+    Bars, PERIOD_INTERVALS, PERIOD_SESSIONS, INTRADAY_INTERVALS, period_intervals, slice_period, resample,
+)
+from services.memory_cache import MemoryCache
+from services.bar_file import BarFileStore
+from services.single_flight import SingleFlight
+from services.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Stored bars refetched with every refresh, to notice a re-adjusted history
+REFRESH_OVERLAP = 5
+
+
+class BarStore:
+    """
+    Append-only price cache holding one canonical daily history per symbol.
+
+    The first request for a symbol loads its full daily history. Once the
+    entry expires, only the last REFRESH_OVERLAP stored bars onwards are
+    fetched, so the still-forming last bar is replaced and new bars are
+    appended without downloading the whole history again. Providers that
+    adjust prices for splits and dividends rewrite the whole history when
+    one happens; if the refetched overlap no longer matches the stored
+    bars, the full history is reloaded instead. With `full_reload`, it is
+    also reloaded whenever the last full load is older than that.
+
+    Expiry comes from `expiry(symbol, updated, ttl)`, which lets market
+    hours decide: bars fetched after the close stay valid until the next open
+    instead of being refetched every `ttl`. Without it entries expire after
+    `ttl`.
+
+    With `max_stale`, an entry that expired less than `max_stale` ago is
+    served as-is while it is refreshed in the background
+    (stale-while-revalidate), so only cold symbols wait on an upstream call.
+
+    Every chart period is sliced from that series by binary search, and the
+    weekly and monthly intervals are resampled from it locally. Intraday
+    intervals are delegated to `intraday`, an `IntradayStore`.
+
+    Entries live in an in-process `MemoryCache` (L1) holding read-only
+    arrays, in front of memory-mapped bar files (L2) that survive restarts
+    and share the OS page cache across workers. Misses and refreshes go
+    through `SingleFlight`, so a burst of requests for an expiring symbol
+    costs one upstream call per symbol rather than one per request.
+    """
+
+    def __init__(self, disk: BarFileStore, fetcher, ttl: timedelta, memory: MemoryCache, flight: SingleFlight,
+                 expiry=None, max_stale: timedelta = None, intraday=None, full_reload: timedelta = None):
+        self.disk = disk
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.memory = memory
+        self.flight = flight
+        self.expiry = expiry
+        self.max_stale = max_stale
+        self.intraday = intraday
+        self.full_reload = full_reload
+        self._background = set()  # running revalidation tasks
+
+    @staticmethod
+    def make_key(symbol: str, interval: str = "1d") -> str:
+        return f"{symbol}-{interval}-bars"
+
+    def resolve_interval(self, period: str, interval: str = None) -> str:
+        """The interval to serve `period` at: `interval` if given and allowed, else the period's default."""
+        interval = interval or PERIOD_INTERVALS.get(period)
+        if interval not in period_intervals(period):
+            raise ValueError(f"Unsupported interval {interval} for period {period}")
+        if interval in INTRADAY_INTERVALS and self.intraday is None:
+            raise ValueError("Intraday bars are not available")
+        return interval
+
+    async def get_bars(self, symbol: str, period: str, interval: str = None) -> Bars:
+        """Bars for a chart period, at `interval` or the default in PERIOD_INTERVALS."""
+        interval = self.resolve_interval(period, interval)
+        if interval in INTRADAY_INTERVALS:
+            return await self.intraday.get_bars(symbol, interval, PERIOD_SESSIONS[period])
+        daily = await self.get_daily(symbol)
+        return resample(slice_period(daily, period), interval)
+
+    async def get_bars_many(self, symbols: list, period: str, interval: str = None) -> dict:
+        """
+        Bars for many symbols at once; returns {symbol: Bars or exception}.
+        Symbols that need an upstream call are fetched together in one batch,
+        except for intraday bars, which are fetched per symbol concurrently.
+        """
+        interval = self.resolve_interval(period, interval)
+        if interval in INTRADAY_INTERVALS:
+            results = await asyncio.gather(
+                *(self.intraday.get_bars(symbol, interval, PERIOD_SESSIONS[period]) for symbol in symbols),
+                return_exceptions=True,
+            )
+            return dict(zip(symbols, results))
+        results = await self.get_daily_many(symbols)
+        return {
+            symbol: daily if isinstance(daily, Exception) else resample(slice_period(daily, period), interval)
+            for symbol, daily in results.items()
+        }
+
+    async def get_daily_many(self, symbols: list) -> dict:
+        now = datetime.now(timezone.utc)
+        results = {}
+        pending = {}  # {key: symbol}
+        stale = {}    # {key: symbol}
+        for symbol in symbols:
+            key = self.make_key(symbol)
+            started = time.perf_counter()
+            entry = self._lookup(key, symbol, now)
+            if entry is not None and not self._expired(entry, now):
+                results[symbol] = entry["bars"]
+                result = "hit"
+            elif entry is not None and self._servable(entry, now):
+                results[symbol] = entry["bars"]
+                stale[key] = symbol
+                result = "stale"
+            else:
+                pending[key] = symbol
+                result = "miss"
+            record_cache("bars", result, time.perf_counter() - started)
+
+        if stale:
+            self._revalidate_in_background(stale)
+
+        if pending:
+            logger.info(f"Fetching {len(pending)} of {len(symbols)} symbols in one batch")
+            fetched = await self.flight.do_many(
+                list(pending),
+                lambda keys: self._load_or_refresh_many({key: pending[key] for key in keys}),
+            )
+            for key, value in fetched.items():
+                results[pending[key]] = value
+
+        return {symbol: results[symbol] for symbol in symbols}
+
+    async def _load_or_refresh_many(self, pending: dict) -> dict:
+        now = datetime.now(timezone.utc)
+        results = {}
+        loads = {}      # {symbol: key}
+        refreshes = {}  # {symbol: (key, entry)}
+        for key, symbol in pending.items():
+            entry = self._lookup(key, symbol, now, peek=True)
+            if entry is not None and not self._expired(entry, now):
+                results[key] = entry["bars"]
+            elif entry is None or self._reload_due(entry, now):
+                loads[symbol] = key
+            else:
+                refreshes[symbol] = (key, entry)
+
+        if refreshes:
+            # One shared start covers every symbol; overlapping bars are simply replaced
+            start = min(self._refresh_start(entry["bars"]) for _, entry in refreshes.values())
+            frames = await self._fetch_many(list(refreshes), start=start)
+            for symbol, (key, entry) in refreshes.items():
+                frame = frames[symbol]
+                if isinstance(frame, Exception):
+                    results[key] = frame
+                    continue
+                tail = Bars.from_frame(frame)
+                if entry["bars"].rewritten_by(tail):
+                    logger.info(f"History of {key} was re-adjusted upstream, reloading it")
+                    loads[symbol] = key
+                    continue
+                merged = entry["bars"].merge_tail(tail)
+                results[key] = (await self._store(key, symbol, merged, now, entry["loaded"]))["bars"]
+
+        if loads:
+            frames = await self._fetch_many(list(loads), start=None)
+            for symbol, key in loads.items():
+                frame = frames[symbol]
+                if isinstance(frame, Exception):
+                    results[key] = frame
+                    continue
+                bars = Bars.from_frame(frame)
+                if not bars.is_empty:
+                    bars = (await self._store(key, symbol, bars, now))["bars"]
+                results[key] = bars
+
+        return results
+
+    async def _fetch_many(self, symbols: list, start) -> dict:
+        try:
+            return await self.fetcher.fetch_price_ranges(symbols, "1d", start=start)
+        except Exception as e:
+            return {symbol: e for symbol in symbols}
+
+    async def get_daily(self, symbol: str) -> Bars:
+        key = self.make_key(symbol)
+        now = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        entry = self._lookup(key, symbol, now)
+        elapsed = time.perf_counter() - started
+        if entry is not None and not self._expired(entry, now):
+            logger.info(f"Using cached bars for {key}")
+            record_cache("bars", "hit", elapsed)
+            return entry["bars"]
+        if entry is not None and self._servable(entry, now):
+            logger.info(f"Serving stale bars for {key} while revalidating")
+            record_cache("bars", "stale", elapsed)
+            self._revalidate_in_background({key: symbol})
+            return entry["bars"]
+
+        record_cache("bars", "miss", elapsed)
+        # Concurrent misses for the same symbol share one upstream fetch
+        return await self.flight.do(key, lambda: self._load_or_refresh(key, symbol))
+
+    async def revalidate(self, symbol: str, lead: timedelta = timedelta(0)) -> Bars:
+        """
+        Load `symbol` if it is not cached, or refresh it if it expires within
+        `lead`. Used to keep hot symbols warm ahead of requests, including
+        before the open for entries that expire then.
+        """
+        key = self.make_key(symbol)
+        return await self.flight.do(key, lambda: self._load_or_refresh(key, symbol, lead))
+
+    def needs_revalidation(self, symbol: str, lead: timedelta = timedelta(0)) -> bool:
+        now = datetime.now(timezone.utc)
+        entry = self._lookup(self.make_key(symbol), symbol, now, peek=True)
+        return entry is None or self._due(entry, now, lead)
+
+    def _revalidate_in_background(self, pending: dict):
+        task = asyncio.ensure_future(self.flight.do_many(list(pending), self._revalidate_batch))
+        self._background.add(task)
+        task.add_done_callback(self._revalidated)
+
+    async def _revalidate_batch(self, keys: list) -> dict:
+        return await self._load_or_refresh_many({key: self._symbol(key) for key in keys})
+
+    def _revalidated(self, task: asyncio.Task):
+        self._background.discard(task)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f"Background revalidation failed: {str(task.exception())}")
+            return
+        for key, value in task.result().items():
+            if isinstance(value, Exception):
+                logger.error(f"Background revalidation of {key} failed: {str(value)}")
+
+    @staticmethod
+    def _symbol(key: str) -> str:
+        return key.rsplit("-", 2)[0]
+
+    async def _load_or_refresh(self, key: str, symbol: str, lead: timedelta = timedelta(0)) -> Bars:
+        now = datetime.now(timezone.utc)
+        # Re-check: another worker may have filled the entry while we waited for the lock
+        entry = self._lookup(key, symbol, now, peek=True)
+
+        if entry is None:
+            return await self._load(key, symbol, now)
+        if self._due(entry, now, lead):
+            # A refresh ahead of expiry is stamped as made at the expiry, so
+            # every worker counts the new entry as fresh from then on, e.g.
+            # bars warmed just before the open stay valid for `ttl` after it
+            return await self._refresh(key, symbol, entry, max(now, entry["expires"]))
+        return entry["bars"]
+
+    async def _load(self, key: str, symbol: str, now: datetime) -> Bars:
+        logger.info(f"Loading daily history for {key}")
+        bars = Bars.from_frame(await self.fetcher.fetch_price_range(symbol, "1d", start=None))
+        if bars.is_empty:
+            return bars
+        return (await self._store(key, symbol, bars, now))["bars"]
+
+    def next_refresh(self, symbol: str, interval: str = "1d"):
+        """When the cached bars for `symbol` will next be refreshed, or None if not cached."""
+        if interval in INTRADAY_INTERVALS:
+            return self.intraday.next_refresh(symbol) if self.intraday is not None else None
+        entry = self.memory.peek(self.make_key(symbol))
+        return entry["expires"] if entry is not None else None
+
+    def _expires_at(self, symbol: str, updated: datetime) -> datetime:
+        if self.expiry is None:
+            return updated + self.ttl
+        try:
+            return self.expiry(symbol, updated, self.ttl)
+        except Exception as e:
+            logger.warning(f"Falling back to fixed TTL for {symbol}: {str(e)}")
+            return updated + self.ttl
+
+    def _expired(self, entry: dict, now: datetime = None) -> bool:
+        return (now or datetime.now(timezone.utc)) >= entry["expires"]
+
+    def _servable(self, entry: dict, now: datetime) -> bool:
+        """Whether an expired entry may still be served while it is revalidated."""
+        return self.max_stale is not None and now < entry["expires"] + self.max_stale
+
+    @staticmethod
+    def _due(entry: dict, now: datetime, lead: timedelta) -> bool:
+        return now + lead >= entry["expires"]
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+        if self.intraday is not None:
+            self.intraday.clear()
+
+    def _lookup(self, key: str, symbol: str, now: datetime, peek: bool = False):
+        """
+        Cached entry for `key`, preferring a newer copy on disk. Re-checks and
+        scheduler probes pass `peek` so only request lookups count in the
+        memory tier's hit ratio.
+        """
+        entry = self.memory.peek(key) if peek else self.memory.get(key)
+        if entry is not None and not self._expired(entry, now):
+            return entry
+
+        # Another worker may have refreshed the shared copy since we cached ours
+        disk_entry = self.disk.get(key)
+        if disk_entry is not None and (entry is None or disk_entry["updated"] > entry["updated"]):
+            entry = {
+                "bars": disk_entry["bars"].freeze(),
+                "updated": disk_entry["updated"],
+                "expires": self._expires_at(symbol, disk_entry["updated"]),
+                "loaded": disk_entry["loaded"],
+            }
+            self.memory.set(key, entry, entry["bars"].nbytes)
+        return entry
+
+    async def _store(self, key: str, symbol: str, bars: Bars, now: datetime, loaded: datetime = None) -> dict:
+        """Cache `bars` fetched at `now`; `loaded` is when the full history was fetched, if earlier."""
+        entry = {
+            "bars": bars.freeze(),
+            "updated": now,
+            "expires": self._expires_at(symbol, now),
+            "loaded": loaded or now,
+        }
+        try:
+            # File writes block, so keep them off the event loop like the fetches
+            await asyncio.to_thread(self.disk.set, key, entry)
+        except PermissionError as e:
+            # The file stayed locked by a reader (Windows); serve from memory and write next time
+            logger.warning(f"Could not write bar file for {key}: {str(e)}")
+        self.memory.set(key, entry, bars.nbytes)
+        return entry
+
+    async def _refresh(self, key: str, symbol: str, entry: dict, now: datetime) -> Bars:
+        if self._reload_due(entry, now):
+            return await self._load(key, symbol, now)
+        bars = entry["bars"]
+        start = self._refresh_start(bars)
+        tail = Bars.from_frame(await self.fetcher.fetch_price_range(symbol, "1d", start=start))
+        logger.info(f"Fetched {len(tail)} bars for {key} since {start}")
+        if bars.rewritten_by(tail):
+            logger.info(f"History of {key} was re-adjusted upstream, reloading it")
+            return await self._load(key, symbol, now)
+        return (await self._store(key, symbol, bars.merge_tail(tail), now, entry["loaded"]))["bars"]
+
+    @staticmethod
+    def _refresh_start(bars: Bars) -> pd.Timestamp:
+        """Where a refresh starts: REFRESH_OVERLAP bars before the end, so they can be compared."""
+        return pd.Timestamp(int(bars.time[max(len(bars) - REFRESH_OVERLAP, 0)]), unit="ns", tz="UTC")
+
+    def _reload_due(self, entry: dict, now: datetime) -> bool:
+        return self.full_reload is not None and now - entry["loaded"] >= self.full_reload
@@ -0,0 +1,258 @@
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+# Default bar interval served for each chart period
+PERIOD_INTERVALS = {
+    "1d": "1m",
+    "5d": "1h",
+    "1mo": "1d",
+    "3mo": "1d",
+    "6mo": "1d",
+    "1y": "1d",
+    "ytd": "1d",
+    "5y": "1wk",
+    "max": "1mo",
+}
+
+# Calendar offsets used to slice a period out of a longer series, anchored on the last bar
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+}
+
+# Periods measured in trading sessions rather than calendar time
+PERIOD_SESSIONS = {
+    "1d": 1,
+    "5d": 5,
+}
+
+# Intraday intervals, in minutes; all are aggregated from stored minute bars
+INTRADAY_INTERVALS = {
+    "1m": 1,
+    "5m": 5,
+    "15m": 15,
+    "1h": 60,
+}
+
+# Intervals built from the daily series
+DAILY_INTERVALS = ("1d", "1wk", "1mo")
+
+
+def period_intervals(period: str) -> tuple:
+    """Intervals a chart period can be served at; intraday ones only for session periods."""
+    if period not in PERIOD_INTERVALS:
+        raise ValueError(f"Unsupported period: {period}")
+    if period in PERIOD_SESSIONS:
+        return tuple(INTRADAY_INTERVALS) + DAILY_INTERVALS
+    return DAILY_INTERVALS
+
+
+def _price_array(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype not in (np.float64, np.float32):
+        values = values.astype(np.float64)
+    return values
+
+
+class Bars:
+    """
+    Columnar OHLCV series. `time` holds bar start times as int64 nanoseconds
+    since the epoch (UTC), prices are float64 (or float32 when read from a
+    compact bar file) and volume is int64. Rows are sorted by time and unique.
+    """
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = _price_array(open)
+        self.high = _price_array(high)
+        self.low = _price_array(low)
+        self.close = _price_array(close)
+        self.volume = np.asarray(volume, dtype=np.int64)
+
+    @classmethod
+    def empty(cls) -> "Bars":
+        return cls([], [], [], [], [], [])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Bars":
+        """Build bars from a provider DataFrame with Date/Open/High/Low/Close/Volume columns."""
+        if df is None or df.empty:
+            return cls.empty()
+
+        dates = pd.to_datetime(df["Date"], utc=True).dt.tz_convert(None)
+        time = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        columns = [df[col].to_numpy(dtype=np.float64) for col in ("Open", "High", "Low", "Close")]
+        volume = df["Volume"].fillna(0).to_numpy(dtype=np.int64)
+
+        order = np.argsort(time, kind="stable")
+        time = time[order]
+        # Keep the last row for any repeated timestamp
+        keep = np.append(time[1:] != time[:-1], True)
+        order = order[keep]
+        return cls(time[keep], *(col[order] for col in columns), volume[order])
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Date": pd.to_datetime(self.time, utc=True),
+            "Open": self.open,
+            "High": self.high,
+            "Low": self.low,
+            "Close": self.close,
+            "Volume": self.volume,
+        })
+
+    def __len__(self) -> int:
+        return self.time.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def freeze(self) -> "Bars":
+        """Mark every column read-only so the arrays can be shared without copying."""
+        for name in self.__slots__:
+            getattr(self, name).flags.writeable = False
+        return self
+
+    @property
+    def is_empty(self) -> bool:
+        return self.time.shape[0] == 0
+
+    @property
+    def last_time(self) -> pd.Timestamp:
+        return pd.Timestamp(int(self.time[-1]), unit="ns", tz="UTC")
+
+    def take(self, start: int, stop: int = None) -> "Bars":
+        """Row range [start, stop) as views on the same arrays."""
+        s = slice(start, stop)
+        return Bars(self.time[s], self.open[s], self.high[s], self.low[s], self.close[s], self.volume[s])
+
+    def rewritten_by(self, tail: "Bars", rtol: float = 1e-4) -> bool:
+        """
+        Whether `tail` has different closes for bars stored here, as when the
+        provider re-adjusts the whole history for a split or dividend. The
+        last stored bar is not compared, since it may still have been forming.
+        """
+        _, mine, theirs = np.intersect1d(self.time[:-1], tail.time, assume_unique=True, return_indices=True)
+        return not np.allclose(self.close[mine], tail.close[theirs], rtol=rtol, atol=0)
+
+    def merge_tail(self, tail: "Bars") -> "Bars":
+        """
+        Append freshly fetched bars. Rows at or after the first tail bar are
+        replaced, which drops the still-forming last bar of the old series.
+        """
+        if tail.is_empty:
+            return self
+        cut = int(np.searchsorted(self.time, tail.time[0], side="left"))
+        head = self.take(0, cut)
+        return Bars(*(
+            np.concatenate((getattr(head, name), getattr(tail, name)))
+            for name in self.__slots__
+        ))
+
+
+def slice_period(bars: Bars, period: str) -> Bars:
+    """Return the trailing rows of `bars` that fall inside `period`, located by binary search."""
+    if bars.is_empty or period == "max":
+        return bars
+
+    if period in PERIOD_SESSIONS:
+        return bars.take(max(len(bars) - PERIOD_SESSIONS[period], 0))
+
+    anchor = bars.last_time
+    if period == "ytd":
+        start = anchor.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0, nanosecond=0)
+    elif period in PERIOD_OFFSETS:
+        start = anchor - PERIOD_OFFSETS[period]
+    else:
+        raise ValueError(f"Unsupported period: {period}")
+
+    return bars.take(int(np.searchsorted(bars.time, start.value, side="left")))
+
+
+def resample(bars: Bars, interval: str) -> Bars:
+    """
+    Aggregate daily bars into weekly (Monday-start) or monthly bars: first
+    Open, max High, min Low, last Close and summed Volume per bucket. Each
+    bucket is labelled with the start of its week or month at the same time
+    of day as the daily bars, matching what providers return for 1wk/1mo.
+
+    Daily bars are stamped at local midnight of the exchange, so the UTC
+    calendar day of each bar is its trading date for North American markets.
+    """
+    if interval == "1d" or bars.is_empty:
+        return bars
+
+    days = bars.time // NS_PER_DAY
+    if interval == "1wk":
+        # 1970-01-01 was a Thursday; shift so buckets start on Monday
+        keys = (days + 3) // 7
+        label_days = keys * 7 - 3
+    elif interval == "1mo":
+        keys = days.astype("datetime64[D]").astype("datetime64[M]")
+        label_days = keys.astype("datetime64[D]").astype(np.int64)
+    else:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    time_of_day = bars.time[starts] % NS_PER_DAY
+    return _merge_buckets(bars, starts, label_days[starts] * NS_PER_DAY + time_of_day)
+
+
+def resample_intraday(bars: Bars, interval: str, origin: int) -> Bars:
+    """
+    Aggregate minute bars of one session into `interval` bars aligned on
+    `origin` (the session open, epoch ns), so 1h bars run 9:30-10:30 and so
+    on like the providers' own. The last bucket may be partial, and buckets
+    without any minute bar are left out rather than filled.
+    """
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    step = INTRADAY_INTERVALS[interval] * NS_PER_MINUTE
+    if step == NS_PER_MINUTE or bars.is_empty:
+        return bars
+
+    keys = (bars.time - origin) // step
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return _merge_buckets(bars, starts, origin + keys[starts] * step)
+
+
+def _merge_buckets(bars: Bars, starts: np.ndarray, time: np.ndarray) -> Bars:
+    """One bar per bucket of rows beginning at `starts`: first Open, max High, min Low, last Close, summed Volume."""
+    ends = np.append(starts[1:], len(bars)) - 1
+    return Bars(
+        time,
+        bars.open[starts],
+        np.fmax.reduceat(bars.high, starts),
+        np.fmin.reduceat(bars.low, starts),
+        bars.close[ends],
+        np.add.reduceat(bars.volume, starts),
+    )
+
+
+def stack_columns(bars_list: list, fields=("close", "high", "low")):
+    """
+    Stack the same columns of several series into (symbols x bars) float64
+    arrays, right-aligned on the latest bar and left-padded with NaN.
+    Returns the arrays by field name and each row's padding width.
+    """
+    width = max((len(bars) for bars in bars_list), default=0)
+    offsets = np.array([width - len(bars) for bars in bars_list], dtype=np.int64)
+    stacked = {}
+    for field in fields:
+        out = np.full((len(bars_list), width), np.nan)
+        for row, bars in enumerate(bars_list):
+            out[row, offsets[row]:] = getattr(bars, field)
+        stacked[field] = out
+    return stacked, offsets
@@ -0,0 +1,138 @@
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("thread", "process")
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when the pool already has `max_pending` jobs."""
+
+
+class StageStats:
+    __slots__ = ("inline", "pooled", "rejected", "queue_total", "queue_max", "run_total", "run_max")
+
+    def __init__(self):
+        self.inline = self.pooled = self.rejected = 0
+        self.queue_total = self.queue_max = self.run_total = self.run_max = 0.0
+
+    def to_dict(self) -> dict:
+        runs = self.inline + self.pooled
+        return {
+            "inline": self.inline,
+            "pooled": self.pooled,
+            "rejected": self.rejected,
+            "queue_ms_avg": round(self.queue_total / self.pooled * 1000, 3) if self.pooled else 0.0,
+            "queue_ms_max": round(self.queue_max * 1000, 3),
+            "run_ms_avg": round(self.run_total / runs * 1000, 3) if runs else 0.0,
+            "run_ms_max": round(self.run_max * 1000, 3),
+        }
+
+
+def _timed(fn, args, submitted: float):
+    # time.monotonic is system-wide on Linux, so queue time is valid across processes
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started - submitted, time.monotonic() - started
+
+
+class ComputePool:
+    """
+    Executor for the CPU-bound stages of a request (indicator math, JSON
+    encoding), so one large request cannot stall the event loop and every
+    cache hit queued behind it.
+
+    Jobs whose `cost` (roughly bars x columns) is below `inline_max_cost`
+    run directly on the loop: handing them off would cost more than doing
+    them, and they never wait behind large jobs. Larger jobs go to a thread
+    or process pool; with `kind="process"` functions and arguments must be
+    picklable, i.e. module-level. When `max_pending` jobs are already queued
+    or running, `run` raises PoolSaturated instead of growing the queue.
+
+    Queue and run times are tracked per stage name, in `stats()` and in the
+    trendpulse_stage_duration_seconds histogram.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_pending: int = 64, inline_max_cost: int = 20_000):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unsupported pool kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.inline_max_cost = inline_max_cost
+        self.pending = 0
+        self._executor = None
+        self._stages = {}  # {stage: StageStats}
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn, not fork: the server process already runs threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compute")
+        return self._executor
+
+    def _stats(self, stage: str) -> StageStats:
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages[stage] = StageStats()
+        return stats
+
+    async def run(self, stage: str, fn, *args, cost: int = None):
+        """Run `fn(*args)` for `stage`, inline if cheap, otherwise in the pool."""
+        stats = self._stats(stage)
+
+        if cost is not None and cost < self.inline_max_cost:
+            started = time.monotonic()
+            result = fn(*args)
+            elapsed = time.monotonic() - started
+            stats.inline += 1
+            stats.run_total += elapsed
+            stats.run_max = max(stats.run_max, elapsed)
+            STAGE_SECONDS.labels(stage, "run").observe(elapsed)
+            return result
+
+        if self.pending >= self.max_pending:
+            stats.rejected += 1
+            raise PoolSaturated(f"Compute pool saturated ({self.pending} pending)")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, queued, elapsed = await loop.run_in_executor(
+                self._get_executor(), _timed, fn, args, time.monotonic(),
+            )
+        finally:
+            self.pending -= 1
+
+        stats.pooled += 1
+        stats.queue_total += queued
+        stats.queue_max = max(stats.queue_max, queued)
+        stats.run_total += elapsed
+        stats.run_max = max(stats.run_max, elapsed)
+        STAGE_SECONDS.labels(stage, "queue").observe(queued)
+        STAGE_SECONDS.labels(stage, "run").observe(elapsed)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "stages": {stage: stats.to_dict() for stage, stats in self._stages.items()},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
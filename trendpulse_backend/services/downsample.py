@@ -0,0 +1,81 @@
+import numpy as np
+
+from services.bars import Bars
+
+# Chart downsampling. A method first picks a selection for a series (row
+# indices for "lttb", bucket starts for "ohlc"); the selection depends only
+# on the bars and the point budget, so callers can cache it per series
+# version and apply it to indicator columns computed on the full series.
+DOWNSAMPLE_METHODS = ("lttb", "ohlc")
+MIN_POINTS = 3
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keep the first and last points and, from
+    each of `points - 2` equal buckets in between, the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average. Each bucket is evaluated as one array operation; only the walk
+    from bucket to bucket is sequential.
+    """
+    size = len(y)
+    if points >= size:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64) - float(x[0])
+    y = np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < points - 1 else size
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[i + 1] = a
+    return selected
+
+
+def bucket_starts(size: int, points: int) -> np.ndarray:
+    """First row of each of `points` near-equal buckets covering `size` rows."""
+    if points >= size:
+        return np.arange(size)
+    return np.linspace(0, size, points, endpoint=False).astype(np.int64)
+
+
+def select_points(bars: Bars, max_points: int, method: str = "lttb") -> np.ndarray:
+    """Selection reducing `bars` to at most `max_points` rows; see `apply_selection`."""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unsupported downsampling method: {method}")
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    if method == "lttb":
+        return lttb_indices(bars.time, bars.close, max_points)
+    return bucket_starts(len(bars), max_points)
+
+
+def apply_selection(bars: Bars, columns: dict, selection: np.ndarray, method: str = "lttb") -> tuple:
+    """
+    Downsampled (bars, columns). "lttb" keeps the selected rows as they are.
+    "ohlc" merges each bucket into one bar (first Open, max High, min Low,
+    last Close, summed Volume, stamped with the first bar's time), and takes
+    indicator values at the bucket's last bar, like Close.
+    """
+    if len(selection) == len(bars):
+        return bars, columns
+    if method == "lttb":
+        rows = Bars(*(getattr(bars, name)[selection] for name in Bars.__slots__))
+        return rows, {name: values[selection] for name, values in columns.items()}
+
+    ends = np.append(selection[1:], len(bars)) - 1
+    merged = Bars(
+        bars.time[selection],
+        bars.open[selection],
+        np.fmax.reduceat(bars.high, selection),
+        np.fmin.reduceat(bars.low, selection),
+        bars.close[ends],
+        np.add.reduceat(bars.volume, selection),
+    )
+    return merged, {name: values[ends] for name, values in columns.items()}
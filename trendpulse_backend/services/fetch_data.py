@@ -1,11 +1,22 @@
+import os
+import asyncio
 import importlib
 from fastapi import HTTPException
 
-# Supported providers
-VALID_PROVIDERS = [ "yfinance", "alphavantage", "questrade", "twelvedata"]
+from services.metrics import upstream_call
+from services.provider_router import ProviderRouter
 
-# Default provider can be set here
-DEFAULT_PROVIDER = "yfinance"  # Change this to your preferred default provider
+# Supported providers (modules under providers/)
+VALID_PROVIDERS = ["yfinance", "questrade", "synthetic"]
+
+# Default provider can be set here or with TRENDPULSE_PROVIDER ("synthetic" for offline load tests)
+DEFAULT_PROVIDER = os.getenv("TRENDPULSE_PROVIDER", "yfinance")
+
+# Providers tried in order, with hedging and failover, e.g. TRENDPULSE_PROVIDERS=yfinance,questrade
+PROVIDER_ORDER = os.getenv("TRENDPULSE_PROVIDERS", DEFAULT_PROVIDER).split(",")
+
+# Per-operation overrides of PROVIDER_ORDER, e.g. {"quote": ["questrade", "yfinance"]}
+PROVIDER_ROUTES = {}
 
 class FetchData:
     def __init__(self, provider=DEFAULT_PROVIDER):
@@ -13,12 +24,54 @@ class FetchData:
             raise HTTPException(status_code=400, detail=f"Invalid provider '{provider}'")
         self.provider = provider
         self.module = importlib.import_module(f"providers.{provider}_api")
+        # Provider-specific exceptions that mean the upstream is unwell, e.g. its rate limit
+        self.upstream_errors = getattr(self.module, "UPSTREAM_ERRORS", ())
 
     async def fetch_stock_prices(self, symbol: str, period: str = "6mo"):
-        return await self.module.fetch_stock_prices(symbol, period)
+        async with upstream_call(self.provider, "prices"):
+            return await self.module.fetch_stock_prices(symbol, period)
+
+    async def fetch_price_range(self, symbol: str, interval: str, start=None, end=None):
+        async with upstream_call(self.provider, "price_range"):
+            return await self.module.fetch_price_range(symbol, interval, start, end)
+
+    async def fetch_price_ranges(self, symbols: list, interval: str, start=None, end=None) -> dict:
+        """Fetch several symbols at once; returns {symbol: DataFrame or exception}."""
+        if hasattr(self.module, "fetch_price_ranges"):
+            async with upstream_call(self.provider, "price_ranges"):
+                return await self.module.fetch_price_ranges(symbols, interval, start, end)
+        results = await asyncio.gather(
+            *(self.fetch_price_range(symbol, interval, start, end) for symbol in symbols),
+            return_exceptions=True,
+        )
+        return dict(zip(symbols, results))
 
     async def fetch_stock_details(self, symbol: str):
-        return await self.module.fetch_stock_details(symbol)
+        async with upstream_call(self.provider, "details"):
+            return await self.module.fetch_stock_details(symbol)
+
+    async def fetch_stock_fundamentals(self, symbol: str) -> dict:
+        """Slow-changing details; providers without a split fall back to full details."""
+        if hasattr(self.module, "fetch_stock_fundamentals"):
+            async with upstream_call(self.provider, "fundamentals"):
+                return await self.module.fetch_stock_fundamentals(symbol)
+        return await self.fetch_stock_details(symbol)
+
+    async def fetch_stock_quote(self, symbol: str) -> dict:
+        """Current session quote; providers without a split fall back to full details."""
+        if hasattr(self.module, "fetch_stock_quote"):
+            async with upstream_call(self.provider, "quote"):
+                return await self.module.fetch_stock_quote(symbol)
+        return await self.fetch_stock_details(symbol)
+
+    async def aclose(self):
+        """Release provider resources such as pooled HTTP connections."""
+        if hasattr(self.module, "aclose"):
+            await self.module.aclose()
 
-# Create a singleton instance if you want default usage
-fetcher = FetchData()
+# Shared instance used by the app
+fetcher = ProviderRouter(
+    {name: FetchData(name) for name in dict.fromkeys([*PROVIDER_ORDER, *sum(PROVIDER_ROUTES.values(), [])])},
+    PROVIDER_ORDER,
+    PROVIDER_ROUTES,
+)
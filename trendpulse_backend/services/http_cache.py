@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+from datetime import datetime, timezone
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # gzip only
+    brotli = None
+
+from services.bars import Bars
+from services.serialization import encode_payload
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # the higher levels cost far more CPU for a few percent
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def bars_digest(bars: Bars) -> bytes:
+    """Content hash of a bar series; identical bars always give the same digest."""
+    digest = hashlib.blake2b(digest_size=16)
+    for column in (bars.time, bars.open, bars.high, bars.low, bars.close, bars.volume):
+        digest.update(column.tobytes())
+    return digest.digest()
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the parts' reprs (bytes are hashed as-is)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def coded_etag(etag: str, encoding: str = None) -> str:
+    """Strong validators must differ per content coding: '"abc"' -> '"abc-gzip"'."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def choose_encoding(accept_encoding: str):
+    """Preferred supported content coding the client accepts, or None."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = q
+    for coding in ENCODINGS:
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def cache_control(expires: datetime = None, now: datetime = None) -> str:
+    """Let clients reuse a response until its data is due for refresh, then revalidate."""
+    if expires is None:
+        return "no-cache"
+    now = now or datetime.now(timezone.utc)
+    return f"public, max-age={max(0, int((expires - now).total_seconds()))}"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def encode_compressed(payload, fmt: str, encoding: str = None) -> tuple:
+    """Encode a payload like `encode_payload`; returns (body, applied content coding or None)."""
+    body = encode_payload(payload, fmt)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    return compress(body, encoding), encoding
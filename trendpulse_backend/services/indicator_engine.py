@@ -0,0 +1,204 @@
+import time
+
+import numpy as np
+
+from services.bars import stack_columns
+from services.metrics import INDICATOR_SECONDS
+from services.indicators import (
+    rolling_mean, rolling_std, ewm_mean, diff, true_range,
+    rsi_from_delta, mask_macd_warmup,
+)
+
+# Default indicator lengths
+DEFAULT_LENGTHS = {
+    "SMA": 20,
+    "EMA": 20,
+    "RSI": 14,
+    "MACD": {"fast": 12, "slow": 26, "signal": 9},
+    "BB": 20,
+    "ATR": 14,
+}
+
+SUPPORTED_INDICATORS = ("SMA", "EMA", "RSI", "MACD", "BB", "ATR")
+
+# Output columns produced by each indicator, in response order
+INDICATOR_COLUMNS = {
+    "SMA": ("SMA",),
+    "EMA": ("EMA",),
+    "RSI": ("RSI",),
+    "MACD": ("MACD", "MACD_Signal", "MACD_Histogram"),
+    "BB": ("BB_UBand", "BB_LBand"),
+    "ATR": ("ATR",),
+}
+
+
+class IndicatorPlan:
+    """
+    Resolved set of indicators for one request together with the shared
+    intermediates they need, so every rolling mean, EWM and true range is
+    computed once no matter how many indicators read it.
+    """
+
+    def __init__(self, specs):
+        self.specs = specs  # [(name, params), ...]
+        self.means = set()      # rolling mean of Close, by length (SMA, BB)
+        self.stds = set()       # rolling std of Close, by length (BB)
+        self.emas = set()       # EWM of Close, by span (EMA, MACD fast/slow)
+        self.rsi_lengths = set()
+        self.atr_lengths = set()
+
+        for name, params in specs:
+            if name == "SMA":
+                self.means.add(params["length"])
+            elif name == "BB":
+                self.means.add(params["length"])
+                self.stds.add(params["length"])
+            elif name == "EMA":
+                self.emas.add(params["length"])
+            elif name == "MACD":
+                self.emas.update((params["fast"], params["slow"]))
+            elif name == "RSI":
+                self.rsi_lengths.add(params["length"])
+            elif name == "ATR":
+                self.atr_lengths.add(params["length"])
+
+    @property
+    def columns(self):
+        return [col for name, _ in self.specs for col in INDICATOR_COLUMNS[name]]
+
+    @property
+    def labels(self):
+        """Column names qualified by parameters, unique even for repeated indicators."""
+        return [column_label(col, params) for name, params in self.specs for col in INDICATOR_COLUMNS[name]]
+
+    @property
+    def keys(self):
+        """
+        Result keys without `labelled`: the plain column names, except for an
+        indicator requested more than once with different parameters, whose
+        columns keep their labels so none of them is dropped.
+        """
+        return [self.key(name, col, params) for name, params in self.specs for col in INDICATOR_COLUMNS[name]]
+
+    def key(self, name: str, column: str, params: dict) -> str:
+        variants = {tuple(p.items()) for n, p in self.specs if n == name}
+        return column_label(column, params) if len(variants) > 1 else column
+
+    @property
+    def needs_high_low(self) -> bool:
+        return bool(self.atr_lengths)
+
+
+def column_label(column: str, params: dict) -> str:
+    """e.g. SMA with length 50 -> 'SMA_50', MACD_Signal 12/26/9 -> 'MACD_Signal_12_26_9'."""
+    return "_".join([column, *(str(value) for value in params.values())])
+
+
+def plan_indicators(indicators) -> IndicatorPlan:
+    """
+    Validate the requested `IndicatorItem`s, fill in default parameters and
+    return the computation plan. Raises ValueError for unsupported names or
+    non-positive lengths before any work is done.
+    """
+    specs = []
+    for indicator in indicators:
+        name = indicator.name.upper()
+        if name not in SUPPORTED_INDICATORS:
+            raise ValueError(f"Unsupported indicator: {name}")
+
+        if name == "MACD":
+            defaults = DEFAULT_LENGTHS["MACD"]
+            params = {
+                "fast": indicator.fast or defaults["fast"],
+                "slow": indicator.slow or defaults["slow"],
+                "signal": indicator.signal or defaults["signal"],
+            }
+        else:
+            params = {"length": indicator.length or DEFAULT_LENGTHS[name]}
+
+        minimum = 2 if name == "BB" else 1
+        if any(value < minimum for value in params.values()):
+            raise ValueError(f"Invalid parameters for {name}: {params}")
+        specs.append((name, params))
+
+    return IndicatorPlan(specs)
+
+
+def compute_indicators(plan: IndicatorPlan, close, high=None, low=None, offsets=None, labelled: bool = False) -> dict:
+    """
+    Evaluate a plan over float64 price arrays in a single pass.
+
+    Prices may be 1D for one symbol or 2D (symbols x bars) for many symbols
+    at once, left-padded with NaN; `offsets` then gives each row's padding.
+    Returns a dict of column name -> float64 array aligned with `close`,
+    with NaN wherever an indicator is not yet defined, keyed as in
+    `IndicatorPlan.keys`. With `labelled`, keys are the parameter-qualified
+    names from `IndicatorPlan.labels`.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if plan.needs_high_low and (high is None or low is None):
+        raise ValueError("High and Low prices are required for ATR")
+
+    # Intermediates are computed on first use and shared after that, so each
+    # indicator's timing covers the work it actually added
+    shared = {}
+
+    def intermediate(key, fn, *args, **kwargs):
+        if key not in shared:
+            shared[key] = fn(*args, **kwargs)
+        return shared[key]
+
+    def mean(length):
+        return intermediate(("mean", length), rolling_mean, close, length)
+
+    def ema(span):
+        return intermediate(("ema", span), ewm_mean, close, span)
+
+    missing = np.isnan(close) if offsets is not None else None
+
+    results = {}
+    for name, params in plan.specs:
+        started = time.perf_counter()
+        outputs = {}
+        if name == "SMA":
+            outputs["SMA"] = mean(params["length"])
+        elif name == "EMA":
+            outputs["EMA"] = ema(params["length"])
+        elif name == "RSI":
+            delta = intermediate(("delta",), diff, close)
+            outputs["RSI"] = intermediate(("rsi", params["length"]), rsi_from_delta, delta, params["length"], missing)
+        elif name == "BB":
+            length = params["length"]
+            std = intermediate(("std", length), rolling_std, close, length)
+            outputs["BB_UBand"] = mean(length) + std * 2
+            outputs["BB_LBand"] = mean(length) - std * 2
+        elif name == "ATR":
+            tr = intermediate(("tr",), true_range, high, low, close)
+            outputs["ATR"] = intermediate(("atr", params["length"]), rolling_mean, tr, params["length"])
+        elif name == "MACD":
+            fast, slow, signal = params["fast"], params["slow"], params["signal"]
+            macd = ema(fast) - ema(slow)
+            signal_line = ewm_mean(macd, signal)
+            histogram = macd - signal_line
+            outputs["MACD"] = mask_macd_warmup(macd, slow, signal, offsets)
+            outputs["MACD_Signal"] = mask_macd_warmup(signal_line, slow, signal, offsets)
+            outputs["MACD_Histogram"] = mask_macd_warmup(histogram, slow, signal, offsets)
+        INDICATOR_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+        for column, values in outputs.items():
+            results[column_label(column, params) if labelled else plan.key(name, column, params)] = values
+
+    return results
+
+
+def compute_indicators_many(plan: IndicatorPlan, bars_list: list) -> list:
+    """
+    Evaluate a plan for several series in one pass over a stacked
+    (symbols x bars) matrix; returns each series' own columns, in order.
+    """
+    stacked, offsets = stack_columns(bars_list)
+    columns = compute_indicators(plan, stacked["close"], stacked["high"], stacked["low"], offsets)
+    return [
+        {name: values[row, offsets[row]:] for name, values in columns.items()}
+        for row in range(len(bars_list))
+    ]
@@ -1,93 +1,179 @@
 import pandas as pd
 import numpy as np
 
+# Array kernels shared by the calculate_* helpers and the indicator engine.
+# They operate on float64 arrays along the last axis and leave NaN where a
+# value is undefined, so callers never pay for an object-dtype round trip.
+
+def _as_float(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+def _row_center(values: np.ndarray) -> np.ndarray:
+    """Mean of each row's finite values (0 for rows without any), to center cumulative sums."""
+    finite = np.isfinite(values)
+    count = finite.sum(axis=-1, keepdims=True)
+    total = np.where(finite, values, 0.0).sum(axis=-1, keepdims=True)
+    return np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+
+def rolling_sum(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Sums over every full window of `length` samples along the last axis
+    (n - length + 1 per row), NaN for windows holding a NaN. One cumulative
+    sum per call, so the cost does not grow with `length`; callers center
+    `values` first to keep its rounding error small.
+    """
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    totals = np.pad(np.cumsum(filled, axis=-1), pad)
+    gaps = np.pad(np.cumsum(missing, axis=-1), pad)
+    sums = totals[..., length:] - totals[..., :-length]
+    sums[gaps[..., length:] != gaps[..., :-length]] = np.nan
+    return sums
+
+def rolling_mean(values, length: int) -> np.ndarray:
+    """Rolling mean over `length` samples, NaN until the window is full."""
+    if length < 1:
+        raise ValueError("length must be a positive integer")
+    values = _as_float(values)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] >= length:
+        center = _row_center(values)
+        out[..., length - 1:] = rolling_sum(values - center, length) / length + center
+    return out
+
+def rolling_std(values, length: int) -> np.ndarray:
+    """
+    Rolling sample standard deviation. Runs in pandas' compiled rolling
+    kernel, one column per row: its running updates stay accurate where a
+    difference of cumulative sums of squares would cancel out.
+    """
+    if length < 2:
+        raise ValueError("length must be at least 2")
+    values = _as_float(values)
+    if values.size == 0 or values.shape[-1] < length:
+        return np.full(values.shape, np.nan)
+    rows = values.reshape(-1, values.shape[-1]).T
+    out = pd.DataFrame(rows).rolling(length).std().to_numpy()
+    return out.T.reshape(values.shape)
+
+# Below this many samples a plain Python recurrence beats pandas' per-call overhead
+EWM_LOOP_MAX = 1024
+
+def ewm_mean(values, span: int) -> np.ndarray:
+    """
+    Exponential moving average, equivalent to `ewm(span=span, adjust=False,
+    ignore_na=True).mean()`; identical to `adjust=False` for series without gaps.
+    """
+    if span < 1:
+        raise ValueError("span must be a positive integer")
+    values = _as_float(values)
+
+    if values.ndim == 1 and values.shape[0] <= EWM_LOOP_MAX:
+        alpha = 2.0 / (span + 1.0)
+        decay = 1.0 - alpha
+        # Scalar recurrence on Python floats is much cheaper than per-element numpy indexing
+        out = []
+        prev = np.nan
+        for x in values.tolist():
+            if x == x:
+                prev = x if prev != prev else decay * prev + alpha * x
+            out.append(prev)
+        return np.array(out, dtype=np.float64)
+
+    if values.size == 0:
+        return np.full(values.shape, np.nan)
+    # Long series and stacked rows run in pandas' compiled kernel, one column per row
+    rows = values.reshape(-1, values.shape[-1]).T
+    out = pd.DataFrame(rows).ewm(span=span, adjust=False, ignore_na=True).mean().to_numpy()
+    return out.T.reshape(values.shape)
+
+def diff(values) -> np.ndarray:
+    """First difference with a leading NaN, like `Series.diff()`."""
+    values = _as_float(values)
+    out = np.full(values.shape, np.nan)
+    out[..., 1:] = values[..., 1:] - values[..., :-1]
+    return out
+
+def true_range(high, low, close) -> np.ndarray:
+    """Wilder's true range; the first bar falls back to High - Low."""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[..., 1:] = close[..., :-1]
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+def rsi_from_delta(delta: np.ndarray, length: int, missing: np.ndarray = None) -> np.ndarray:
+    """
+    RSI from close-to-close changes using simple rolling averages of gains
+    and losses. Bars flagged in `missing` (such as the padding of stacked
+    series) stay NaN instead of counting as unchanged.
+    """
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if missing is not None:
+        gain[missing] = np.nan
+        loss[missing] = np.nan
+    avg_gain = rolling_mean(gain, length)
+    avg_loss = rolling_mean(loss, length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi[~np.isfinite(rsi)] = np.nan
+    return rsi
+
+def mask_macd_warmup(values: np.ndarray, slow: int, signal: int, offsets=None) -> np.ndarray:
+    """
+    Blank the first slow + signal bars, a conservative choice to drop early
+    unstable values. For stacked 2D input, `offsets` gives the number of
+    leading padding columns of each row so the warm-up counts from its first bar.
+    """
+    warmup = slow + signal
+    if offsets is None:
+        values[..., :warmup] = np.nan
+    else:
+        positions = np.arange(values.shape[-1])
+        values[positions < (np.asarray(offsets)[:, np.newaxis] + warmup)] = np.nan
+    return values
+
+def _frame(stock_data: pd.DataFrame, **columns) -> pd.DataFrame:
+    df = stock_data[["Date"]].copy()
+    for name, values in columns.items():
+        df[name] = values
+    return df
+
 def calculate_rsi(stock_data: pd.DataFrame, length: int = 14):
     """Calculate RSI for a given length and return a DataFrame with Date and RSI."""
-    close = stock_data["Close"]
-    delta = close.diff()
-
-    gain = delta.where(delta > 0, 0.0)
-    loss = -delta.where(delta < 0, 0.0)
-
-    avg_gain = gain.rolling(window=length).mean()
-    avg_loss = loss.rolling(window=length).mean()
-
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-
-    rsi_df = stock_data[["Date"]].copy()
-    rsi_df["RSI"] = rsi
-    rsi_df = rsi_df.replace([np.nan, np.inf, -np.inf], None)
-
-    return rsi_df
+    delta = diff(stock_data["Close"].to_numpy())
+    return _frame(stock_data, RSI=rsi_from_delta(delta, length))
 
 def calculate_sma(stock_data: pd.DataFrame, length: int = 20):
-    """Simple Moving Average (SMA)""" 
-    close_prices = stock_data["Close"]
-    sma = close_prices.rolling(window=length).mean()
-
-    sma_df = stock_data[["Date"]].copy()
-    sma_df["SMA"] = sma
-    sma_df = sma_df.replace([np.nan, np.inf, -np.inf], None)
-
-    return sma_df
+    """Simple Moving Average (SMA)"""
+    return _frame(stock_data, SMA=rolling_mean(stock_data["Close"].to_numpy(), length))
 
 def calculate_ema(stock_data: pd.DataFrame, length: int = 20):
     """Exponential Moving Average (EMA)"""
-    ema = stock_data["Close"].ewm(span=length, adjust=False).mean()
-
-    ema_df = stock_data[["Date"]].copy()
-    ema_df["EMA"] = ema
-    ema_df = ema_df.replace([np.nan, np.inf, -np.inf], None)
-
-    return ema_df
+    return _frame(stock_data, EMA=ewm_mean(stock_data["Close"].to_numpy(), length))
 
 def calculate_bollinger_bands(stock_data: pd.DataFrame, length: int = 20):
     """Bollinger Bands calculation"""
-    close_prices = stock_data["Close"]
-    sma = close_prices.rolling(window=length).mean()
-    std = close_prices.rolling(window=length).std()
-    upper_band = sma + (std * 2)
-    lower_band = sma - (std * 2)
-
-    bb_df = stock_data[["Date"]].copy()
-    bb_df["BB_UBand"] = upper_band
-    bb_df["BB_LBand"] = lower_band
-    bb_df = bb_df.replace([np.nan, np.inf, -np.inf], None)
-
-    return bb_df
+    close_prices = stock_data["Close"].to_numpy()
+    sma = rolling_mean(close_prices, length)
+    std = rolling_std(close_prices, length)
+    return _frame(stock_data, BB_UBand=sma + (std * 2), BB_LBand=sma - (std * 2))
 
 def calculate_macd(stock_data: pd.DataFrame, fast=12, slow=26, signal=9):
-    short_ema = stock_data["Close"].ewm(span=fast, adjust=False).mean()
-    long_ema = stock_data["Close"].ewm(span=slow, adjust=False).mean()
-    macd = short_ema - long_ema
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
+    close_prices = stock_data["Close"].to_numpy()
+    macd = ewm_mean(close_prices, fast) - ewm_mean(close_prices, slow)
+    signal_line = ewm_mean(macd, signal)
     histogram = macd - signal_line
 
-    macd_df = stock_data[["Date"]].copy()
-    macd_df["MACD"] = macd
-    macd_df["MACD_Signal"] = signal_line
-    macd_df["MACD_Histogram"] = histogram
-
-    valid_start = slow + signal  # Conservative choice to drop early unstable values
-    macd_df.loc[:valid_start-1, ["MACD", "MACD_Signal", "MACD_Histogram"]] = None
-
-    macd_df = macd_df.replace([np.nan, np.inf, -np.inf], None)
-
-    return macd_df
+    return _frame(
+        stock_data,
+        MACD=mask_macd_warmup(macd, slow, signal),
+        MACD_Signal=mask_macd_warmup(signal_line, slow, signal),
+        MACD_Histogram=mask_macd_warmup(histogram, slow, signal),
+    )
 
 def calculate_atr(stock_data: pd.DataFrame, length: int = 14):
     """Calculate Average True Range (ATR)."""
-    stock_data = stock_data.copy()
-    stock_data["High-Low"] = stock_data["High"] - stock_data["Low"]
-    stock_data["High-Close"] = abs(stock_data["High"] - stock_data["Close"].shift(1))
-    stock_data["Low-Close"] = abs(stock_data["Low"] - stock_data["Close"].shift(1))
-
-    stock_data["TrueRange"] = stock_data[["High-Low", "High-Close", "Low-Close"]].max(axis=1)
-    stock_data["ATR"] = stock_data["TrueRange"].rolling(window=length).mean()
-
-    atr_df = stock_data[["Date"]].copy()
-    atr_df["ATR"] = stock_data["ATR"]
-    atr_df = atr_df.replace([np.nan, np.inf, -np.inf], None)
-
-    return atr_df
+    tr = true_range(stock_data["High"].to_numpy(), stock_data["Low"].to_numpy(), stock_data["Close"].to_numpy())
+    return _frame(stock_data, ATR=rolling_mean(tr, length))
@@ -0,0 +1,225 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from services.bars import Bars, INTRADAY_INTERVALS, NS_PER_MINUTE, resample_intraday
+from services.memory_cache import MemoryCache
+from services.minute_file import MinuteFileStore, normalize
+from services.single_flight import SingleFlight
+from services.metrics import record_cache
+from utils.market_utils import get_market_calendar, get_market_from_symbol
+
+logger = logging.getLogger(__name__)
+
+# Rewrite a session's file once this share of its records are superseded minutes
+MAX_DEAD_RATIO = 0.25
+
+# A session whose final minute has no bar (no trade, or a tail the provider
+# has not published yet) is sealed only once this long after the close
+SEAL_AFTER_CLOSE = timedelta(hours=1)
+
+
+class IntradayStore:
+    """
+    Intraday bars for the latest trading sessions of each symbol.
+
+    Only minute bars are stored, one `MinuteFileStore` file per symbol and
+    session; 5m, 15m and 1h bars are aggregated from them per request, so
+    every intraday interval shares one upstream fetch and one copy on disk.
+
+    Expiry follows the market calendar rather than a flat TTL. A session in
+    progress expires `ttl` after its last fetch, and a refresh only fetches
+    from the last stored minute and appends it. The first fetch at least
+    `ttl` after the close that returns the session's last minute completes
+    it (or `SEAL_AFTER_CLOSE` after the close, for a session that ends
+    without a trade): its file is compacted and sealed, and it is never
+    fetched again. A session still without bars is never sealed. A chart whose sessions are all
+    sealed stays valid until the next open. Sessions more than `retention`
+    sessions old are deleted as new ones start, which bounds the disk use to
+    about 8.6 KB per symbol and session.
+
+    Sealed sessions and fresh entries are kept in an in-process
+    `MemoryCache`; fetches go through `SingleFlight` like `BarStore`'s.
+    """
+
+    def __init__(self, disk: MinuteFileStore, fetcher, ttl: timedelta, memory: MemoryCache, flight: SingleFlight,
+                 retention: int = 10):
+        self.disk = disk
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.memory = memory
+        self.flight = flight
+        self.retention = retention
+        self._pruned_before = {}  # {market: oldest session date kept on disk}
+
+    async def get_bars(self, symbol: str, interval: str, sessions: int = 1) -> Bars:
+        """Bars at an intraday interval for the latest `sessions` sessions that have opened."""
+        if interval not in INTRADAY_INTERVALS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        calendar = self._calendar(symbol)
+        now = datetime.now(timezone.utc)
+        last = calendar.last_open(pd.Timestamp(now).value)
+        window = list(range(max(last - sessions + 1, 0), last + 1))
+        if not window:
+            return Bars.empty()
+
+        entries = await self._load(symbol, calendar, window, now)
+        # Until the first bar of a new session arrives, chart the sessions before it
+        _, close = self._hours(calendar, window[-1])
+        if entries[-1]["bars"].is_empty and pd.Timestamp(now).value < close and window[0] > 0:
+            window = [window[0] - 1] + window[:-1]
+            entries = (await self._load(symbol, calendar, window[:1], now)) + entries[:-1]
+
+        parts = [
+            resample_intraday(entry["bars"], interval, self._hours(calendar, i)[0])
+            for i, entry in zip(window, entries)
+        ]
+        return Bars(*(np.concatenate([getattr(part, name) for part in parts]) for name in Bars.__slots__))
+
+    def next_refresh(self, symbol: str):
+        """When the latest cached session of `symbol` changes next, or None if it is not cached."""
+        calendar = self._calendar(symbol)
+        last = calendar.last_open()
+        if last < 0:
+            return None
+        entry = self.memory.peek((symbol, calendar.session_date(last)))
+        if entry is None:
+            return None
+        if entry["sealed"]:
+            next_open, _ = calendar.session_hours(last + 1)
+            return next_open.to_pydatetime()
+        return entry["expires"]
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+        self._pruned_before.clear()
+
+    @staticmethod
+    def _calendar(symbol: str):
+        return get_market_calendar(get_market_from_symbol(symbol))
+
+    @staticmethod
+    def _hours(calendar, i: int) -> tuple:
+        """Open and close of session `i` in epoch ns."""
+        session_open, session_close = calendar.session_hours(i)
+        return session_open.value, session_close.value
+
+    async def _load(self, symbol: str, calendar, window: list, now: datetime) -> list:
+        started = time.perf_counter()
+        entries = {}
+        due = []
+        for i in window:
+            entry = self._lookup(symbol, calendar.session_date(i), now)
+            if entry is not None and not self._expired(entry, now):
+                entries[i] = entry
+            else:
+                due.append(i)
+        record_cache("minutes", "miss" if due else "hit", time.perf_counter() - started)
+
+        # Concurrent requests for a symbol share one upstream fetch. The key is
+        # per symbol only, so the cross-worker lock files stay bounded; a
+        # request that joined a fetch for other sessions fetches what is left.
+        key = f"{symbol}-minutes"
+        while due:
+            entries.update(await self.flight.do(key, lambda due=due: self._fetch_sessions(symbol, calendar, due)))
+            due = [i for i in due if i not in entries]
+        return [entries[i] for i in window]
+
+    async def _fetch_sessions(self, symbol: str, calendar, due: list) -> dict:
+        """Fetch the due sessions in one upstream call, from the earliest minute any of them is missing."""
+        now = datetime.now(timezone.utc)
+        entries = {}
+        stale = {}  # {session index: entry or None}
+        for i in due:
+            # Re-check: another worker may have fetched these sessions while we waited for the lock
+            entry = self._lookup(symbol, calendar.session_date(i), now)
+            if entry is not None and not self._expired(entry, now):
+                entries[i] = entry
+            else:
+                stale[i] = entry
+        if not stale:
+            return entries
+
+        hours = {i: self._hours(calendar, i) for i in stale}
+        start = min(
+            int(entry["bars"].time[-1]) if entry is not None and not entry["bars"].is_empty else hours[i][0]
+            for i, entry in stale.items()
+        )
+        end = min(max(close for _, close in hours.values()), pd.Timestamp(now).value)
+        fetched = normalize(Bars.from_frame(await self.fetcher.fetch_price_range(
+            symbol, "1m", start=pd.Timestamp(start, tz="UTC"), end=pd.Timestamp(end, tz="UTC"),
+        )))
+        logger.info(f"Fetched {len(fetched)} minute bars for {symbol} across {len(stale)} sessions")
+
+        for i, entry in stale.items():
+            session_open, session_close = hours[i]
+            lo = int(np.searchsorted(fetched.time, session_open, side="left"))
+            hi = int(np.searchsorted(fetched.time, session_close, side="left"))
+            entries[i] = await self._store(symbol, calendar.session_date(i), session_open, session_close,
+                                           entry, fetched.take(lo, hi), now)
+
+        await self._prune(calendar, max(stale))
+        return entries
+
+    async def _store(self, symbol: str, session, session_open: int, session_close: int, entry, tail: Bars,
+                     now: datetime) -> dict:
+        bars = entry["bars"].merge_tail(tail) if entry is not None else tail
+        sealed = self._complete(bars, session_close, now)
+        rows = (entry["rows"] if entry is not None else 0) + len(tail)
+        if entry is None or sealed or rows - len(bars) > len(bars) * MAX_DEAD_RATIO:
+            await asyncio.to_thread(self.disk.write, symbol, session, session_open, bars, now, sealed)
+            rows = len(bars)
+        else:
+            await asyncio.to_thread(self.disk.append, symbol, session, session_open, tail, now)
+        return self._remember(symbol, session, bars, now, sealed, rows)
+
+    def _complete(self, bars: Bars, session_close: int, now: datetime) -> bool:
+        """Whether `bars`, fetched at `now`, are final for the session closing at `session_close`."""
+        now_ns = pd.Timestamp(now).value
+        if bars.is_empty or now_ns < session_close + pd.Timedelta(self.ttl).value:
+            return False
+        return (int(bars.time[-1]) >= session_close - NS_PER_MINUTE
+                or now_ns >= session_close + pd.Timedelta(SEAL_AFTER_CLOSE).value)
+
+    def _remember(self, symbol: str, session, bars: Bars, updated: datetime, sealed: bool, rows: int) -> dict:
+        entry = {
+            "bars": bars.freeze(),
+            "updated": updated,
+            "expires": None if sealed else updated + self.ttl,
+            "sealed": sealed,
+            "rows": rows,
+        }
+        self.memory.set((symbol, session), entry, bars.nbytes)
+        return entry
+
+    @staticmethod
+    def _expired(entry: dict, now: datetime) -> bool:
+        return not entry["sealed"] and now >= entry["expires"]
+
+    def _lookup(self, symbol: str, session, now: datetime):
+        entry = self.memory.get((symbol, session))
+        if entry is not None and not self._expired(entry, now):
+            return entry
+
+        # Another worker may have appended to the shared file since we read it
+        disk_entry = self.disk.get(symbol, session)
+        if disk_entry is not None and (entry is None or disk_entry["updated"] > entry["updated"]):
+            entry = self._remember(symbol, session, disk_entry["bars"], disk_entry["updated"],
+                                   disk_entry["sealed"], disk_entry["rows"])
+        return entry
+
+    async def _prune(self, calendar, latest: int):
+        """Delete the market's sessions that fell out of the retention window, once per new session."""
+        market = calendar.market
+        keep_from = calendar.session_date(max(latest - self.retention + 1, 0))
+        pruned_before = self._pruned_before.get(market)
+        if pruned_before is not None and keep_from <= pruned_before:
+            return
+        await asyncio.to_thread(self.disk.prune, keep_from,
+                                lambda symbol: get_market_from_symbol(symbol) == market)
+        self._pruned_before[market] = keep_from
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class MemoryCache:
+    """
+    Byte-bounded in-process LRU cache. Callers pass the size of each value
+    when storing it; least recently used entries are evicted once the total
+    exceeds `max_bytes`. Values are returned as stored, without copying, so
+    they must be treated as immutable.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # {key: (value, nbytes)}
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key):
+        """Like `get`, but without counting a hit or miss or refreshing the entry's recency."""
+        with self._lock:
+            item = self._entries.get(key)
+            return item[0] if item is not None else None
+
+    def set(self, key, value, nbytes: int):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._entries.pop(key, None)
+            if item is None:
+                return None
+            self.current_bytes -= item[1]
+            return item[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
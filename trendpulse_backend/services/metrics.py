@@ -0,0 +1,135 @@
+import os
+import time
+from contextlib import asynccontextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# Prometheus metrics for the whole app. With several uvicorn workers, point
+# PROMETHEUS_MULTIPROC_DIR at an empty directory before starting the server:
+# every process (including compute pool processes) then writes its samples
+# there and /metrics aggregates them. Ratios are left to PromQL, e.g.
+#   sum by (cache) (rate(trendpulse_cache_requests_total{result="hit"}[5m]))
+#     / sum by (cache) (rate(trendpulse_cache_requests_total[5m]))
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COMPUTE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(9))  # 256 B .. 16 MiB
+
+REQUEST_SECONDS = Histogram(
+    "trendpulse_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "trendpulse_response_size_bytes", "HTTP response body size by route",
+    ["method", "route"], buckets=SIZE_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "trendpulse_cache_requests_total", "Cache lookups by cache and result (hit, stale, miss)",
+    ["cache", "result"],
+)
+CACHE_LOOKUP_SECONDS = Histogram(
+    "trendpulse_cache_lookup_seconds", "Time to look an entry up in memory and on disk",
+    ["cache"], buckets=COMPUTE_BUCKETS,
+)
+UPSTREAM_SECONDS = Histogram(
+    "trendpulse_upstream_duration_seconds", "Provider call latency",
+    ["provider", "operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "trendpulse_upstream_in_flight", "Provider calls currently running",
+    ["provider"], multiprocess_mode="livesum",
+)
+INDICATOR_SECONDS = Histogram(
+    "trendpulse_indicator_compute_seconds",
+    "Indicator compute time, including shared intermediates the indicator computed first",
+    ["indicator"], buckets=COMPUTE_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "trendpulse_stage_duration_seconds", "CPU-bound request stages (compute, encode) by phase (queue, run)",
+    ["stage", "phase"], buckets=COMPUTE_BUCKETS + (2.5, 5, 10),
+)
+RATE_LIMITED = Counter("trendpulse_rate_limited_total", "Requests rejected by the rate limiter")
+PROVIDER_HEDGES = Counter("trendpulse_provider_hedges_total", "Hedged requests sent to a second provider", ["operation"])
+PROVIDER_FAILOVERS = Counter(
+    "trendpulse_provider_failovers_total", "Calls retried on the next provider after a failure", ["operation"],
+)
+CIRCUIT_OPENED = Counter(
+    "trendpulse_circuit_opened_total", "Times a provider's circuit breaker opened", ["provider", "operation"],
+)
+
+
+def record_cache(cache: str, result: str, seconds: float):
+    CACHE_REQUESTS.labels(cache, result).inc()
+    CACHE_LOOKUP_SECONDS.labels(cache).observe(seconds)
+
+
+@asynccontextmanager
+async def upstream_call(provider: str, operation: str):
+    """Time one provider call and count it as in flight while it runs."""
+    in_flight = UPSTREAM_IN_FLIGHT.labels(provider)
+    in_flight.inc()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        in_flight.dec()
+        UPSTREAM_SECONDS.labels(provider, operation, outcome).observe(time.perf_counter() - started)
+
+
+def latest() -> tuple:
+    """The exposition body and its content type, aggregated across workers in multiprocess mode."""
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the multiprocess directory on shutdown."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency and body size per route template
+    (e.g. /{symbol}), so symbols never become label values. Requests that
+    match no route, including those rejected before routing, are grouped
+    under "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_SECONDS.labels(method, path, str(status)).observe(time.perf_counter() - started)
+            RESPONSE_BYTES.labels(method, path).observe(size)
@@ -0,0 +1,213 @@
+import os
+import uuid
+import shutil
+import struct
+import logging
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from services.bars import Bars, NS_PER_MINUTE
+from services.bar_file import replace_file
+
+logger = logging.getLogger(__name__)
+
+# One append-only file per symbol and trading session (little endian):
+#   40-byte header: magic, format version, flags, record size, session open (epoch ns),
+#                   price base (ticks), last update (epoch ns)
+#   records: minute since the open uint16, volume uint32, open/high/low/close int32 (22 bytes)
+# Prices are stored in ticks of 1/PRICE_SCALE relative to the file's base, so
+# decimal prices round-trip exactly where float32 would print as 123.45600128.
+# A full 390-minute session takes about 8.6 KB, under half a float64 bar file.
+# Refreshes append the bars from the last stored minute onwards, so a minute
+# can appear more than once while the session is open; readers keep its last
+# record. Once the session is over the file is rewritten without duplicates
+# and flagged as sealed.
+MAGIC = b"TPMINS\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIqqq")
+HEADER_SIZE = HEADER.size
+UPDATED_OFFSET = HEADER_SIZE - 8
+FLAG_SEALED = 1
+FILE_SUFFIX = ".min"
+PRICE_SCALE = 10_000
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+RECORD = np.dtype([
+    ("minute", "<u2"),
+    ("volume", "<u4"),
+    ("open", "<i4"),
+    ("high", "<i4"),
+    ("low", "<i4"),
+    ("close", "<i4"),
+])
+MAX_VOLUME = np.iinfo(np.uint32).max
+TICK_RANGE = np.iinfo(np.int32)
+
+
+def normalize(bars: Bars) -> Bars:
+    """
+    Bars as they read back from a file: rows with missing prices dropped and
+    prices rounded to the stored precision. Apply before keeping fetched bars
+    in memory, so every worker sees the same values.
+    """
+    prices = [np.asarray(getattr(bars, name), dtype=np.float64) for name in PRICE_FIELDS]
+    valid = np.flatnonzero(np.isfinite(prices[0] + prices[1] + prices[2] + prices[3]))
+    return Bars(
+        bars.time[valid],
+        *(np.rint(values[valid] * PRICE_SCALE) / PRICE_SCALE for values in prices),
+        bars.volume[valid],
+    )
+
+
+def price_base(bars: Bars) -> int:
+    """Base for a new file: the first open, in ticks."""
+    return int(np.rint(bars.open[0] * PRICE_SCALE)) if not bars.is_empty else 0
+
+
+def encode_records(bars: Bars, session_open: int, base: int) -> bytes:
+    """Records for minute bars of the session opening at `session_open` (epoch ns)."""
+    records = np.empty(len(bars), dtype=RECORD)
+    records["minute"] = (bars.time - session_open) // NS_PER_MINUTE
+    records["volume"] = np.clip(bars.volume, 0, MAX_VOLUME)
+    for name in PRICE_FIELDS:
+        ticks = np.rint(np.asarray(getattr(bars, name), dtype=np.float64) * PRICE_SCALE).astype(np.int64) - base
+        if len(ticks) and (ticks.min() < TICK_RANGE.min or ticks.max() > TICK_RANGE.max):
+            raise ValueError("Minute bar prices out of range for the file's price base")
+        records[name] = ticks
+    return records.tobytes()
+
+
+def decode_records(buffer: bytes, session_open: int, base: int) -> Bars:
+    """Bars from appended records, keeping the last record written for each minute."""
+    records = np.frombuffer(buffer, dtype=RECORD, count=len(buffer) // RECORD.itemsize)
+    if len(records) == 0:
+        return Bars.empty()
+    minute = records["minute"]
+    order = np.argsort(minute, kind="stable")
+    minute = minute[order]
+    keep = np.append(minute[1:] != minute[:-1], True)
+    rows = records[order[keep]]
+    return Bars(
+        session_open + rows["minute"].astype(np.int64) * NS_PER_MINUTE,
+        *((rows[name].astype(np.int64) + base) / PRICE_SCALE for name in PRICE_FIELDS),
+        rows["volume"],
+    )
+
+
+def _header(session_open: int, base: int, updated: datetime, sealed: bool) -> bytes:
+    flags = FLAG_SEALED if sealed else 0
+    return HEADER.pack(MAGIC, VERSION, flags, RECORD.itemsize, session_open, base, _to_ns(updated))
+
+
+def _to_ns(value: datetime) -> int:
+    return int(value.timestamp() * 1_000_000) * 1000
+
+
+class MinuteFileStore:
+    """
+    Minute bars partitioned by trading session and symbol, as
+    `<directory>/<session date>/<symbol>.min`. Files are small enough to be
+    read whole instead of mapped, and whole sessions are dropped at once by
+    removing their directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol: str, session: date) -> str:
+        return os.path.join(self.directory, session.isoformat(), f"{symbol}{FILE_SUFFIX}")
+
+    def get(self, symbol: str, session: date):
+        """{"bars", "updated", "sealed", "rows"} for a stored session, or None."""
+        path = self.path(symbol, session)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER_SIZE:
+            return None
+
+        magic, version, flags, record_size, session_open, base, updated_ns = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+            logger.warning(f"Ignoring minute file {path} with unknown format")
+            return None
+
+        # A record still being appended by another worker is left for the next read
+        body = memoryview(data)[HEADER_SIZE:]
+        rows = len(body) // RECORD.itemsize
+        return {
+            "bars": decode_records(body[:rows * RECORD.itemsize], session_open, base),
+            "updated": datetime.fromtimestamp(updated_ns / 1e9, tz=timezone.utc),
+            "sealed": bool(flags & FLAG_SEALED),
+            "rows": rows,
+        }
+
+    def append(self, symbol: str, session: date, session_open: int, bars: Bars, updated: datetime):
+        """Append minute bars, superseding stored records for the same minutes, and stamp the update time."""
+        path = self.path(symbol, session)
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            self.write(symbol, session, session_open, bars, updated)
+            return
+        with f:
+            base = HEADER.unpack(f.read(HEADER_SIZE))[5]
+            f.seek(0, os.SEEK_END)
+            f.write(encode_records(bars, session_open, base))
+            f.flush()
+            # Stamped after the records, so a reader never sees an update time newer than its bars
+            f.seek(UPDATED_OFFSET)
+            f.write(struct.pack("<q", _to_ns(updated)))
+
+    def write(self, symbol: str, session: date, session_open: int, bars: Bars, updated: datetime,
+              sealed: bool = False):
+        """Replace the session's file atomically with exactly `bars`."""
+        path = self.path(symbol, session)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}-{uuid.uuid4().hex}.tmp"
+        base = price_base(bars)
+        with open(tmp_path, "wb") as f:
+            f.write(_header(session_open, base, updated, sealed))
+            f.write(encode_records(bars, session_open, base))
+        replace_file(tmp_path, path)
+
+    def sessions(self) -> list:
+        """Stored session dates, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            try:
+                found.append(date.fromisoformat(name))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def prune(self, keep_from: date, match=None):
+        """
+        Delete every session before `keep_from`, or only the files of symbols
+        for which `match(symbol)` is true, so markets with different session
+        dates can be pruned independently.
+        """
+        for session in self.sessions():
+            if session >= keep_from:
+                continue
+            directory = os.path.join(self.directory, session.isoformat())
+            if match is None:
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            for name in os.listdir(directory):
+                if name.endswith(FILE_SUFFIX) and match(name[:-len(FILE_SUFFIX)]):
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except FileNotFoundError:
+                        pass
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass  # still holds other markets' files
+
+    def clear(self):
+        for session in self.sessions():
+            shutil.rmtree(os.path.join(self.directory, session.isoformat()), ignore_errors=True)
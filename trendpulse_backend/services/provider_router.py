@@ -0,0 +1,277 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+import httpx
+import numpy as np
+
+from services.metrics import PROVIDER_HEDGES, PROVIDER_FAILOVERS, CIRCUIT_OPENED
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("prices", "price_range", "price_ranges", "details", "fundamentals", "quote")
+
+
+class ProvidersUnavailable(Exception):
+    """Raised when every provider for an operation is circuit-broken."""
+
+
+def is_provider_failure(error: Exception, upstream_errors: tuple = ()) -> bool:
+    """
+    Whether `error` says the provider is unwell: a transport error or
+    timeout, a 5xx or 429 response, or one of the provider's own
+    `upstream_errors` (such as its rate limit). Anything else, like an
+    unknown symbol or an unsupported period, is about the request.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, (OSError, httpx.TransportError, *upstream_errors))
+
+
+class ProviderHealth:
+    """
+    Latency and error tracking for one provider and operation, plus its
+    circuit breaker.
+
+    Latencies of successful calls are kept in a sliding window of `window`
+    samples. After `failure_threshold` consecutive failures the
+    circuit opens and the provider is skipped for `cooldown` seconds; then a
+    single trial call is let through (half-open), which closes the circuit
+    on success and reopens it on failure.
+    """
+
+    def __init__(self, window: int = 200, failure_threshold: int = 5, cooldown: float = 30, min_samples: int = 20):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)  # seconds
+        self.calls = 0
+        self.errors = 0
+        self.error_rate = 0.0  # exponentially weighted, ~last 20 calls
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.trial else "open"
+
+    def allow(self, now: float) -> bool:
+        """Whether a call may go out now; claims the trial call when half-open."""
+        if self.opened_at is None:
+            return True
+        if self.trial or now - self.opened_at < self.cooldown:
+            return False
+        self.trial = True
+        return True
+
+    def p95(self):
+        if len(self.latencies) < self.min_samples:
+            return None
+        return float(np.percentile(self.latencies, 95))
+
+    def success(self, seconds: float):
+        self.calls += 1
+        self.error_rate *= 0.95
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.latencies.append(seconds)
+
+    def failure(self, now: float) -> bool:
+        """Record a failed call; returns True when this opens the circuit."""
+        self.calls += 1
+        self.errors += 1
+        self.error_rate = self.error_rate * 0.95 + 0.05
+        self.consecutive_failures += 1
+        if self.trial or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+            self.opened_at = now
+            self.trial = False
+            return True
+        return False
+
+    def cancelled(self):
+        # A cancelled hedge or a rejected request tells us nothing, but must not hold the trial slot
+        self.trial = False
+
+    def to_dict(self) -> dict:
+        p95 = self.p95()
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+        }
+
+
+class ProviderRouter:
+    """
+    Drop-in replacement for `FetchData` that spreads each operation over an
+    ordered list of providers.
+
+    The first available provider is called. If it has not answered by its
+    observed p95 latency for that operation (clamped to
+    [`hedge_min`, `hedge_max`]; `hedge_max` until there are enough samples),
+    a hedged request goes to the next provider and whichever succeeds first
+    wins; the other call is cancelled. A provider that fails is replaced by
+    the next one straight away, and providers whose circuit is open are
+    skipped. Health is tracked per provider and operation (see
+    ProviderHealth), and only provider failures count against it (see
+    `is_provider_failure`); errors about the request itself, like an
+    unknown symbol, are raised to the caller as they are.
+
+    `routes` maps operation names (OPERATIONS) to provider orders; other
+    operations use `order`. Batch price calls that fail for some symbols
+    retry just those symbols on the remaining providers. Note that a cached
+    series may then be extended with bars from a different provider.
+    """
+
+    def __init__(self, fetchers: dict, order: list, routes: dict = None, hedge_min: float = 0.05,
+                 hedge_max: float = 2.0, health: dict = None):
+        unknown = [name for name in [*order, *(n for names in (routes or {}).values() for n in names)]
+                   if name not in fetchers]
+        if unknown:
+            raise ValueError(f"No fetcher for providers: {unknown}")
+        self.fetchers = fetchers  # {name: FetchData}
+        self.order = list(order)
+        self.routes = routes or {}
+        self.hedge_min = hedge_min
+        self.hedge_max = hedge_max
+        # {(provider, operation): ProviderHealth}
+        self.health = health or {(name, operation): ProviderHealth() for name in fetchers for operation in OPERATIONS}
+
+    @property
+    def provider(self) -> str:
+        return self.order[0]
+
+    def providers_for(self, operation: str) -> list:
+        return self.routes.get(operation, self.order)
+
+    def _hedge_delay(self, name: str, operation: str) -> float:
+        p95 = self.health[name, operation].p95()
+        return self.hedge_max if p95 is None else min(max(p95, self.hedge_min), self.hedge_max)
+
+    async def _attempt(self, name: str, operation: str, call):
+        health = self.health[name, operation]
+        started = time.monotonic()
+        try:
+            result = await call(self.fetchers[name])
+        except asyncio.CancelledError:
+            health.cancelled()
+            raise
+        except Exception as e:
+            if not self._provider_failure(name, e):
+                health.cancelled()
+                raise
+            if health.failure(time.monotonic()):
+                CIRCUIT_OPENED.labels(name, operation).inc()
+                logger.warning(f"Circuit opened for {name} {operation} after: {str(e)}")
+            raise
+        health.success(time.monotonic() - started)
+        return result
+
+    async def _call(self, operation: str, call, exclude=()) -> tuple:
+        """Run `call(fetcher)` with hedging and failover; returns (provider, result)."""
+        candidates = iter([name for name in self.providers_for(operation) if name not in exclude])
+        pending = {}  # {task: provider}
+        last_error = None
+
+        def launch():
+            for name in candidates:
+                if self.health[name, operation].allow(time.monotonic()):
+                    pending[asyncio.ensure_future(self._attempt(name, operation, call))] = name
+                    return name
+            return None
+
+        current = launch()
+        if current is None:
+            raise ProvidersUnavailable(f"No provider available for {operation}")
+
+        try:
+            hedged = False
+            while pending:
+                timeout = None if hedged else self._hedge_delay(current, operation)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if launch() is not None:
+                        PROVIDER_HEDGES.labels(operation).inc()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        return name, task.result()
+                    last_error = task.exception()
+                    if not self._provider_failure(name, last_error):
+                        raise last_error  # the request itself was rejected: no other provider will do better
+                    logger.warning(f"{name} failed {operation}: {str(last_error)}")
+
+                if not pending:
+                    current = launch()
+                    if current is None:
+                        break
+                    hedged = False
+                    PROVIDER_FAILOVERS.labels(operation).inc()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error or ProvidersUnavailable(f"No provider available for {operation}")
+
+    async def fetch_stock_prices(self, symbol: str, period: str = "6mo"):
+        return (await self._call("prices", lambda f: f.fetch_stock_prices(symbol, period)))[1]
+
+    async def fetch_price_range(self, symbol: str, interval: str, start=None, end=None):
+        return (await self._call("price_range", lambda f: f.fetch_price_range(symbol, interval, start, end)))[1]
+
+    async def fetch_price_ranges(self, symbols: list, interval: str, start=None, end=None) -> dict:
+        """Fetch several symbols at once; returns {symbol: DataFrame or exception}."""
+
+        async def call(fetcher, symbols=symbols):
+            results = await fetcher.fetch_price_ranges(symbols, interval, start, end)
+            errors = [value for value in results.values() if isinstance(value, Exception)]
+            if errors and len(errors) == len(results):
+                raise errors[0]
+            return results
+
+        name, results = await self._call("price_ranges", call)
+        failed = [
+            symbol for symbol, value in results.items()
+            if isinstance(value, Exception) and self._provider_failure(name, value)
+        ]
+        if failed:
+            try:
+                _, retried = await self._call("price_ranges", lambda f: call(f, failed), exclude=(name,))
+                results.update((symbol, value) for symbol, value in retried.items() if symbol in failed)
+            except Exception as e:
+                logger.warning(f"No fallback for {len(failed)} symbols: {str(e)}")
+        return results
+
+    async def fetch_stock_details(self, symbol: str):
+        return (await self._call("details", lambda f: f.fetch_stock_details(symbol)))[1]
+
+    async def fetch_stock_fundamentals(self, symbol: str) -> dict:
+        return (await self._call("fundamentals", lambda f: f.fetch_stock_fundamentals(symbol)))[1]
+
+    async def fetch_stock_quote(self, symbol: str) -> dict:
+        return (await self._call("quote", lambda f: f.fetch_stock_quote(symbol)))[1]
+
+    def _provider_failure(self, name: str, error: Exception) -> bool:
+        return is_provider_failure(error, getattr(self.fetchers[name], "upstream_errors", ()))
+
+    def stats(self) -> dict:
+        stats = {}
+        for (name, operation), health in self.health.items():
+            stats.setdefault(name, {})[operation] = health.to_dict()
+        return stats
+
+    async def aclose(self):
+        for fetcher in self.fetchers.values():
+            await fetcher.aclose()
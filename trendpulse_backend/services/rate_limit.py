@@ -0,0 +1,133 @@
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.responses import JSONResponse
+
+from services.metrics import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBucketStore:
+    """
+    Per-process token buckets. Clients are kept in least-recently-seen order,
+    so idle ones (whose bucket would be full again anyway) are evicted from
+    the front in O(1), and the table never holds more than `max_clients`.
+    """
+
+    executor = None  # cheap enough to run on the event loop
+
+    def __init__(self, max_clients: int = 100_000):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # {client: (tokens, last_seen)}
+        self._lock = Lock()
+
+    def take(self, client: str, now: float, capacity: float, rate: float):
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+
+            idle_after = capacity / rate
+            while self._buckets:
+                oldest, (_, seen) = next(iter(self._buckets.items()))
+                if len(self._buckets) <= self.max_clients and now - seen < idle_after:
+                    break
+                del self._buckets[oldest]
+
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class DiskBucketStore:
+    """
+    Token buckets in a shared diskcache directory, so every uvicorn worker
+    enforces the same limit. Each update is one small SQLite transaction,
+    and entries expire on their own once a client has been idle long enough
+    to refill its bucket.
+
+    Give it a cache of its own opened with a short SQLite `timeout`: under
+    lock contention between workers it should fail fast (and open) rather
+    than queue. The middleware runs `take` on the store's own small thread
+    pool, so limiter checks never wait behind blocking provider fetches in
+    the default executor.
+    """
+
+    def __init__(self, cache, prefix: str = "ratelimit", threads: int = 4):
+        self.cache = cache
+        self.prefix = prefix
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ratelimit")
+
+    def take(self, client: str, now: float, capacity: float, rate: float):
+        key = f"{self.prefix}:{client}"
+        with self.cache.transact():
+            tokens, last = self.cache.get(key, default=(capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.cache.set(key, (tokens, now), expire=capacity / rate)
+
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.cache.close()
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI token-bucket rate limiter keyed by client IP: each client may
+    burst up to `limit` requests and regains `limit` requests per `window`
+    seconds. Checks are O(1) per request.
+    """
+
+    def __init__(self, app, limit: int, window: float, store=None):
+        self.app = app
+        self.capacity = float(limit)
+        self.rate = limit / window
+        self.store = store or MemoryBucketStore()
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        try:
+            args = (client_ip, time.time(), self.capacity, self.rate)
+            if self.store.executor is not None:
+                loop = asyncio.get_running_loop()
+                allowed, retry_after = await loop.run_in_executor(self.store.executor, self.store.take, *args)
+            else:
+                allowed, retry_after = self.store.take(*args)
+        except Exception as e:
+            # Never turn a broken limiter store into an outage
+            logger.error(f"Rate limiter store failed: {e!r}")
+            allowed, retry_after = True, 0.0
+
+        if not allowed:
+            self.rejected += 1
+            RATE_LIMITED.inc()
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded. Try again later."},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
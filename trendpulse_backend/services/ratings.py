@@ -0,0 +1,143 @@
+import math
+
+from services.bars import Bars
+from services.indicator_engine import INDICATOR_COLUMNS, IndicatorPlan, compute_indicators
+
+# Backend port of the frontend's recommendationUtils (generateRecommendations
+# and generateFinalRating). Keep the messages and keywords in sync with it:
+# the rating is scored from the message text.
+
+STRONG_BUY_WORDS = ("strong bullish", "strong upward momentum", "oversold", "bounce", "rebound")
+BUY_WORDS = ("bullish", "upward momentum", "mild bullish", "slight bullish", "potential bounce")
+HOLD_WORDS = ("neutral", "normal", "balanced", "stable")
+SELL_WORDS = ("bearish", "downward momentum", "mild bearish", "slight bearish", "overbought", "correction")
+STRONG_SELL_WORDS = ("strong bearish", "very overbought", "reversal", "caution")
+
+
+def latest_snapshot(plan: IndicatorPlan, bars: Bars) -> dict:
+    """
+    Latest bar and indicator values of `bars`, computed over the whole series
+    like /indicators so EMA and MACD match its last row exactly. Columns are
+    named as in /indicators; undefined values are NaN.
+    """
+    columns = compute_indicators(plan, bars.close, bars.high, bars.low)
+    latest = {
+        "Open": float(bars.open[-1]),
+        "High": float(bars.high[-1]),
+        "Low": float(bars.low[-1]),
+        "Close": float(bars.close[-1]),
+        "Volume": int(bars.volume[-1]),
+    }
+    for name, values in columns.items():
+        latest[name] = float(values[-1])
+    return latest
+
+
+def generate_recommendations(latest: dict, plan: IndicatorPlan) -> list:
+    """
+    One {"indicator", "message"} per requested indicator, from the latest
+    values. Undefined values reach the frontend as null, which JavaScript
+    arithmetic and comparisons treat as 0, so NaN is read as 0 here.
+    """
+    latest = {name: 0.0 if math.isnan(value) else value for name, value in latest.items()}
+    recs = []
+    close = latest["Close"]
+    for name, params in plan.specs:
+        value = {column: latest[plan.key(name, column, params)] for column in INDICATOR_COLUMNS.get(name, ())}
+        if name == "SMA":
+            sma = value["SMA"]
+            diff = close - sma
+            if diff > sma * 0.02:
+                message = "Price is well above SMA — strong bullish trend."
+            elif diff > 0:
+                message = "Price is slightly above SMA — mild bullish trend."
+            elif diff < -sma * 0.02:
+                message = "Price is well below SMA — strong bearish trend."
+            else:
+                message = "Price is slightly below SMA — mild bearish trend."
+        elif name == "EMA":
+            ema = value["EMA"]
+            diff = close - ema
+            if diff > ema * 0.02:
+                message = "Price well above EMA — strong upward momentum."
+            elif diff > 0:
+                message = "Price slightly above EMA — upward momentum."
+            elif diff < -ema * 0.02:
+                message = "Price well below EMA — strong downward momentum."
+            else:
+                message = "Price slightly below EMA — downward momentum."
+        elif name == "RSI":
+            rsi = value["RSI"]
+            if rsi >= 80:
+                message = "RSI above 80 — very overbought, potential reversal."
+            elif rsi >= 70:
+                message = "RSI above 70 — overbought conditions."
+            elif rsi >= 60:
+                message = "RSI moderately high — slight bullish momentum."
+            elif 40 < rsi < 60:
+                message = "RSI neutral — balanced momentum."
+            elif 30 < rsi <= 40:
+                message = "RSI moderately low — slight bearish momentum."
+            elif rsi <= 30:
+                message = "RSI below 30 — oversold, possible rebound."
+            else:
+                message = "RSI very low — strong oversold, watch for bounce."
+        elif name == "MACD":
+            macd_diff = value["MACD"] - value["MACD_Signal"]
+            if macd_diff > 0.01:
+                message = "MACD strongly above signal — bullish momentum."
+            elif macd_diff > 0:
+                message = "MACD slightly above signal — mild bullish."
+            elif macd_diff < -0.01:
+                message = "MACD strongly below signal — bearish momentum."
+            else:
+                message = "MACD slightly below signal — mild bearish."
+        elif name == "BB":
+            if close < value["BB_LBand"]:
+                message = "Price below lower band — potential bullish bounce."
+            elif close > value["BB_UBand"]:
+                message = "Price above upper band — overbought, possible correction."
+            else:
+                message = "Price within bands — normal volatility."
+            name = "Bollinger Bands"
+        elif name == "ATR":
+            # ATR alone doesn't say buy or sell, just volatility
+            if value["ATR"] > 5:
+                message = "High ATR — expect increased volatility, caution advised."
+            else:
+                message = "Low ATR — stable price action."
+        else:
+            continue
+        recs.append({"indicator": name, "message": message})
+    return recs
+
+
+def rating_score(recommendations: list) -> int:
+    score = 0
+    for rec in recommendations:
+        message = rec["message"].lower()
+        if any(word in message for word in STRONG_BUY_WORDS):
+            score += 3
+        elif any(word in message for word in BUY_WORDS):
+            score += 2
+        elif any(word in message for word in HOLD_WORDS):
+            pass
+        elif any(word in message for word in SELL_WORDS):
+            score -= 2
+        elif any(word in message for word in STRONG_SELL_WORDS):
+            score -= 3
+    return score
+
+
+def final_rating(score: int) -> str:
+    if score >= 6:
+        return "Strong Buy"
+    if score >= 3:
+        return "Buy"
+    if score >= 1:
+        return "Moderate Buy"
+    if score == 0:
+        return "Hold"
+    if score >= -2:
+        return "Moderate Sell"
+    return "Sell"
@@ -0,0 +1,106 @@
+import time
+import heapq
+import asyncio
+import logging
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Keeps the most requested symbols warm so their requests never wait on
+    an upstream fetch.
+
+    Every request records its symbol; scores decay each tick, so popularity
+    follows recent traffic. On each tick the top `top_n` symbols are loaded
+    if they are not cached (after a restart or an eviction) and refreshed
+    when they expire within `lead`. Entries that expire at the next open are
+    refreshed up to `lead` before it, so the first requests of the session
+    find them fresh; pick `lead` above `interval` so a tick lands in time.
+
+    Symbols whose refresh fails or finds no data (unknown tickers) are
+    retried after an exponential backoff, from `interval` up to
+    `max_backoff` seconds, instead of on every tick.
+
+    At most `concurrency` refreshes run at once, leaving the upstream
+    connection budget to live requests.
+    """
+
+    def __init__(self, bar_store, top_n: int = 50, interval: float = 30, lead: timedelta = timedelta(minutes=1),
+                 concurrency: int = 4, decay: float = 0.9, max_backoff: float = 3600):
+        self.bar_store = bar_store
+        self.top_n = top_n
+        self.interval = interval
+        self.lead = lead
+        self.decay = decay
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._scores = {}  # {symbol: decayed request count}
+        self._backoff = {}  # {symbol: (consecutive failures, monotonic time of the next attempt)}
+        self.refreshed = 0
+        self.failed = 0
+
+    def record(self, symbol: str):
+        self._scores[symbol] = self._scores.get(symbol, 0.0) + 1.0
+
+    def hot(self) -> list:
+        return heapq.nlargest(self.top_n, self._scores, key=self._scores.get)
+
+    async def run(self):
+        """Tick forever; started and cancelled by the FastAPI lifespan."""
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Refresh scheduler tick failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def tick(self):
+        hot = self.hot()
+        now = time.monotonic()
+        due = [
+            symbol for symbol in hot
+            if self._backoff.get(symbol, (0, now))[1] <= now and self.bar_store.needs_revalidation(symbol, self.lead)
+        ]
+        if due:
+            logger.info(f"Refreshing {len(due)} of {len(hot)} hot symbols ahead of requests")
+            await asyncio.gather(*(self._refresh(symbol) for symbol in due))
+
+        # Forget symbols nobody has asked for in a while
+        self._scores = {
+            symbol: score * self.decay
+            for symbol, score in self._scores.items()
+            if score * self.decay >= 0.01
+        }
+        self._backoff = {symbol: state for symbol, state in self._backoff.items() if symbol in self._scores}
+
+    async def _refresh(self, symbol: str):
+        async with self._semaphore:
+            try:
+                bars = await self.bar_store.revalidate(symbol, self.lead)
+            except Exception as e:
+                self._back_off(symbol)
+                logger.error(f"Scheduled refresh of {symbol} failed: {str(e)}")
+                return
+            if bars.is_empty:
+                self._back_off(symbol)
+                logger.warning(f"Scheduled refresh of {symbol} found no data")
+                return
+            self._backoff.pop(symbol, None)
+            self.refreshed += 1
+
+    def _back_off(self, symbol: str):
+        self.failed += 1
+        failures = self._backoff.get(symbol, (0, 0.0))[0] + 1
+        delay = min(self.interval * 2 ** (failures - 1), self.max_backoff)
+        self._backoff[symbol] = (failures, time.monotonic() + delay)
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._scores),
+            "hot": self.hot(),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "backing_off": len(self._backoff),
+        }
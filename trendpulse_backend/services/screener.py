@@ -0,0 +1,76 @@
+import operator
+
+import numpy as np
+
+from services.bars import stack_columns
+from services.indicator_engine import IndicatorPlan, compute_indicators
+
+# Comparison operators accepted in screener conditions
+SCREENER_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def latest_values(plan: IndicatorPlan, bars_list: list) -> dict:
+    """
+    Latest price and indicator values for every series, as one float64
+    array per column (one entry per series). Indicators are computed over a
+    single (symbols x bars) matrix, keyed by `IndicatorPlan.labels`.
+
+    Values are taken at the newest bar time among the series. A series
+    without a bar at that time (halted, or its exchange was closed) has NaN
+    there, so it never matches a condition against other series' current
+    values.
+    """
+    stacked, offsets = stack_columns(bars_list)
+    columns = compute_indicators(plan, stacked["close"], stacked["high"], stacked["low"], offsets, labelled=True)
+
+    latest = {
+        "Open": np.array([bars.open[-1] for bars in bars_list], dtype=np.float64),
+        "High": stacked["high"][:, -1],
+        "Low": stacked["low"][:, -1],
+        "Close": stacked["close"][:, -1],
+        "Volume": np.array([bars.volume[-1] for bars in bars_list], dtype=np.float64),
+    }
+    for label, values in columns.items():
+        latest[label] = values[:, -1]
+
+    last_times = np.array([bars.time[-1] for bars in bars_list], dtype=np.int64)
+    behind = last_times < last_times.max(initial=np.iinfo(np.int64).min)
+    return {name: np.where(behind, np.nan, values) for name, values in latest.items()}
+
+
+def screen(latest: dict, conditions, sort_by: str = None, descending: bool = True, limit: int = None) -> np.ndarray:
+    """
+    Indices of the series whose latest values satisfy every condition, ranked
+    by `sort_by` (NaN last) or in input order. Each condition is
+    (left, op, right), where left is a column name and right is a column
+    name or a number. A NaN on either side never matches. Raises ValueError
+    for unknown columns or operators.
+    """
+    size = len(next(iter(latest.values()))) if latest else 0
+    mask = np.ones(size, dtype=bool)
+    for left, op, right in conditions:
+        if op not in SCREENER_OPS:
+            raise ValueError(f"Unsupported operator: {op}")
+        mask &= SCREENER_OPS[op](_operand(latest, left), _operand(latest, right))
+
+    matches = np.flatnonzero(mask)
+    if sort_by is not None:
+        keys = _operand(latest, sort_by)[matches]
+        keys = -keys if descending else keys
+        matches = matches[np.argsort(keys, kind="stable")]
+    return matches[:limit] if limit is not None else matches
+
+
+def _operand(latest: dict, value):
+    if isinstance(value, str):
+        if value not in latest:
+            raise ValueError(f"Unknown column: {value}")
+        return latest[value]
+    return float(value)
@@ -0,0 +1,92 @@
+import json
+from typing import NamedTuple
+
+import numpy as np
+
+from services.bars import Bars
+
+# Response shapes accepted by the `format` request field
+RESPONSE_FORMATS = ("records", "columnar")
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def format_times(time: np.ndarray) -> list:
+    """
+    ISO strings for epoch-ns UTC bar times: '%Y-%m-%d' when every bar starts
+    at midnight UTC, otherwise '%Y-%m-%dT%H:%M:%S'.
+    """
+    time = np.asarray(time, dtype=np.int64)
+    has_time = bool(((time // NS_PER_SECOND) % 86_400 != 0).any())
+    return np.datetime_as_string(time.view("datetime64[ns]"), unit="s" if has_time else "D").tolist()
+
+
+def column_to_list(values: np.ndarray, integer: bool = False) -> list:
+    """
+    Convert a column to Python values in one call, with NaN/inf encoded as
+    None. With `integer`, the other values of a float column are sent as
+    ints, e.g. volumes that were screened as floats.
+    """
+    values = np.asarray(values)
+    invalid = ~np.isfinite(values) if values.dtype.kind == "f" else None
+    if integer and invalid is not None:
+        values = np.where(invalid, 0, values).astype(np.int64)
+    out = values.tolist()
+    if invalid is not None:
+        for i in np.flatnonzero(invalid).tolist():
+            out[i] = None
+    return out
+
+
+def bar_columns(bars: Bars, extra: dict = None) -> dict:
+    """Response columns for bars plus any aligned indicator columns, as Python lists."""
+    columns = {
+        "Date": format_times(bars.time),
+        "Open": column_to_list(bars.open),
+        "High": column_to_list(bars.high),
+        "Low": column_to_list(bars.low),
+        "Close": column_to_list(bars.close),
+        "Volume": column_to_list(bars.volume),
+    }
+    for name, values in (extra or {}).items():
+        columns[name] = column_to_list(values)
+    return columns
+
+
+def shape_columns(columns: dict, fmt: str = "records"):
+    """
+    Return `columns` as-is for the columnar format ({"Date": [...], ...}),
+    or as the default list of per-row records.
+    """
+    if fmt == "columnar":
+        return columns
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def dumps(payload) -> bytes:
+    """Compact JSON with the same settings as Starlette's JSONResponse."""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class BarSeries(NamedTuple):
+    """Placeholder in a response payload for bars plus aligned indicator columns."""
+    bars: Bars
+    extra: dict = None
+
+
+def encode_payload(payload, fmt: str = "records") -> bytes:
+    """
+    The whole encode stage in one call: every BarSeries in `payload` is
+    rendered with bar_columns/shape_columns, then the result is dumped.
+    Module-level so it can run in a process pool.
+    """
+    return dumps(_render(payload, fmt))
+
+
+def _render(value, fmt: str):
+    if isinstance(value, BarSeries):
+        return shape_columns(bar_columns(value.bars, value.extra), fmt)
+    if isinstance(value, dict):
+        return {key: _render(item, fmt) for key, item in value.items()}
+    return value
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# How long a worker waits for another worker's fetch before doing its own
+LOCK_TIMEOUT_SECONDS = 30
+LOCK_POLL_SECONDS = 0.05
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single call.
+
+    Within a process, the first caller starts the work and every concurrent
+    caller awaits the same task, sharing its result or its exception. When a
+    `lock_dir` is given, the work also runs under an exclusive file lock in
+    that directory, so only one uvicorn worker at a time fetches a given key.
+    The wrapped function should re-check the shared cache first, because the
+    previous lock holder has usually just filled it.
+    """
+
+    def __init__(self, lock_dir: str = None):
+        self.lock_dir = lock_dir
+        self._inflight = {}  # {key: asyncio.Task}
+        if lock_dir and fcntl is not None:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    async def do(self, key: str, fn):
+        """Run `fn()` (a coroutine function) once for all concurrent callers with this key."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight fetch for {key}")
+        # A cancelled waiter must not cancel the fetch other waiters share
+        return await asyncio.shield(task)
+
+    async def do_many(self, keys: list, fn) -> dict:
+        """
+        Batch variant of `do`. Keys already in flight are joined; the rest are
+        fetched together by one call to `fn(missing_keys)`, which returns a
+        dict of key -> result or exception. Each key is registered as in
+        flight, so single-key callers arriving meanwhile join the batch.
+        Returns a dict of key -> result or exception.
+
+        Batches only coalesce within the process; `fn` should re-check the
+        shared cache for keys another worker has filled.
+        """
+        waiting = {key: self._inflight[key] for key in keys if key in self._inflight}
+        missing = [key for key in keys if key not in waiting]
+
+        if missing:
+            batch = asyncio.ensure_future(fn(missing))
+            for key in missing:
+                task = asyncio.ensure_future(self._pick(batch, key))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+                waiting[key] = task
+
+        results = await asyncio.gather(
+            *(asyncio.shield(task) for task in waiting.values()),
+            return_exceptions=True,
+        )
+        return dict(zip(waiting, results))
+
+    @staticmethod
+    async def _pick(batch: asyncio.Future, key: str):
+        result = (await batch)[key]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def _run(self, key: str, fn):
+        if not self.lock_dir or fcntl is None:
+            return await fn()
+
+        fd = os.open(os.path.join(self.lock_dir, f"{key}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            locked = await self._acquire(fd)
+            if not locked:
+                logger.warning(f"Timed out waiting for cross-worker lock on {key}, fetching anyway")
+            try:
+                return await fn()
+            finally:
+                if locked:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    async def _acquire(fd: int) -> bool:
+        deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                await asyncio.sleep(LOCK_POLL_SECONDS)
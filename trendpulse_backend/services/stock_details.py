@@ -0,0 +1,97 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from services.single_flight import SingleFlight
+from services.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Fields of GET /{symbol}, in response order
+DETAILS_FIELDS = (
+    "symbol", "name", "sector", "listingExchange", "securityType", "currency",
+    "dividend", "dividendYield", "peRatio", "eps", "marketCap", "outstandingShares",
+    "exDividendDate", "open", "high", "low", "lastTradePrice", "volume",
+    "high52w", "low52w",
+)
+
+# Fields that move during the session; everything else is a fundamental
+QUOTE_FIELDS = ("open", "high", "low", "lastTradePrice", "volume")
+
+
+class StockDetailsCache:
+    """
+    Two-tier cache for stock details. Fundamentals (name, sector, dividend,
+    52-week range...) change at most daily and are kept for
+    `fundamentals_ttl`; the quote is kept for `quote_ttl`, or per `expiry`
+    (see BarStore) so it is not refetched while the market is closed.
+    Each tier is fetched on its own, so an expired quote never refetches
+    fundamentals. Entries live in the shared diskcache and misses go
+    through `SingleFlight`. A result that does not identify the symbol
+    (unknown or delisted) is kept as an empty dict for `miss_ttl` only.
+    """
+
+    def __init__(self, cache, fetcher, fundamentals_ttl: timedelta, quote_ttl: timedelta,
+                 flight: SingleFlight, expiry=None, miss_ttl: timedelta = timedelta(minutes=5)):
+        self.cache = cache
+        self.fetcher = fetcher
+        self.fundamentals_ttl = fundamentals_ttl
+        self.quote_ttl = quote_ttl
+        self.flight = flight
+        self.expiry = expiry
+        self.miss_ttl = miss_ttl
+
+    async def get(self, symbol: str) -> dict:
+        fundamentals, quote = await asyncio.gather(self.get_fundamentals(symbol), self.get_quote(symbol))
+        merged = {**fundamentals, **quote}
+        return {field: merged.get(field) for field in DETAILS_FIELDS}
+
+    async def get_fundamentals(self, symbol: str) -> dict:
+        return await self._get(
+            "fundamentals",
+            f"{symbol}-fundamentals",
+            lambda: self.fetcher.fetch_stock_fundamentals(symbol),
+            lambda now: self.fundamentals_ttl,
+            lambda value: bool(value.get("symbol")),
+        )
+
+    async def get_quote(self, symbol: str) -> dict:
+        return await self._get(
+            "quote",
+            f"{symbol}-quote",
+            lambda: self.fetcher.fetch_stock_quote(symbol),
+            lambda now: self._quote_ttl(symbol, now),
+            lambda value: value.get("lastTradePrice") is not None,
+        )
+
+    def _quote_ttl(self, symbol: str, now: datetime) -> timedelta:
+        if self.expiry is None:
+            return self.quote_ttl
+        try:
+            return self.expiry(symbol, now, self.quote_ttl) - now
+        except Exception as e:
+            logger.warning(f"Falling back to fixed quote TTL for {symbol}: {str(e)}")
+            return self.quote_ttl
+
+    async def _get(self, tier: str, key: str, fetch, ttl, found):
+        started = time.perf_counter()
+        value = self.cache.get(key)
+        record_cache(tier, "miss" if value is None else "hit", time.perf_counter() - started)
+        if value is not None:
+            logger.info(f"Using cached {key}")
+            return value
+
+        async def _load():
+            # Another worker may have stored it while we waited for the lock
+            value = self.cache.get(key)
+            if value is None:
+                value = await fetch()
+                if value and found(value):
+                    expire = ttl(datetime.now(timezone.utc))
+                else:
+                    value, expire = {}, self.miss_ttl
+                self.cache.set(key, value, expire=expire.total_seconds())
+            return value
+
+        return await self.flight.do(key, _load)
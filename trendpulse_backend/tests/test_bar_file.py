@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services import bar_file
+from services.bar_file import BarFileStore, read_bars, write_bars
+from services.bars import Bars, NS_PER_DAY, NS_PER_MINUTE
+from services.minute_file import MinuteFileStore, normalize
+
+UPDATED = datetime(2026, 10, 16, 20, 0, tzinfo=timezone.utc)
+SESSION = date(2026, 10, 16)
+SESSION_OPEN = int(datetime(2026, 10, 16, 13, 30, tzinfo=timezone.utc).timestamp()) * 1_000_000_000
+
+
+def _daily(count=5):
+    close = 100 + np.arange(count) * 0.25
+    return Bars(np.arange(count, dtype=np.int64) * NS_PER_DAY, close, close + 1, close - 1, close,
+                np.arange(count) * 1000)
+
+
+def _minutes(minutes, close):
+    close = np.asarray(close, dtype=np.float64)
+    time = SESSION_OPEN + np.asarray(minutes, dtype=np.int64) * NS_PER_MINUTE
+    return Bars(time, close, close + 0.01, close - 0.01, close, np.full(len(close), 100))
+
+
+def _columns(bars):
+    return {name: getattr(bars, name).tolist() for name in Bars.__slots__}
+
+
+@pytest.mark.parametrize("price_dtype", [np.float64, np.float32])
+def test_bar_file_round_trip(tmp_path, price_dtype):
+    bars = _daily()
+    path = str(tmp_path / "AAPL.bars")
+    loaded = UPDATED - timedelta(days=3)
+
+    write_bars(path, bars, UPDATED, price_dtype, loaded=loaded)
+    read, updated, read_loaded = read_bars(path)
+
+    assert (updated, read_loaded) == (UPDATED, loaded)
+    assert read.close.dtype == price_dtype and not read.close.flags.writeable
+    # Quarter steps are exact in float32 too
+    assert _columns(read) == _columns(bars)
+
+
+def test_bar_file_loaded_defaults_to_updated(tmp_path):
+    store = BarFileStore(str(tmp_path))
+
+    store.set("AAPL", {"bars": _daily(), "updated": UPDATED})
+    entry = store.get("AAPL")
+
+    assert entry["updated"] == entry["loaded"] == UPDATED
+    assert store.get("MSFT") is None
+
+
+def test_unreadable_bar_files_are_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "AAPL.bars")
+    write_bars(path, _daily(), UPDATED)
+    with open(path, "r+b") as f:
+        f.truncate(bar_file.HEADER_SIZE + 10)
+    assert read_bars(path) is None
+
+    monkeypatch.setattr(bar_file, "VERSION", bar_file.VERSION + 1)
+    write_bars(path, _daily(), UPDATED)
+    monkeypatch.undo()
+    assert read_bars(path) is None
+
+
+def test_minute_file_appends_supersede_earlier_minutes(tmp_path):
+    store = MinuteFileStore(str(tmp_path))
+    store.append("AAPL", SESSION, SESSION_OPEN, _minutes([0, 1, 2], [100.1234, 100.5, 101.0]), UPDATED)
+
+    # A refresh resends the still-forming minute 2 along with minute 3
+    later = UPDATED + timedelta(minutes=1)
+    store.append("AAPL", SESSION, SESSION_OPEN, _minutes([2, 3], [101.25, 99.75]), later)
+    entry = store.get("AAPL", SESSION)
+
+    assert entry["rows"] == 5 and entry["updated"] == later and not entry["sealed"]
+    # Prices come back as exact ticks, as normalize() leaves fetched bars
+    assert _columns(entry["bars"]) == _columns(normalize(_minutes([0, 1, 2, 3], [100.1234, 100.5, 101.25, 99.75])))
+
+
+def test_sealed_minute_file_is_rewritten_without_duplicates(tmp_path):
+    store = MinuteFileStore(str(tmp_path))
+    store.append("AAPL", SESSION, SESSION_OPEN, _minutes([0, 1], [50.0, 50.5]), UPDATED)
+    store.append("AAPL", SESSION, SESSION_OPEN, _minutes([1], [51.0]), UPDATED)
+
+    bars = store.get("AAPL", SESSION)["bars"]
+    store.write("AAPL", SESSION, SESSION_OPEN, bars, UPDATED, sealed=True)
+    entry = store.get("AAPL", SESSION)
+
+    assert entry["rows"] == 2 and entry["sealed"]
+    assert _columns(entry["bars"]) == _columns(bars)
+
+
+def test_prune_drops_old_sessions(tmp_path):
+    store = MinuteFileStore(str(tmp_path))
+    for session in (SESSION - timedelta(days=1), SESSION):
+        store.write("AAPL", session, SESSION_OPEN, _minutes([0], [10.0]), UPDATED)
+        store.write("SHOP.TO", session, SESSION_OPEN, _minutes([0], [10.0]), UPDATED)
+
+    store.prune(SESSION, match=lambda symbol: symbol.endswith(".TO"))
+    assert store.get("SHOP.TO", SESSION - timedelta(days=1)) is None
+    assert store.get("AAPL", SESSION - timedelta(days=1)) is not None
+
+    store.prune(SESSION)
+    assert store.sessions() == [SESSION]
@@ -0,0 +1,65 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from providers import yfinance_api
+from services.bars import Bars, NS_PER_DAY
+
+EXCHANGE_TZ = "America/New_York"
+DAYS = pd.bdate_range("2026-10-12", "2026-10-16")
+CLOSES = [1.0, 2.0, 3.0, 4.0, 5.0]
+TAIL = [4.5, 5.5]  # refreshed 2026-10-15 and 2026-10-16 bars
+
+
+def _frame(days, close):
+    return pd.DataFrame(
+        {"Open": close, "High": close, "Low": close, "Close": close, "Volume": np.arange(len(days)) + 1},
+        index=pd.DatetimeIndex(days, name="Date"),
+    )
+
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period=None, start=None, end=None, interval="1d"):
+        # Ticker.history always indexes daily bars by exchange-local midnight
+        days = DAYS if start is None else DAYS[3:]
+        return _frame(days.tz_localize(EXCHANGE_TZ), CLOSES if start is None else TAIL)
+
+
+class FakeYFinance:
+    Ticker = FakeTicker
+
+    @staticmethod
+    def download(symbols, interval="1d", group_by="ticker", ignore_tz=None, start=None, **kwargs):
+        # Like yf.download, drop the timezone of daily bars (naive midnight) unless ignore_tz=False
+        if ignore_tz is None:
+            ignore_tz = interval[-1] not in ("m", "h")
+        days = DAYS if start is None else DAYS[3:]
+        days = days if ignore_tz else days.tz_localize(EXCHANGE_TZ)
+        closes = CLOSES if start is None else TAIL
+        return pd.concat({symbol: _frame(days, closes) for symbol in symbols}, axis=1)
+
+
+def _single(start=None):
+    return Bars.from_frame(asyncio.run(yfinance_api.fetch_price_range("AAPL", "1d", start)))
+
+
+def _batch(start=None):
+    return Bars.from_frame(asyncio.run(yfinance_api.fetch_price_ranges(["AAPL"], "1d", start))["AAPL"])
+
+
+@pytest.mark.parametrize("load, refresh", [(_single, _batch), (_batch, _single)])
+def test_tail_from_either_fetch_path_merges_without_duplicates(monkeypatch, load, refresh):
+    monkeypatch.setattr(yfinance_api, "yf", FakeYFinance)
+
+    history = load()
+    merged = history.merge_tail(refresh(history.last_time))
+
+    # The still-forming 2026-10-15 bar is replaced, not duplicated, and 2026-10-16 is refreshed
+    assert len(merged) == 5
+    assert len(np.unique(merged.time // NS_PER_DAY)) == len(merged)
+    assert merged.close.tolist() == [1.0, 2.0, 3.0, 4.5, 5.5]
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.bar_file import BarFileStore
+from services.bar_store import BarStore, REFRESH_OVERLAP
+from services.memory_cache import MemoryCache
+from services.single_flight import SingleFlight
+
+DAYS = pd.bdate_range("2026-06-01", periods=60, tz="UTC")
+
+
+class FakeFetcher:
+    """A split-adjusting provider: `split` rescales every stored close, like auto_adjust after a split."""
+
+    def __init__(self):
+        self.close = 100 + np.arange(len(DAYS), dtype=np.float64)
+        self.days = len(DAYS) - 1  # bars published so far
+        self.starts = []
+
+    def split(self, ratio: float):
+        self.close = self.close / ratio
+
+    def frame(self, start=None):
+        close = self.close[:self.days]
+        frame = pd.DataFrame({
+            "Date": DAYS[:self.days], "Open": close, "High": close, "Low": close, "Close": close,
+            "Volume": np.full(self.days, 1000),
+        })
+        return frame if start is None else frame[frame["Date"] >= start].reset_index(drop=True)
+
+    async def fetch_price_range(self, symbol, interval, start=None, end=None):
+        self.starts.append(start)
+        return self.frame(start)
+
+    async def fetch_price_ranges(self, symbols, interval, start=None, end=None):
+        self.starts.append(start)
+        return {symbol: self.frame(start) for symbol in symbols}
+
+
+@pytest.fixture
+def fetcher():
+    return FakeFetcher()
+
+
+def _store(tmp_path, fetcher, full_reload=None):
+    # A zero TTL expires every entry straight away, so each read is a refresh
+    return BarStore(BarFileStore(str(tmp_path)), fetcher, timedelta(0), MemoryCache(10 ** 7), SingleFlight(),
+                    full_reload=full_reload)
+
+
+def _daily(store, batch):
+    if batch:
+        return asyncio.run(store.get_daily_many(["AAPL"]))["AAPL"]
+    return asyncio.run(store.get_daily("AAPL"))
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_refresh_fetches_an_overlap_and_appends(tmp_path, fetcher, batch):
+    store = _store(tmp_path, fetcher)
+    _daily(store, batch)
+    fetcher.days += 1
+
+    bars = _daily(store, batch)
+
+    assert fetcher.starts == [None, DAYS[fetcher.days - 1 - REFRESH_OVERLAP]]
+    assert bars.close.tolist() == fetcher.close.tolist()
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_readjusted_history_is_reloaded(tmp_path, fetcher, batch):
+    store = _store(tmp_path, fetcher)
+    _daily(store, batch)
+    fetcher.days += 1
+    fetcher.split(2)
+
+    bars = _daily(store, batch)
+
+    assert fetcher.starts[-1] is None
+    assert bars.close.tolist() == fetcher.close.tolist()
+
+
+def test_full_reload_backstop(tmp_path, fetcher):
+    store = _store(tmp_path, fetcher, full_reload=timedelta(days=7))
+    _daily(store, False)
+    entry = store.memory.peek(store.make_key("AAPL"))
+    entry["loaded"] = datetime.now(timezone.utc) - timedelta(days=8)
+
+    _daily(store, False)
+
+    assert fetcher.starts == [None, None]
+    assert store.memory.peek(store.make_key("AAPL"))["loaded"] > entry["loaded"]
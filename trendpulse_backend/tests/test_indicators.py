@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.bars import Bars, NS_PER_DAY
+from services.indicator_engine import plan_indicators, compute_indicators, compute_indicators_many
+
+INDICATORS = ("SMA", "EMA", "RSI", "MACD", "BB", "ATR")
+
+
+def _plan(*items):
+    return plan_indicators([
+        SimpleNamespace(**{"length": None, "fast": None, "slow": None, "signal": None, **item}) for item in items
+    ])
+
+
+def _bars(count, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    spread = rng.uniform(0.1, 2, count)
+    time = np.arange(count, dtype=np.int64) * NS_PER_DAY
+    return Bars(time, close, close + spread, close - spread, close, np.full(count, 1000, dtype=np.int64))
+
+
+def _baseline(bars: Bars) -> dict:
+    """The pandas formulas the array kernels replaced, with default parameters."""
+    close, high, low = pd.Series(bars.close), pd.Series(bars.high), pd.Series(bars.low)
+
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0.0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0.0)).rolling(14).mean()
+    rsi = 100 - (100 / (1 + gain / loss))
+
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    macd_columns = pd.DataFrame({"MACD": macd, "MACD_Signal": signal, "MACD_Histogram": macd - signal})
+    macd_columns.loc[:26 + 9 - 1] = np.nan
+
+    sma = close.rolling(20).mean()
+    std = close.rolling(20).std()
+    prev_close = close.shift(1)
+    true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+
+    return {
+        "SMA": sma,
+        "EMA": close.ewm(span=20, adjust=False).mean(),
+        "RSI": rsi.replace([np.inf, -np.inf], np.nan),
+        **dict(macd_columns.items()),
+        "BB_UBand": sma + std * 2,
+        "BB_LBand": sma - std * 2,
+        "ATR": true_range.rolling(14).mean(),
+    }
+
+
+@pytest.mark.parametrize("count", [10, 30, 300, 2000])
+def test_indicators_match_pandas_baseline(count):
+    # 2000 bars takes the EWM kernel off its short-series loop
+    bars = _bars(count)
+
+    columns = compute_indicators(_plan(*({"name": name} for name in INDICATORS)), bars.close, bars.high, bars.low)
+
+    for name, expected in _baseline(bars).items():
+        np.testing.assert_allclose(columns[name], expected.to_numpy(), rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_stacked_series_match_their_own_rows():
+    plan = _plan(*({"name": name} for name in INDICATORS))
+    bars_list = [_bars(300, seed=1), _bars(40, seed=2), _bars(0)]
+
+    stacked = compute_indicators_many(plan, bars_list)
+
+    for bars, columns in zip(bars_list, stacked):
+        own = compute_indicators(plan, bars.close, bars.high, bars.low)
+        for name, values in own.items():
+            np.testing.assert_allclose(columns[name], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_flat_prices_have_zero_band_width():
+    # A constant series is where sums of squares would cancel into noise
+    close = np.full(50, 1234.5678)
+
+    columns = compute_indicators(_plan({"name": "BB", "length": 2}), close)
+
+    assert np.isnan(columns["BB_UBand"][0])
+    assert columns["BB_UBand"][1:].tolist() == close[1:].tolist()
+    assert columns["BB_LBand"][1:].tolist() == close[1:].tolist()
+
+
+def test_repeated_indicators_keep_every_column():
+    bars = _bars(100)
+    plan = _plan({"name": "SMA", "length": 10}, {"name": "SMA", "length": 50}, {"name": "EMA"})
+
+    columns = compute_indicators(plan, bars.close)
+
+    assert list(columns) == plan.keys == ["SMA_10", "SMA_50", "EMA"]
+    np.testing.assert_allclose(columns["SMA_10"], pd.Series(bars.close).rolling(10).mean(), rtol=1e-9)
+    np.testing.assert_allclose(columns["SMA_50"], pd.Series(bars.close).rolling(50).mean(), rtol=1e-9)
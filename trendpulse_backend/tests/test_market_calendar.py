@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import market_utils
+from utils.market_utils import MarketCalendar
+
+TTL = timedelta(minutes=10)
+
+# Mon 2026-10-12 to Mon 2026-10-19, 9:30-16:00 New York time
+DAYS = pd.bdate_range("2026-10-12", periods=6)
+
+
+def _ns(text: str) -> int:
+    return pd.Timestamp(text, tz="America/New_York").value
+
+
+@pytest.fixture
+def calendar():
+    sessions = DAYS.values.astype("datetime64[D]").astype(np.int64)
+    opens = np.array([_ns(f"{day.date()} 09:30") for day in DAYS])
+    closes = np.array([_ns(f"{day.date()} 16:00") for day in DAYS])
+    # Covered far ahead, so lookups never extend the arrays from pandas_market_calendars
+    return MarketCalendar("NYSE", sessions, opens, closes, until=int(sessions[-1]) + 100_000)
+
+
+@pytest.mark.parametrize("updated, expires", [
+    # During a session the ttl applies
+    ("2026-10-13 09:30", "2026-10-13 09:40"),
+    ("2026-10-13 15:55", "2026-10-13 16:05"),
+    # and for one ttl past the close, so the final bar is picked up
+    ("2026-10-13 16:05", "2026-10-13 16:15"),
+    # After that, nothing changes before the next open
+    ("2026-10-13 16:10", "2026-10-14 09:30"),
+    ("2026-10-14 06:00", "2026-10-14 09:30"),
+    ("2026-10-14 09:29", "2026-10-14 09:30"),
+    # Over the weekend too
+    ("2026-10-16 18:00", "2026-10-19 09:30"),
+])
+def test_next_refresh_around_open_and_close(calendar, updated, expires):
+    assert calendar.next_refresh(_ns(updated), pd.Timedelta(TTL).value) == _ns(expires)
+
+
+def test_past_the_known_sessions_the_ttl_applies(calendar):
+    updated = _ns("2026-10-19 18:00")
+
+    assert calendar.next_refresh(updated, pd.Timedelta(TTL).value) == updated + pd.Timedelta(TTL).value
+
+
+def test_session_lookups(calendar):
+    assert calendar.last_close(_ns("2026-10-14 15:59")) == 1
+    assert calendar.last_close(_ns("2026-10-14 16:00")) == 2
+    assert calendar.last_open(_ns("2026-10-14 09:29")) == 1
+    assert calendar.session_index(DAYS[2].value // 86_400_000_000_000) == 2
+    assert calendar.session_index(DAYS[-1].value // 86_400_000_000_000 + 1) == -1
+
+
+def test_cache_expiry_uses_the_symbol_market(calendar, monkeypatch):
+    markets = []
+    monkeypatch.setattr(market_utils, "get_market_calendar", lambda market: markets.append(market) or calendar)
+    updated = datetime(2026, 10, 13, 22, 0, tzinfo=timezone.utc)  # 18:00 in New York
+
+    expires = market_utils.get_cache_expiry("SHOP.TO", updated, TTL)
+
+    assert markets == ["TSX"]
+    assert expires == datetime(2026, 10, 14, 13, 30, tzinfo=timezone.utc)
@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.provider_router import ProviderRouter, ProvidersUnavailable, is_provider_failure
+
+
+class FakeFetcher:
+    """Answers price ranges for KNOWN symbols; `down` makes every call fail like a dropped connection."""
+
+    KNOWN = ("AAPL", "MSFT")
+
+    def __init__(self, name, down=False):
+        self.name = name
+        self.down = down
+        self.calls = 0
+
+    async def fetch_price_range(self, symbol, interval, start=None, end=None):
+        return await self._answer(symbol)
+
+    async def fetch_stock_quote(self, symbol):
+        return await self._answer(symbol)
+
+    async def _answer(self, symbol):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError(f"{self.name} unreachable")
+        if symbol not in self.KNOWN:
+            raise ValueError(f"Symbol not found: {symbol}")
+        return f"{self.name}:{symbol}"
+
+
+def _router(*fetchers):
+    return ProviderRouter({f.name: f for f in fetchers}, [f.name for f in fetchers], hedge_max=5)
+
+
+def _status_error(status):
+    request = httpx.Request("GET", "https://example.test")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def test_unknown_symbols_leave_the_circuit_closed():
+    primary, backup = FakeFetcher("primary"), FakeFetcher("backup")
+    router = _router(primary, backup)
+
+    for _ in range(10):
+        with pytest.raises(ValueError, match="Symbol not found"):
+            asyncio.run(router.fetch_price_range("NOPE", "1d"))
+
+    assert router.health["primary", "price_range"].state == "closed"
+    assert router.health["primary", "price_range"].errors == 0
+    assert backup.calls == 0  # a bad ticker is not retried elsewhere
+    assert asyncio.run(router.fetch_price_range("AAPL", "1d")) == "primary:AAPL"
+
+
+def test_failures_fail_over_and_open_the_circuit_for_one_operation():
+    primary, backup = FakeFetcher("primary", down=True), FakeFetcher("backup")
+    router = _router(primary, backup)
+
+    for _ in range(5):
+        assert asyncio.run(router.fetch_stock_quote("AAPL")) == "backup:AAPL"
+    assert router.health["primary", "quote"].state == "open"
+
+    # The open circuit skips primary for quotes only
+    calls = primary.calls
+    assert asyncio.run(router.fetch_stock_quote("AAPL")) == "backup:AAPL"
+    assert primary.calls == calls
+    assert router.health["primary", "price_range"].state == "closed"
+    assert asyncio.run(router.fetch_price_range("AAPL", "1d")) == "backup:AAPL"
+    assert primary.calls == calls + 1
+
+
+def test_all_circuits_open_raises_providers_unavailable():
+    router = _router(FakeFetcher("primary", down=True))
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            asyncio.run(router.fetch_stock_quote("AAPL"))
+    with pytest.raises(ProvidersUnavailable):
+        asyncio.run(router.fetch_stock_quote("AAPL"))
+
+
+@pytest.mark.parametrize("error, failure", [
+    (ConnectionError("reset"), True),
+    (TimeoutError(), True),
+    (httpx.ConnectTimeout("timeout"), True),
+    (_status_error(503), True),
+    (_status_error(429), True),
+    (_status_error(404), False),
+    (ValueError("Unsupported period: 7y"), False),
+])
+def test_only_upstream_errors_count_as_provider_failures(error, failure):
+    assert is_provider_failure(error) is failure
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import diskcache
+import pytest
+
+from services.rate_limit import RateLimitMiddleware, MemoryBucketStore, DiskBucketStore
+
+
+@pytest.fixture
+def disk_stores(tmp_path):
+    # Two stores on one directory stand in for two uvicorn workers
+    stores = [DiskBucketStore(diskcache.Cache(str(tmp_path), timeout=0.05)) for _ in range(2)]
+    yield stores
+    for store in stores:
+        store.close()
+
+
+def test_bucket_bursts_then_refills():
+    store = MemoryBucketStore()
+
+    assert [store.take("a", 0.0, 3, 1.0)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = store.take("a", 0.0, 3, 1.0)
+    assert not allowed and retry_after == pytest.approx(1.0)
+    assert store.take("a", 1.0, 3, 1.0)[0]  # one token back after a second
+    assert not store.take("a", 1.0, 3, 1.0)[0]
+    assert store.take("b", 1.0, 3, 1.0)[0]  # clients are independent
+
+
+def test_idle_clients_are_evicted():
+    store = MemoryBucketStore(max_clients=2)
+    for i, client in enumerate("abc"):
+        store.take(client, float(i), 3, 1.0)
+    assert len(store) == 2
+
+
+def test_disk_buckets_are_shared_between_workers(disk_stores):
+    first, second = disk_stores
+
+    assert first.take("a", 0.0, 2, 1.0)[0]
+    assert second.take("a", 0.0, 2, 1.0)[0]
+    assert not first.take("a", 0.0, 2, 1.0)[0]
+    assert not second.take("a", 0.0, 2, 1.0)[0]
+
+
+def test_disk_buckets_refill_at_the_window_rate(disk_stores):
+    store = disk_stores[0]
+
+    assert [store.take("a", 0.0, 2, 0.5)[0] for _ in range(3)] == [True, True, False]
+    assert not store.take("a", 0.4, 2, 0.5)[0]
+    assert store.take("a", 5.0, 2, 0.5)[0] and store.take("a", 5.0, 2, 0.5)[0]  # refilled, capped at the burst
+    assert not store.take("a", 5.0, 2, 0.5)[0]
+
+
+def _statuses(middleware, count):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def run():
+        statuses = []
+        limiter = middleware(app)
+        for _ in range(count):
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+            await limiter({"type": "http", "client": ("10.0.0.1", 1234)}, None, send)
+        return statuses
+
+    return asyncio.run(run())
+
+
+def test_middleware_checks_disk_buckets_on_their_own_threads(disk_stores):
+    store = disk_stores[0]
+    threads = []
+    take = store.take
+    store.take = lambda *args: threads.append(threading.current_thread().name) or take(*args)
+
+    statuses = _statuses(lambda app: RateLimitMiddleware(app, limit=2, window=60, store=store), 3)
+
+    assert statuses == [200, 200, 429]
+    assert all(name.startswith("ratelimit") for name in threads)
+
+
+def test_middleware_fails_open_when_the_store_breaks():
+    class BrokenStore:
+        executor = None
+
+        def take(self, *args):
+            raise OSError("database is locked")
+
+    statuses = _statuses(lambda app: RateLimitMiddleware(app, limit=1, window=60, store=BrokenStore()), 3)
+
+    assert statuses == [200, 200, 200]
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from services.bars import Bars, NS_PER_DAY
+from services.indicator_engine import plan_indicators, compute_indicators
+from services.ratings import latest_snapshot, generate_recommendations, rating_score, final_rating
+
+INDICATORS = ("SMA", "EMA", "RSI", "MACD", "BB", "ATR")
+
+
+def _plan(names=INDICATORS):
+    return plan_indicators([
+        SimpleNamespace(name=name, length=None, fast=None, slow=None, signal=None) for name in names
+    ])
+
+
+def _bars(close):
+    close = np.asarray(close, dtype=np.float64)
+    time = np.arange(len(close), dtype=np.int64) * NS_PER_DAY
+    return Bars(time, close, close + 1, close - 1, close, np.full(len(close), 1000, dtype=np.int64))
+
+
+def test_snapshot_matches_last_indicator_row():
+    # A year of daily bars: MACD's EMAs still carry their seed, so only the full series matches /indicators
+    close = 100 + np.cumsum(np.random.default_rng(7).normal(0, 1, 252))
+    bars = _bars(close)
+    plan = _plan()
+
+    latest = latest_snapshot(plan, bars)
+
+    columns = compute_indicators(plan, bars.close, bars.high, bars.low)
+    assert {name: latest[name] for name in columns} == {name: float(values[-1]) for name, values in columns.items()}
+
+
+def test_too_short_series_follows_frontend_null_rules():
+    # Ten bars leave every indicator but EMA undefined; the frontend reads those nulls as 0
+    bars = _bars(np.linspace(10, 12, 10))
+    plan = _plan()
+
+    latest = latest_snapshot(plan, bars)
+    recommendations = generate_recommendations(latest, plan)
+
+    assert np.isnan(latest["SMA"]) and np.isnan(latest["MACD"]) and not np.isnan(latest["EMA"])
+    assert [rec["message"] for rec in recommendations] == [
+        "Price is well above SMA — strong bullish trend.",
+        "Price well above EMA — strong upward momentum.",
+        "RSI below 30 — oversold, possible rebound.",
+        "MACD slightly below signal — mild bearish.",
+        "Price above upper band — overbought, possible correction.",
+        "Low ATR — stable price action.",
+    ]
+    assert rating_score(recommendations) == 5
+    assert final_rating(5) == "Buy"
+
+
+def test_repeated_indicators_are_rated_on_their_own_values():
+    # Rising prices: above the 5-bar SMA by a little, well above the 50-bar one
+    bars = _bars(np.linspace(100, 150, 60))
+    plan = plan_indicators([
+        SimpleNamespace(name="SMA", length=length, fast=None, slow=None, signal=None) for length in (5, 50)
+    ])
+
+    recommendations = generate_recommendations(latest_snapshot(plan, bars), plan)
+
+    assert [rec["message"] for rec in recommendations] == [
+        "Price is slightly above SMA — mild bullish trend.",
+        "Price is well above SMA — strong bullish trend.",
+    ]
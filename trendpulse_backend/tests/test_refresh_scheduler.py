@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from services import refresh_scheduler
+from services.bar_file import BarFileStore
+from services.bar_store import BarStore
+from services.bars import Bars
+from services.memory_cache import MemoryCache
+from services.refresh_scheduler import RefreshScheduler
+from services.single_flight import SingleFlight
+
+TTL = timedelta(minutes=10)
+LEAD = timedelta(minutes=1)
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch_price_range(self, symbol, interval, start=None, end=None):
+        self.calls += 1
+        days = pd.bdate_range("2026-10-12", periods=5, tz="UTC")
+        close = np.arange(5, dtype=np.float64) + 100
+        return pd.DataFrame({"Date": days, "Open": close, "High": close, "Low": close, "Close": close,
+                             "Volume": np.full(5, 1000)})
+
+
+def test_hot_symbols_are_warmed_before_the_open(tmp_path):
+    opens_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+    def expiry(symbol, updated, ttl):
+        # Closed until `opens_at`, then open: like get_cache_expiry around a session open
+        return opens_at if updated < opens_at else updated + ttl
+
+    fetcher = FakeFetcher()
+    store = BarStore(BarFileStore(str(tmp_path)), fetcher, TTL, MemoryCache(10 ** 7), SingleFlight(), expiry=expiry)
+    scheduler = RefreshScheduler(store, lead=LEAD)
+    scheduler.record("AAPL")
+
+    asyncio.run(scheduler.tick())  # cold: loaded, valid until the open
+    assert store.next_refresh("AAPL") == opens_at
+    asyncio.run(scheduler.tick())  # the open is within `lead`: warmed now
+
+    assert fetcher.calls == 2
+    # Fresh through the open, in this worker and for any worker reading the file
+    assert store.next_refresh("AAPL") == opens_at + TTL
+    assert store.disk.get(store.make_key("AAPL"))["updated"] == opens_at
+    assert not store.needs_revalidation("AAPL", LEAD)
+
+
+class FailingStore:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def needs_revalidation(self, symbol, lead):
+        return True
+
+    async def revalidate(self, symbol, lead):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return Bars.empty()  # an unknown ticker
+
+
+def test_failed_and_unknown_symbols_back_off(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(refresh_scheduler.time, "monotonic", lambda: clock[0])
+
+    for store in (FailingStore(ConnectionError("down")), FailingStore()):
+        scheduler = RefreshScheduler(store, interval=30, max_backoff=100)
+        scheduler.record("NOPE")
+
+        attempts = []
+        for _ in range(12):
+            calls = store.calls
+            asyncio.run(scheduler.tick())
+            attempts.append(store.calls - calls)
+            clock[0] += 30
+
+        # Backoffs of 30, 60, then 100 (capped) seconds, each ending at the next tick
+        assert attempts == [1, 1, 0, 1, 0, 0, 0, 1, 0, 0, 0, 1]
+        assert scheduler.stats()["failed"] == 5
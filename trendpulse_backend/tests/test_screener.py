@@ -0,0 +1,30 @@
+import numpy as np
+
+from services.bars import Bars, NS_PER_DAY
+from services.indicator_engine import plan_indicators
+from services.screener import latest_values, screen
+from services.serialization import column_to_list
+
+
+def _bars(close, days_behind=0):
+    close = np.asarray(close, dtype=np.float64)
+    time = (np.arange(len(close), dtype=np.int64) - days_behind) * NS_PER_DAY
+    return Bars(time, close, close, close, close, np.arange(len(close), dtype=np.int64) + 1000)
+
+
+def test_series_behind_the_latest_bar_never_match():
+    # HALT stopped trading a day early; its last values are from another session
+    bars_list = [_bars(np.linspace(10, 20, 30)), _bars(np.linspace(10, 90, 30), days_behind=1)]
+
+    latest = latest_values(plan_indicators([]), bars_list)
+
+    assert latest["Close"][0] == 20 and np.isnan(latest["Close"][1]) and np.isnan(latest["Volume"][1])
+    assert screen(latest, [("Close", ">", 15)]).tolist() == [0]
+    assert screen(latest, [], sort_by="Close").tolist() == [0, 1]  # no data sorts last
+    assert column_to_list(latest["Volume"], integer=True) == [1029, None]
+
+
+def test_integer_columns_keep_nulls():
+    assert column_to_list(np.array([1.0, np.nan, 3e9]), integer=True) == [1, None, 3000000000]
+    assert column_to_list(np.array([5, 6], dtype=np.int64), integer=True) == [5, 6]
+    assert column_to_list(np.array([0.5, np.inf])) == [0.5, None]
@@ -0,0 +1,66 @@
+import time
+import asyncio
+from datetime import timedelta
+
+import diskcache
+import pytest
+
+from services.single_flight import SingleFlight
+from services.stock_details import StockDetailsCache
+
+FUNDAMENTALS_TTL = timedelta(hours=24)
+MISS_TTL = timedelta(minutes=5)
+
+
+class FakeFetcher:
+    """Knows AAPL; like yfinance, answers other symbols with an info dict that names no symbol."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def fetch_stock_fundamentals(self, symbol):
+        self.calls.append(("fundamentals", symbol))
+        if symbol == "AAPL":
+            return {"symbol": "AAPL", "name": "Apple Inc."}
+        return {"symbol": None, "name": None, "trailingPegRatio": None}
+
+    async def fetch_stock_quote(self, symbol):
+        self.calls.append(("quote", symbol))
+        if symbol == "AAPL":
+            return {"open": 1.0, "lastTradePrice": 2.0}
+        return {"open": None, "lastTradePrice": None}
+
+
+@pytest.fixture
+def details(tmp_path):
+    cache = diskcache.Cache(str(tmp_path))
+    yield StockDetailsCache(cache, FakeFetcher(), FUNDAMENTALS_TTL, timedelta(seconds=60), SingleFlight(),
+                            miss_ttl=MISS_TTL)
+    cache.close()
+
+
+def _ttl(details, key):
+    """The cached value and its remaining lifetime in seconds."""
+    value, expire_time = details.cache.get(key, expire_time=True)
+    return value, expire_time - time.time()
+
+
+def test_found_symbols_are_cached_for_the_full_ttl(details):
+    first = asyncio.run(details.get("AAPL"))
+    second = asyncio.run(details.get("AAPL"))
+
+    assert first == second and first["symbol"] == "AAPL" and first["lastTradePrice"] == 2.0
+    assert len(details.fetcher.calls) == 2
+    value, ttl = _ttl(details, "AAPL-fundamentals")
+    assert value["name"] == "Apple Inc." and ttl > MISS_TTL.total_seconds()
+
+
+def test_misses_are_cached_briefly_as_empty(details):
+    first = asyncio.run(details.get("NOPE"))
+    second = asyncio.run(details.get("NOPE"))
+
+    assert first == second and first["symbol"] is None and first["lastTradePrice"] is None
+    assert details.fetcher.calls == [("fundamentals", "NOPE"), ("quote", "NOPE")]
+    for key in ("NOPE-fundamentals", "NOPE-quote"):
+        value, ttl = _ttl(details, key)
+        assert value == {} and 0 < ttl <= MISS_TTL.total_seconds()
@@ -1,6 +1,10 @@
+import os
+import time as _time
+import threading
+import numpy as np
+import pandas as pd
 import pandas_market_calendars as mcal
-from datetime import datetime, time, timedelta
-from zoneinfo import ZoneInfo
+from datetime import date, datetime, timedelta
 
 # Maps suffix to market calendar
 MARKET_MAPPING = {
@@ -11,6 +15,19 @@ MARKET_MAPPING = {
     '.O': 'NASDAQ',
 }
 
+# Session arrays cover CALENDAR_START up to this many days past today and are
+# extended forward whenever a lookup gets close to the end
+CALENDAR_START = date(2000, 1, 1)
+CALENDAR_LOOKAHEAD_DAYS = 366
+
+# Prebuilt session files (<market>.npz), shared by every worker
+CALENDAR_DIR = "./trendpulse_cache/calendars"
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
 # Default to NYSE if not matched
 def get_market_from_symbol(symbol: str) -> str:
     symbol_upper = symbol.upper()
@@ -25,46 +42,183 @@ def get_trading_calendar(market: str):
     except Exception:
         raise ValueError(f"Unsupported market: {market}")
 
-def get_latest_market_close_date(symbol: str) -> datetime.date:
-    market = get_market_from_symbol(symbol)
-    cal = get_trading_calendar(market)
+def _to_day(value) -> int:
+    """Days since 1970-01-01 for a date, datetime or pandas Timestamp."""
+    return value.toordinal() - EPOCH_ORDINAL
 
-    eastern = ZoneInfo("America/New_York") if market in ["NYSE", "NASDAQ"] else ZoneInfo("America/Toronto")
-    now = datetime.now(tz=eastern)
+def _from_day(day: int) -> date:
+    return date.fromordinal(int(day) + EPOCH_ORDINAL)
+
+def _today() -> int:
+    return _time.time_ns() // 86_400_000_000_000
+
+
+class MarketCalendar:
+    """
+    Trading sessions of one market as sorted NumPy arrays: session dates
+    (days since the epoch) and open/close times (epoch ns UTC). The schedule
+    is built once from pandas_market_calendars, or loaded from CALENDAR_DIR,
+    and extended forward lazily, so every lookup is a binary search.
+    """
 
-    # Search the past 10 calendar days for the last valid market close
-    schedule = cal.schedule(start_date=now.date() - timedelta(days=10), end_date=now.date())
-    for date in reversed(schedule.index):
-        close_dt = schedule.loc[date]['market_close'].tz_convert(eastern)
-        if close_dt <= now:
-            return date
+    def __init__(self, market: str, sessions, opens, closes, until: int, directory: str = None):
+        self.market = market
+        self.directory = directory
+        self._arrays = (sessions, opens, closes)
+        self._until = until  # last day covered by the arrays
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, market: str, directory: str = CALENDAR_DIR) -> "MarketCalendar":
+        path = os.path.join(directory, f"{market}.npz") if directory else None
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    calendar = cls(market, data["sessions"], data["opens"], data["closes"], int(data["until"]), directory)
+                calendar.ensure(_today())
+                return calendar
+            except Exception:
+                pass  # unreadable file: rebuild below
+
+        empty = np.empty(0, dtype=np.int64)
+        calendar = cls(market, empty, empty, empty, _to_day(CALENDAR_START) - 1, directory)
+        calendar.ensure(_today())
+        return calendar
+
+    def ensure(self, day: int):
+        """Make sure sessions are known through `day`."""
+        if day <= self._until:
+            return
+        with self._lock:
+            if day <= self._until:
+                return
+            until = max(day, _today()) + CALENDAR_LOOKAHEAD_DAYS
+            schedule = get_trading_calendar(self.market).schedule(
+                start_date=_from_day(self._until + 1), end_date=_from_day(until),
+            )
+            sessions, opens, closes = self._arrays
+            self._arrays = (
+                np.concatenate([sessions, schedule.index.values.astype("datetime64[D]").astype(np.int64)]),
+                np.concatenate([opens, schedule["market_open"].values.astype(np.int64)]),
+                np.concatenate([closes, schedule["market_close"].values.astype(np.int64)]),
+            )
+            self._until = until
+            self._save()
+
+    def _save(self):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.market}.npz")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        sessions, opens, closes = self._arrays
+        with open(tmp, "wb") as f:
+            np.savez(f, sessions=sessions, opens=opens, closes=closes, until=np.int64(self._until))
+        os.replace(tmp, path)
+
+    def last_close(self, now_ns: int = None) -> int:
+        """Index of the last session that closed at or before `now_ns` (default now), or -1."""
+        now_ns = _time.time_ns() if now_ns is None else now_ns
+        self.ensure(now_ns // 86_400_000_000_000)
+        closes = self._arrays[2]
+        return int(np.searchsorted(closes, now_ns, side="right")) - 1
+
+    def last_open(self, now_ns: int = None) -> int:
+        """Index of the last session that opened at or before `now_ns` (default now), or -1."""
+        now_ns = _time.time_ns() if now_ns is None else now_ns
+        self.ensure(now_ns // 86_400_000_000_000)
+        opens = self._arrays[1]
+        return int(np.searchsorted(opens, now_ns, side="right")) - 1
+
+    def session_index(self, day: int) -> int:
+        """Index of the session on `day`, or -1 if the market is closed that day."""
+        self.ensure(day)
+        sessions = self._arrays[0]
+        i = int(np.searchsorted(sessions, day))
+        return i if i < len(sessions) and sessions[i] == day else -1
+
+    def first_session_from(self, day: int) -> int:
+        """Index of the first session on or after `day`."""
+        self.ensure(day)
+        return int(np.searchsorted(self._arrays[0], day))
+
+    def next_refresh(self, updated_ns: int, ttl_ns: int) -> int:
+        """
+        Epoch ns at which data fetched at `updated_ns` goes stale. Within a
+        session, and for one `ttl_ns` after its close so the final bar is
+        picked up, that is `updated_ns + ttl_ns`; otherwise nothing can
+        change before the next open.
+        """
+        self.ensure(updated_ns // 86_400_000_000_000 + 7)
+        _, opens, closes = self._arrays
+        i = int(np.searchsorted(opens, updated_ns, side="right")) - 1
+        if (i >= 0 and updated_ns < closes[i] + ttl_ns) or i + 1 >= len(opens):
+            return updated_ns + ttl_ns
+        return int(opens[i + 1])
+
+    def session_date(self, i: int) -> date:
+        return _from_day(self._arrays[0][i])
+
+    def session_hours(self, i: int):
+        _, opens, closes = self._arrays
+        return pd.Timestamp(int(opens[i]), tz="UTC"), pd.Timestamp(int(closes[i]), tz="UTC")
+
+
+def get_market_calendar(market: str) -> MarketCalendar:
+    """Process-wide session index for `market`, built on first use."""
+    calendar = _calendars.get(market)
+    if calendar is None:
+        with _calendars_lock:
+            calendar = _calendars.get(market)
+            if calendar is None:
+                calendar = MarketCalendar.load(market, CALENDAR_DIR)
+                _calendars[market] = calendar
+    return calendar
+
+def get_cache_expiry(symbol: str, updated: datetime, ttl: timedelta) -> datetime:
+    """
+    When data for `symbol` fetched at `updated` (tz-aware) should be
+    refreshed: after `ttl` while its market is open, otherwise at the next
+    open. Markets without a calendar always use `ttl`.
+    """
+    try:
+        calendar = get_market_calendar(get_market_from_symbol(symbol))
+    except ValueError:
+        return updated + ttl
+    expires_ns = calendar.next_refresh(pd.Timestamp(updated).value, pd.Timedelta(ttl).value)
+    return pd.Timestamp(expires_ns, tz="UTC").to_pydatetime()
 
-    raise RuntimeError(f"Could not determine last market close date for market: {market}")
+def get_latest_market_close_date(symbol: str) -> date:
+    market = get_market_from_symbol(symbol)
+    calendar = get_market_calendar(market)
+    i = calendar.last_close()
+    if i < 0:
+        raise RuntimeError(f"Could not determine last market close date for market: {market}")
+    return calendar.session_date(i)
 
-def get_market_hours_for_date(symbol: str, date: datetime.date):
+def get_market_hours_for_date(symbol: str, date: date):
     market = get_market_from_symbol(symbol)
-    cal = get_trading_calendar(market)
-    schedule = cal.schedule(start_date=date, end_date=date)
-    if schedule.empty:
+    calendar = get_market_calendar(market)
+    i = calendar.session_index(_to_day(date))
+    if i < 0:
         raise ValueError(f"{date} is not a trading day for {market}")
-    start = schedule.iloc[0]['market_open'].tz_convert("UTC")
-    end = schedule.iloc[0]['market_close'].tz_convert("UTC")
-    return start, end
+    return calendar.session_hours(i)
 
 def get_hourly_range_for_last_open_day(symbol: str):
     date = get_latest_market_close_date(symbol)
     return get_market_hours_for_date(symbol, date)
 
-from datetime import datetime, timedelta
-
 def get_daily_range_for_period(symbol: str, period: str):
     """
     Returns UTC start and end datetimes covering the requested period ending at the latest market close date.
     Supported periods: "5d", "1mo", "3mo", "6mo", "1y", "2y" (internal), "5y", "ytd", "max"
     """
     market = get_market_from_symbol(symbol)
-    cal = get_trading_calendar(market)
-    latest_close_date = get_latest_market_close_date(symbol)
+    calendar = get_market_calendar(market)
+    end = calendar.last_close()
+    if end < 0:
+        raise RuntimeError(f"Could not determine last market close date for market: {market}")
+    latest_close_date = calendar.session_date(end)
 
     if period == "5d":
         approx_start_date = latest_close_date - timedelta(days=7)  # buffer for trading days
@@ -87,15 +241,10 @@ def get_daily_range_for_period(symbol: str, period: str):
     else:
         raise ValueError(f"Unsupported period: {period}")
 
-    # Fetch schedule for all periods (including "max")
-    schedule = cal.schedule(start_date=approx_start_date, end_date=latest_close_date)
-
-    if schedule.empty:
+    start = calendar.first_session_from(_to_day(approx_start_date))
+    if start > end:
         raise ValueError(f"No trading days found in period {period} for market {market}")
 
-    actual_start_date = schedule.index[0]
-    start_utc = schedule.loc[actual_start_date]['market_open'].tz_convert("UTC")
-    end_utc = schedule.loc[latest_close_date]['market_close'].tz_convert("UTC")
-
+    start_utc, _ = calendar.session_hours(start)
+    _, end_utc = calendar.session_hours(end)
     return start_utc, end_utc
-